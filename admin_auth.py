@@ -0,0 +1,28 @@
+import hmac
+import os
+
+from flask import request
+
+
+# ─── Admin API access ─────────────────────────────────────────────────────────
+#
+# Administrative endpoints (job queue inspection and retries, stored request
+# profiles) require the `X-Admin-Token: <ADMIN_TOKEN>` header. Without
+# ADMIN_TOKEN they are disabled. The token is separate from PROFILE_TOKEN:
+# whoever may trigger profiling cannot read stored profiles or administer
+# jobs, and the reverse.
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN') or None
+ADMIN_HEADER = 'X-Admin-Token'
+
+
+def token_matches(supplied, expected):
+    """Constant-time comparison of a request header against a configured secret."""
+    if supplied is None or expected is None:
+        return False
+    return hmac.compare_digest(supplied.encode('utf-8'), expected.encode('utf-8'))
+
+
+def is_admin():
+    """True when the request carries ADMIN_TOKEN (never when it is not configured)."""
+    return token_matches(request.headers.get(ADMIN_HEADER), ADMIN_TOKEN)
@@ -0,0 +1,243 @@
+import importlib.util
+import json
+import logging
+import os
+import subprocess
+import threading
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+
+# ─── Speech recognition backends ──────────────────────────────────────────────
+#
+# Every transcription (transcribe_audio_file, the API, the CLI --method
+# option, the batch CLI and the upload transcriber) goes through a backend
+# from BACKENDS:
+#
+#   whisper       openai-whisper, fp32 on CPU (the original engine)
+#   whisper-int8  Whisper with int8 weights on CPU: faster-whisper
+#                 (CTranslate2) when installed, otherwise openai-whisper with
+#                 torch dynamic quantization of its Linear layers
+#   vosk          offline Kaldi recognizer (vosk); VOSK_MODEL_PATH points to
+#                 an unpacked model, otherwise vosk fetches its small English
+#                 model once
+#   google        Google Web Speech API (speech_recognition), online
+#
+# A backend loads its model once per process (load()) and turns an audio or
+# video file into [{'text', 'start', 'duration'}] segments (transcribe()),
+# raising on failure. ASR_BACKEND selects the default. All engines are
+# optional dependencies and are imported only when their backend is used;
+# bench_asr.py compares them.
+
+ASR_BACKEND = os.getenv('ASR_BACKEND', 'whisper')
+WHISPER_MODEL_NAME = os.getenv('WHISPER_MODEL', 'base')  # base: good speed / accuracy trade-off on CPU
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH')
+SAMPLE_RATE = 16000
+# Google's free endpoint rejects long requests; audio is sent in chunks of this many seconds
+GOOGLE_CHUNK_SECONDS = 30
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+def decode_pcm16(path):
+    """The audio of `path` as 16 kHz mono signed 16-bit little-endian PCM bytes (ffmpeg)."""
+    cmd = ['ffmpeg', '-nostdin', '-v', 'error', '-i', path, '-f', 's16le', '-ac', '1', '-ar', str(SAMPLE_RATE), '-']
+    try:
+        return subprocess.run(cmd, capture_output=True, check=True).stdout
+    except FileNotFoundError as e:
+        raise RuntimeError('ffmpeg not found on PATH') from e
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg could not decode {path}: {e.stderr.decode('utf-8', 'replace').strip()}") from e
+
+
+def _segment(text, start, end):
+    return {'text': text.strip(), 'start': start, 'duration': max(0.0, end - start)}
+
+
+def _whisper_segments(result):
+    segments = [_segment(s['text'], s['start'], s['end']) for s in result.get('segments', [])]
+    # No segments but text: a single segment
+    if not segments and result.get('text', '').strip():
+        segments.append(_segment(result['text'], 0.0, 0.0))
+    return segments
+
+
+class ASRBackend:
+    """One speech recognition engine. Subclasses implement _load() and _transcribe()."""
+
+    name = None
+    description = ''
+    modules = ()  # importable modules the backend needs
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+
+    def missing(self):
+        """Names of required modules that are not installed."""
+        return [m for m in self.modules if importlib.util.find_spec(m) is None]
+
+    def available(self):
+        return not self.missing()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    def load(self):
+        """Load the model once per process and return it."""
+        with self._lock:
+            if self._model is None:
+                missing = self.missing()
+                if missing:
+                    raise BackendUnavailable(f"ASR backend '{self.name}' needs: {', '.join(missing)}")
+                log.info("Loading ASR model", extra={'backend': self.name})
+                with metrics.TRANSCRIBE_STAGE.time(stage='model_load'):
+                    self._model = self._load()
+            return self._model
+
+    def transcribe(self, path, language='en'):
+        """[{'text', 'start', 'duration'}] for an audio/video file. Raises on failure."""
+        return self._transcribe(self.load(), path, language)
+
+    def info(self):
+        return {'name': self.name, 'description': self.description, 'available': self.available(),
+                'missing': self.missing(), 'loaded': self.loaded}
+
+    def _load(self):
+        raise NotImplementedError
+
+    def _transcribe(self, model, path, language):
+        raise NotImplementedError
+
+
+class WhisperBackend(ASRBackend):
+    name = 'whisper'
+    description = f'openai-whisper ({WHISPER_MODEL_NAME}), fp32 on CPU'
+    modules = ('whisper',)
+
+    def _load(self):
+        import whisper
+        return whisper.load_model(WHISPER_MODEL_NAME)
+
+    def _transcribe(self, model, path, language):
+        import whisper
+        # Decode (ffmpeg -> 16 kHz mono) separately so its cost shows up on its own
+        with metrics.TRANSCRIBE_STAGE.time(stage='decode'):
+            audio = whisper.load_audio(path)
+        with metrics.TRANSCRIBE_STAGE.time(stage='inference'):
+            result = model.transcribe(
+                audio,
+                language=language,
+                verbose=None,  # no per-segment printing
+                fp16=False  # fp16 is GPU-only
+            )
+        return _whisper_segments(result)
+
+
+class QuantizedWhisperBackend(WhisperBackend):
+    name = 'whisper-int8'
+    description = f'Whisper ({WHISPER_MODEL_NAME}) with int8 weights on CPU (faster-whisper, else torch dynamic)'
+
+    def missing(self):
+        if importlib.util.find_spec('faster_whisper') is not None:
+            return []
+        return [m for m in ('whisper', 'torch') if importlib.util.find_spec(m) is None]
+
+    def _load(self):
+        if importlib.util.find_spec('faster_whisper') is not None:
+            from faster_whisper import WhisperModel
+            threads = int(os.getenv('OMP_NUM_THREADS', 0) or 0)
+            return WhisperModel(WHISPER_MODEL_NAME, device='cpu', compute_type='int8', cpu_threads=threads)
+        import torch
+        model = super()._load()
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def _transcribe(self, model, path, language):
+        if type(model).__name__ != 'WhisperModel':
+            return super()._transcribe(model, path, language)
+        with metrics.TRANSCRIBE_STAGE.time(stage='inference'):
+            segments, _ = model.transcribe(path, language=language)
+            # A generator: decoding happens while it is consumed
+            return [_segment(s.text, s.start, s.end) for s in segments]
+
+
+class VoskBackend(ASRBackend):
+    name = 'vosk'
+    description = 'Vosk / Kaldi offline recognizer'
+    modules = ('vosk',)
+    # Bytes fed to the recognizer at a time (0.25 s)
+    CHUNK_BYTES = SAMPLE_RATE // 4 * 2
+
+    def _load(self):
+        import vosk
+        vosk.SetLogLevel(-1)
+        return vosk.Model(VOSK_MODEL_PATH) if VOSK_MODEL_PATH else vosk.Model(lang='en-us')
+
+    def _transcribe(self, model, path, language):
+        import vosk
+        with metrics.TRANSCRIBE_STAGE.time(stage='decode'):
+            pcm = decode_pcm16(path)
+        recognizer = vosk.KaldiRecognizer(model, SAMPLE_RATE)
+        recognizer.SetWords(True)
+        segments = []
+
+        def collect(result):
+            words = json.loads(result).get('result', [])
+            if words:
+                segments.append(_segment(' '.join(w['word'] for w in words), words[0]['start'], words[-1]['end']))
+
+        with metrics.TRANSCRIBE_STAGE.time(stage='inference'):
+            for i in range(0, len(pcm), self.CHUNK_BYTES):
+                # True at the end of an utterance: one segment per utterance
+                if recognizer.AcceptWaveform(pcm[i:i + self.CHUNK_BYTES]):
+                    collect(recognizer.Result())
+            collect(recognizer.FinalResult())
+        return segments
+
+
+class GoogleBackend(ASRBackend):
+    name = 'google'
+    description = 'Google Web Speech API (online, via speech_recognition)'
+    modules = ('speech_recognition',)
+
+    def _load(self):
+        import speech_recognition as sr
+        return sr.Recognizer()
+
+    def _transcribe(self, recognizer, path, language):
+        import speech_recognition as sr
+        with metrics.TRANSCRIBE_STAGE.time(stage='decode'):
+            pcm = decode_pcm16(path)
+        locale = language if '-' in language else {'en': 'en-US'}.get(language, language)
+        chunk = GOOGLE_CHUNK_SECONDS * SAMPLE_RATE * 2
+        segments = []
+        with metrics.TRANSCRIBE_STAGE.time(stage='inference'):
+            for i in range(0, len(pcm), chunk):
+                data = pcm[i:i + chunk]
+                start = i / (SAMPLE_RATE * 2)
+                try:
+                    text = recognizer.recognize_google(sr.AudioData(data, SAMPLE_RATE, 2), language=locale)
+                except sr.UnknownValueError:
+                    continue  # no speech in this chunk
+                except sr.RequestError as e:
+                    raise RuntimeError(f'Could not request results from Google Speech Recognition: {e}') from e
+                segments.append(_segment(text, start, start + len(data) / (SAMPLE_RATE * 2)))
+        return segments
+
+
+BACKENDS = {backend.name: backend for backend in
+            (WhisperBackend(), QuantizedWhisperBackend(), VoskBackend(), GoogleBackend())}
+
+
+def get_backend(name=None):
+    """The backend called `name` (default: ASR_BACKEND). Raises ValueError for unknown names."""
+    name = name or ASR_BACKEND
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown ASR backend '{name}' (choose from {', '.join(BACKENDS)})") from None
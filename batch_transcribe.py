@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+import click
+
+import asr_backends
+import subtitle_formats
+import transcript_api
+from log_config import configure_logging
+
+
+# ─── Batch transcription ──────────────────────────────────────────────────────
+#
+# Transcribes many YouTube URLs and audio/video files on a process pool. Each
+# worker process loads the ASR model once (asr_backends caches it per
+# process) and reuses it for every file it is given; YouTube items never
+# load the model at all.
+#
+# Results go to one JSONL file or to one file per input. Every finished item
+# is appended to a checkpoint file (JSONL, flushed and fsynced), so an
+# interrupted run started again with the same arguments skips what is done.
+
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 2))
+
+
+def is_url(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def source_key(source):
+    """Stable identity of an input across runs."""
+    if is_url(source):
+        return f"youtube:{transcript_api.extract_video_id(source) or source}"
+    return f"file:{os.path.abspath(source)}"
+
+
+def read_manifest(path):
+    """One URL or path per line; blank lines and # comments are ignored. Paths are relative to the manifest."""
+    base = os.path.dirname(os.path.abspath(path))
+    sources = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            sources.append(line if is_url(line) else os.path.join(base, line))
+    return sources
+
+
+def expand_inputs(inputs, manifests):
+    """Directories become the supported media files inside them (recursively), in a stable order."""
+    sources = []
+    for manifest in manifests:
+        sources.extend(read_manifest(manifest))
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                sources.extend(os.path.join(root, f) for f in sorted(files) if transcript_api.allowed_file(f))
+        else:
+            sources.append(item)
+
+    unique, seen = [], set()
+    for source in sources:
+        key = source_key(source)
+        if key not in seen:
+            seen.add(key)
+            unique.append(source)
+    return unique
+
+
+def output_names(sources):
+    """Per-file output stems: the file stem or video id, with a hash suffix where two inputs collide."""
+    stems = {}
+    for source in sources:
+        if is_url(source):
+            stems[source] = transcript_api.extract_video_id(source) or hashlib.sha1(source.encode()).hexdigest()[:12]
+        else:
+            stems[source] = os.path.splitext(os.path.basename(source))[0]
+    counts = {}
+    for stem in stems.values():
+        counts[stem] = counts.get(stem, 0) + 1
+    return {source: stem if counts[stem] == 1 else f"{stem}_{hashlib.sha1(source_key(source).encode()).hexdigest()[:8]}"
+            for source, stem in stems.items()}
+
+
+def load_checkpoint(path):
+    """{source key: status} of items finished by earlier runs (a truncated last line is ignored)."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            done[entry['key']] = entry['status']
+    return done
+
+
+def _init_worker(threads):
+    # Split the CPU between workers; must happen before torch is imported
+    os.environ.setdefault('OMP_NUM_THREADS', str(threads))
+    os.environ.setdefault('MKL_NUM_THREADS', str(threads))
+    configure_logging(os.getenv('LOG_LEVEL', 'WARNING'))
+    transcript_api.add_winget_ffmpeg_to_path()
+
+
+def transcribe_source(source, method=None):
+    """Worker: transcribe one URL or file. Returns a result dict (never raises)."""
+    start = time.perf_counter()
+    result = {'source': source, 'key': source_key(source)}
+    try:
+        if is_url(source):
+            result['kind'] = 'youtube'
+            segments = transcript_api.get_transcript_data(transcript_api.extract_video_id(source) or source)
+            error = 'No captions available for this video'
+        else:
+            result['kind'] = 'audio'
+            if not os.path.isfile(source):
+                segments, error = None, 'File not found'
+            elif not transcript_api.allowed_file(source):
+                segments, error = None, 'Unsupported audio format'
+            else:
+                segments = transcript_api.transcribe_audio_file(source, method=method)
+                error = f"{method or asr_backends.ASR_BACKEND} transcription failed"
+        if segments is None:
+            result.update(status='failed', error=error)
+        else:
+            result.update(status='ok', segments=segments)
+    except Exception as e:
+        result.update(status='failed', error=str(e))
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _append_line(f, record):
+    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    f.flush()
+    os.fsync(f.fileno())
+
+
+@click.command()
+@click.argument('inputs', nargs=-1)
+@click.option('--manifest', '-m', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='File listing one URL or path per line (repeatable)')
+@click.option('--output', '-o', type=click.Path(), default=None,
+              help='JSONL file to append results to (default: batch_results.jsonl)')
+@click.option('--output-dir', type=click.Path(file_okay=False), default=None,
+              help='Write one file per input here instead of a JSONL file')
+@click.option('--per-file-format', type=click.Choice(['json', *subtitle_formats.FORMATS]), default='txt',
+              show_default=True, help='Format of --output-dir files (json holds the full result)')
+@click.option('--timestamps/--no-timestamps', default=True, help='Timestamps in .txt outputs (default: True)')
+@click.option('--checkpoint', type=click.Path(), default=None,
+              help='Checkpoint file (default: next to the output, *.checkpoint.jsonl)')
+@click.option('--retry-failed/--skip-failed', default=True,
+              help='On resume, retry items that failed before (default) or skip them')
+@click.option('--workers', '-w', type=int, default=BATCH_WORKERS, show_default=True,
+              help='Worker processes (each holds one ASR model)')
+@click.option('--method', type=click.Choice(list(asr_backends.BACKENDS)), default=asr_backends.ASR_BACKEND,
+              show_default=True, help='ASR backend for audio files')
+def main(inputs, manifest, output: Optional[str], output_dir: Optional[str], per_file_format: str,
+         timestamps: bool, checkpoint: Optional[str], retry_failed: bool, workers: int,
+         method: str) -> None:
+    """Transcribe many YouTube URLs and audio/video files concurrently.
+
+    INPUTS are URLs, files or directories (searched recursively for supported media).
+    """
+    configure_logging(os.getenv('LOG_LEVEL', 'WARNING'))
+    sources = expand_inputs(inputs, manifest)
+    if not sources:
+        click.echo("Error: nothing to transcribe (pass URLs, files, directories or --manifest)", err=True)
+        sys.exit(1)
+
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        checkpoint = checkpoint or os.path.join(output_dir, '.checkpoint.jsonl')
+    else:
+        output = output or 'batch_results.jsonl'
+        checkpoint = checkpoint or f"{os.path.splitext(output)[0]}.checkpoint.jsonl"
+
+    done = load_checkpoint(checkpoint)
+    pending = [s for s in sources
+               if done.get(source_key(s)) != 'ok' and not (done.get(source_key(s)) == 'failed' and not retry_failed)]
+    if len(pending) < len(sources):
+        click.echo(f"Resuming: {len(sources) - len(pending)} of {len(sources)} already done")
+    if not pending:
+        return
+
+    names = output_names(sources)
+    threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    failures = 0
+
+    results_file = open(output, 'a', encoding='utf-8') if not output_dir else None
+    with open(checkpoint, 'a', encoding='utf-8') as checkpoint_file, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = {pool.submit(transcribe_source, source, method): source for source in pending}
+        try:
+            for n, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                source = futures[future]
+
+                # Write the result first, then record it as done
+                if result['status'] == 'ok' and output_dir:
+                    path = os.path.join(output_dir, f"{names[source]}.{per_file_format}")
+                    with open(path, 'w', encoding='utf-8') as f:
+                        if per_file_format == 'json':
+                            json.dump(result, f, ensure_ascii=False)
+                        else:
+                            f.writelines(subtitle_formats.stream(per_file_format, result['segments'], timestamps))
+                elif results_file is not None:
+                    _append_line(results_file, result)
+                _append_line(checkpoint_file, {'key': result['key'], 'status': result['status']})
+
+                if result['status'] == 'ok':
+                    click.echo(f"[{n}/{len(pending)}] ok {source} "
+                               f"({len(result['segments'])} segments, {result['seconds']:.1f}s)")
+                else:
+                    failures += 1
+                    click.echo(f"[{n}/{len(pending)}] FAILED {source}: {result['error']}", err=True)
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            click.echo("Interrupted; run the same command again to resume", err=True)
+            sys.exit(130)
+        finally:
+            if results_file is not None:
+                results_file.close()
+
+    click.echo(f"Done: {len(pending) - failures} transcribed, {failures} failed"
+               + (f" -> {output_dir}" if output_dir else f" -> {output}"))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
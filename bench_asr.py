@@ -0,0 +1,168 @@
+"""
+Compare the ASR backends (asr_backends.py) on a fixture corpus: real-time
+factor, peak memory and word error rate.
+
+The corpus is a directory of audio/video files, each with its reference
+transcript next to it (same name, .txt):
+
+    corpus/lecture_01.mp3   corpus/lecture_01.txt
+    corpus/lecture_02.wav   corpus/lecture_02.txt
+
+Each backend runs in a subprocess of its own, so model load time and peak
+memory (max RSS) are measured in isolation:
+
+    python bench_asr.py corpus/ -b whisper -b whisper-int8 -b vosk --json results.json
+
+RTF is processing time / audio duration (below 1 is faster than real time).
+WER is word-level edit distance / reference words over the whole corpus,
+after lower-casing and dropping punctuation.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import click
+
+import asr_backends
+import transcript_api
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_corpus(directory):
+    """[(audio path, reference text)] for every supported file with a .txt reference."""
+    items = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        reference = os.path.splitext(path)[0] + '.txt'
+        if transcript_api.allowed_file(name) and os.path.isfile(reference):
+            with open(reference, 'r', encoding='utf-8') as f:
+                items.append((path, f.read()))
+    return items
+
+
+def normalize(text):
+    return re.findall(r"[^\W_]+(?:'[^\W_]+)*", text.lower())
+
+
+def word_errors(reference, hypothesis):
+    """Word-level Levenshtein distance (substitutions + deletions + insertions)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_backend(name, paths, warmup):
+    """Child process: load one backend, transcribe `paths`, report timings as JSON on stdout."""
+    backend = asr_backends.get_backend(name)
+    if not backend.available():
+        return {'backend': name, 'error': f"needs {', '.join(backend.missing())}"}
+    transcript_api.add_winget_ffmpeg_to_path()
+
+    start = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - start
+    if warmup and paths:
+        backend.transcribe(paths[0])
+
+    files = []
+    for path in paths:
+        start = time.perf_counter()
+        segments = backend.transcribe(path)
+        files.append({'path': path, 'seconds': time.perf_counter() - start,
+                      'hypothesis': ' '.join(segment['text'] for segment in segments)})
+    return {'backend': name, 'load_seconds': load_seconds, 'peak_rss_mb': peak_rss_mb(), 'files': files}
+
+
+def summarize(result, corpus, durations):
+    references = dict(corpus)
+    errors = words = 0
+    for item in result['files']:
+        reference = normalize(references[item['path']])
+        errors += word_errors(reference, normalize(item['hypothesis']))
+        words += len(reference)
+        item['audio_seconds'] = durations[item['path']]
+    audio = sum(durations[item['path']] for item in result['files'])
+    processing = sum(item['seconds'] for item in result['files'])
+    result.update({
+        'audio_seconds': audio,
+        'processing_seconds': processing,
+        'rtf': processing / audio if audio else None,
+        'wer': errors / words if words else None,
+    })
+    return result
+
+
+@click.command()
+@click.argument('corpus_dir', type=click.Path(exists=True, file_okay=False))
+@click.option('--backend', '-b', 'backends', multiple=True, type=click.Choice(list(asr_backends.BACKENDS)),
+              help='Backend to compare (repeatable; default: all installed)')
+@click.option('--warmup/--no-warmup', default=True, show_default=True,
+              help='Transcribe the first file once, untimed, after loading')
+@click.option('--json', 'json_path', type=click.Path(dir_okay=False), default=None,
+              help='Also write the full results (per file, with hypotheses) here')
+@click.option('--worker', hidden=True, default=None)
+def main(corpus_dir, backends, warmup, json_path, worker):
+    """Benchmark ASR backends on CORPUS_DIR (audio files with .txt references)."""
+    corpus = load_corpus(corpus_dir)
+    if worker:
+        print(json.dumps(run_backend(worker, [path for path, _ in corpus], warmup)))
+        return
+    if not corpus:
+        raise click.ClickException(f"no audio files with .txt references in {corpus_dir}")
+
+    import media_probe
+    transcript_api.add_winget_ffmpeg_to_path()
+    durations = {path: media_probe.probe(path)['duration'] for path, _ in corpus}
+    backends = backends or [name for name, backend in asr_backends.BACKENDS.items() if backend.available()]
+    print(f"{len(corpus)} files, {sum(durations.values()) / 60:.1f} min of audio\n")
+
+    results = []
+    print(f"{'backend':14} {'load s':>8} {'proc s':>8} {'RTF':>7} {'peak MB':>9} {'WER':>7}")
+    for name in backends:
+        cmd = [sys.executable, os.path.join(HERE, 'bench_asr.py'), corpus_dir, '--worker', name,
+               '--warmup' if warmup else '--no-warmup']
+        proc = subprocess.run(cmd, capture_output=True, text=True, env={**os.environ, 'LOG_LEVEL': 'WARNING'})
+        if proc.returncode != 0:
+            result = {'backend': name, 'error': (proc.stderr.strip().splitlines() or ['failed'])[-1]}
+        else:
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if 'error' in result:
+            print(f"{name:14} skipped: {result['error']}")
+        else:
+            summarize(result, corpus, durations)
+            peak = f"{result['peak_rss_mb']:.0f}" if result['peak_rss_mb'] is not None else 'n/a'
+            rtf = f"{result['rtf']:.3f}" if result['rtf'] is not None else 'n/a'
+            wer = f"{result['wer'] * 100:.1f}%" if result['wer'] is not None else 'n/a'
+            print(f"{name:14} {result['load_seconds']:8.2f} {result['processing_seconds']:8.2f} "
+                  f"{rtf:>7} {peak:>9} {wer:>7}")
+        results.append(result)
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
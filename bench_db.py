@@ -0,0 +1,112 @@
+"""
+Benchmark the per-request database overhead of the login, register and
+video-list endpoints: a fresh sqlite3.connect per request (the old get_db)
+against the pooled, tuned connections from db_pool.
+
+Runs on a throwaway copy of the schema, so app.db is never touched:
+
+    python bench_db.py --requests 2000 --videos 5000
+"""
+import contextlib
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import click
+
+
+LIST_QUERY = ('SELECT id, title, filename, url, type, thumbnail, duration, width, height, sprite, '
+              'media_status, hls_status, transcript_status, upload_date FROM videos '
+              'ORDER BY upload_date DESC, id DESC LIMIT ?')
+
+
+def create_schema(path, videos):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL, role TEXT DEFAULT 'student', created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    conn.execute('''CREATE TABLE videos (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, filename TEXT,
+                    url TEXT, type TEXT DEFAULT 'upload', thumbnail TEXT, duration REAL,
+                    upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP, codec TEXT, width INTEGER, height INTEGER,
+                    bitrate INTEGER, sprite TEXT, media_info TEXT, media_status TEXT, hls_status TEXT,
+                    transcript_status TEXT, transcript_error TEXT)''')
+    conn.execute('CREATE INDEX idx_videos_upload_date ON videos (upload_date DESC, id DESC)')
+    conn.execute("INSERT INTO users (username, password, role) VALUES ('student', 'student123', 'student')")
+    conn.executemany('INSERT INTO videos (title, filename, duration, upload_date) VALUES (?, ?, ?, ?)',
+                     [(f'Lecture {i}', f'lecture_{i}.mp4', 600.0, f'2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}')
+                      for i in range(videos)])
+    conn.commit()
+    conn.close()
+
+
+def make_per_request_db(path):
+    @contextlib.contextmanager
+    def get_db():
+        conn = sqlite3.connect(path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+    return get_db, get_db
+
+
+def make_pooled_db(path):
+    import db_pool
+    db_pool.DATABASE_PATH = path
+    db_pool.close_all()
+    return db_pool.writer.connection, db_pool.reader.connection
+
+
+def login(get_db, get_read_db, n):
+    with get_read_db() as conn:
+        conn.execute('SELECT * FROM users WHERE username = ?', ('student',)).fetchone()
+
+
+def register(get_db, get_read_db, n):
+    with get_db() as conn:
+        conn.execute('INSERT INTO users (username, password, role) VALUES (?, ?, ?)',
+                     (f'bench_{time.perf_counter_ns()}_{n}', 'secret', 'student'))
+        conn.commit()
+
+
+def list_videos(get_db, get_read_db, n):
+    with get_read_db() as conn:
+        conn.execute(LIST_QUERY, (51,)).fetchall()
+
+
+def run(fn, dbs, requests):
+    timings = []
+    for n in range(requests):
+        start = time.perf_counter()
+        fn(*dbs, n)
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+
+
+@click.command()
+@click.option('--requests', 'requests', default=2000, show_default=True, help='Requests per endpoint')
+@click.option('--videos', default=5000, show_default=True, help='Rows in the videos table')
+def main(requests, videos):
+    """Compare per-request DB overhead: connect-per-request vs pooled connections."""
+    workdir = tempfile.mkdtemp(prefix='bench_db_')
+    try:
+        path = os.path.join(workdir, 'app.db')
+        create_schema(path, videos)
+        print(f"{'endpoint':<10} {'mode':<12} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+        for name, fn in (('login', login), ('register', register), ('videos', list_videos)):
+            for mode, factory in (('per-request', make_per_request_db), ('pooled', make_pooled_db)):
+                dbs = factory(path)
+                run(fn, dbs, min(requests, 50))  # warm up
+                mean, p50, p99 = run(fn, dbs, requests)
+                print(f"{name:<10} {mode:<12} {mean:>9.1f} {p50:>9.1f} {p99:>9.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark start-up cost of transcript_api: wall time of `import transcript_api`
+and of the CLI (`python transcript_api.py --help`), plus the slowest imports
+reported by `python -X importtime`. Also checks that the heavy dependencies
+stay unloaded and that importing creates nothing on disk.
+
+    python bench_import.py --runs 5
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ('whisper', 'torch', 'speech_recognition', 'pydub', 'groq', 'docx')
+
+CHECK_SCRIPT = f"""
+import sys, transcript_api
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(','.join(loaded))
+"""
+
+
+def _time_command(cmd, cwd, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, capture_output=True, check=True, env={**os.environ, 'PYTHONPATH': HERE})
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings)
+
+
+def _slowest_imports(cwd, top):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import transcript_api'],
+                            cwd=cwd, capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': HERE})
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Names are indented two spaces per level; level 1 = imported directly by transcript_api
+        if len(name) - len(name.lstrip()) == 3:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+@click.command()
+@click.option('--runs', default=5, show_default=True, help='Runs per measurement (median is reported)')
+@click.option('--top', default=10, show_default=True, help='How many of the slowest imports to list')
+def main(runs, top):
+    """Measure import and CLI start-up time of transcript_api."""
+    workdir = tempfile.mkdtemp(prefix='bench_import_')
+    try:
+        baseline, _ = _time_command([sys.executable, '-c', 'pass'], workdir, runs)
+        imported, fastest = _time_command([sys.executable, '-c', 'import transcript_api'], workdir, runs)
+        cli, _ = _time_command([sys.executable, os.path.join(HERE, 'transcript_api.py'), '--help'], workdir, runs)
+
+        print(f"interpreter start        {baseline * 1000:8.1f} ms")
+        print(f"import transcript_api    {imported * 1000:8.1f} ms  (fastest {fastest * 1000:.1f} ms)")
+        print(f"CLI --help               {cli * 1000:8.1f} ms")
+
+        loaded = subprocess.run([sys.executable, '-c', CHECK_SCRIPT], cwd=workdir, capture_output=True,
+                                text=True, check=True, env={**os.environ, 'PYTHONPATH': HERE}).stdout.strip()
+        print(f"heavy modules loaded     {loaded or 'none'}")
+        print(f"files created on import  {', '.join(os.listdir(workdir)) or 'none'}")
+
+        print("\nslowest imports made by transcript_api (cumulative):")
+        for micros, name in _slowest_imports(workdir, top):
+            print(f"  {micros / 1000:8.1f} ms  {name}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+import io
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import click
+from werkzeug.utils import secure_filename
+
+from word_export_utils import create_word_document
+
+
+# ─── Bulk export of notes to a zipped DOCX bundle ─────────────────────────────
+#
+# Notes are rendered with create_word_document on a process pool and written
+# into a zip archive as each one finishes. The archive is produced as a stream
+# of chunks, so it is never staged as a whole in memory or on disk.
+#
+# Pool workers are started from a forkserver (spawn where that is unavailable,
+# e.g. Windows), never forked from the web process: a fork would copy its
+# threads' locks, open SQLite connections and loaded models into every worker.
+# A worker that dies (OOM, a crash in lxml) breaks the whole pool; the shared
+# pool is then replaced and the notes it lost are rendered once more, so one
+# bad export does not fail every later one.
+
+NOTES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'notes')
+BULK_EXPORT_WORKERS = int(os.getenv('BULK_EXPORT_WORKERS', os.cpu_count() or 2))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+log = logging.getLogger(__name__)
+
+
+def _mp_context():
+    """Start method for pool workers: forkserver where supported, else spawn."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def get_pool():
+    """Shared process pool, created on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=BULK_EXPORT_WORKERS, mp_context=_mp_context())
+    return _pool
+
+
+def _discard_pool(pool):
+    """Drop a broken shared pool; the next get_pool() builds a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_note(file_path):
+    """Render one note file to .docx bytes. Runs in a pool worker; returns (title, data)."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith('.json'):
+            data = json.load(f)
+            title, content = data.get('title', ''), data.get('content', '')
+        else:
+            title, content = '', f.read()
+
+    buffer = io.BytesIO()
+    create_word_document(content, buffer)
+    return title, buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Non-seekable sink for ZipFile; written bytes are handed out with drain()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _entry_name(title, note_file, used):
+    stem = secure_filename(title) or os.path.splitext(note_file)[0]
+    name = f"{stem}.docx"
+    n = 2
+    while name in used:
+        name = f"{stem}_{n}.docx"
+        n += 1
+    used.add(name)
+    return name
+
+
+def _submit(pool, note_paths, shared):
+    """Submit render jobs; a shared pool found broken is replaced first. Returns (pool, futures)."""
+    try:
+        return pool, {pool.submit(render_note, path): path for path in note_paths}
+    except BrokenProcessPool:
+        if not shared:
+            raise
+        _discard_pool(pool)
+        pool = get_pool()
+        return pool, {pool.submit(render_note, path): path for path in note_paths}
+
+
+def stream_bundle(note_paths, pool=None):
+    """
+    Render the given note files in parallel and yield the bytes of a zip
+    archive, one chunk per finished document. Notes that fail to render are
+    replaced by a `<note>.error.txt` entry. With the shared pool, notes lost
+    to a dead worker are rendered once more on a new pool.
+    """
+    shared = pool is None
+    pool = pool or get_pool()
+    attempts = 2 if shared else 1
+    pending = list(note_paths)
+    sink = _ChunkSink()
+    used = set()
+
+    # Documents are already deflate-compressed, store them as-is
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for attempt in range(attempts):
+            pool, futures = _submit(pool, pending, shared)
+            pending = []
+            for future in as_completed(futures):
+                note_file = os.path.basename(futures[future])
+                try:
+                    title, data = future.result()
+                    archive.writestr(_entry_name(title, note_file, used), data)
+                except BrokenProcessPool as e:
+                    if shared:
+                        _discard_pool(pool)
+                    if attempt + 1 < attempts:
+                        pending.append(futures[future])
+                        continue
+                    log.error("Bulk export worker died", extra={'note': note_file})
+                    archive.writestr(f"{note_file}.error.txt", str(e))
+                except Exception as e:
+                    log.exception("Bulk export failed", extra={'note': note_file})
+                    archive.writestr(f"{note_file}.error.txt", str(e))
+                yield sink.drain()
+            if not pending:
+                break
+            log.warning("Bulk export pool broke, retrying on a new pool", extra={'notes': len(pending)})
+            pool = get_pool()
+    yield sink.drain()
+
+
+def resolve_note_paths(filenames, notes_dir=NOTES_DIR):
+    """Map note filenames to paths inside notes_dir. Returns (paths, missing)."""
+    paths, missing = [], []
+    for filename in dict.fromkeys(filenames):
+        safe = secure_filename(filename)
+        path = os.path.join(notes_dir, safe)
+        if safe.endswith(('.json', '.txt')) and os.path.isfile(path):
+            paths.append(path)
+        else:
+            missing.append(filename)
+    return paths, missing
+
+
+@click.command()
+@click.argument('notes', nargs=-1)
+@click.option('--output', '-o', type=click.Path(), required=True, help='Zip file to write')
+@click.option('--all', 'export_all', is_flag=True, help='Export every note in the notes directory')
+@click.option('--notes-dir', type=click.Path(exists=True, file_okay=False), default=NOTES_DIR, help='Notes directory')
+@click.option('--workers', type=int, default=None, help='Number of render processes')
+def main(notes, output: str, export_all: bool, notes_dir: str, workers: Optional[int]) -> None:
+    """Export notes to a zip of Word documents.
+
+    NOTES are note filenames (e.g. note_20250101_120000.json) in the notes directory.
+    """
+    if export_all:
+        notes = sorted(f for f in os.listdir(notes_dir) if f.endswith(('.json', '.txt')))
+    if not notes:
+        click.echo("Error: no notes given (pass filenames or --all)", err=True)
+        sys.exit(1)
+
+    paths, missing = resolve_note_paths(notes, notes_dir)
+    for filename in missing:
+        click.echo(f"Warning: note not found: {filename}", err=True)
+    if not paths:
+        sys.exit(1)
+
+    with ProcessPoolExecutor(max_workers=workers or BULK_EXPORT_WORKERS,
+                             mp_context=_mp_context()) as pool:
+        with open(output, 'wb') as f:
+            for chunk in stream_bundle(paths, pool):
+                f.write(chunk)
+    click.echo(f"Exported {len(paths)} notes to: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import time
+import uuid
+
+
+# ─── Resumable chunked uploads ────────────────────────────────────────────────
+#
+# Protocol:
+#   1. create a session with the file name and total size,
+#   2. PUT numbered chunks (any order, in parallel) with an X-Chunk-SHA256
+#      header; each chunk is streamed straight to its offset in a sparse
+#      part file and its checksum verified,
+#   3. finalize: once every chunk has arrived the part file is moved into
+#      the upload folder. Only then does the caller insert the `videos` row.
+#      The session is claimed first (state 'open' -> 'finalizing'), so of two
+#      concurrent finalize requests only one moves the file; the other gets 409.
+#
+# Session state lives in the `upload_sessions` / `upload_chunks` tables, so an
+# interrupted client can ask which chunks are still missing and resume.
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# Largest file a session may announce (single-request uploads stop at MAX_CONTENT_LENGTH)
+MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 4 * 1024 * 1024 * 1024))
+COPY_BUFFER_SIZE = 1024 * 1024
+SESSION_TTL = 24 * 3600
+
+
+class UploadError(Exception):
+    """A client error in the upload protocol; `status` is the HTTP status to return."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def total_chunks(session):
+    return max(1, -(-session['size'] // session['chunk_size']))
+
+
+def part_path(partial_dir, upload_id):
+    return os.path.join(partial_dir, f"{upload_id}.part")
+
+
+def create_session(conn, partial_dir, filename, title, size, chunk_size=None, sha256=None):
+    """Start an upload session and preallocate its part file. Returns the session dict."""
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    if size <= 0:
+        raise UploadError('File size must be positive')
+    if size > MAX_UPLOAD_SIZE:
+        raise UploadError(f'File is too large (limit {MAX_UPLOAD_SIZE} bytes)', 413)
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunk size must be between 1 and {MAX_CHUNK_SIZE} bytes')
+
+    cleanup_stale_sessions(conn, partial_dir)
+
+    upload_id = uuid.uuid4().hex
+    path = part_path(partial_dir, upload_id)
+    try:
+        with open(path, 'wb') as f:
+            f.truncate(size)  # sparse on most filesystems
+
+        conn.execute('INSERT INTO upload_sessions (id, filename, title, size, chunk_size, sha256, created_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     (upload_id, filename, title, size, chunk_size, sha256, time.time()))
+        conn.commit()
+    except BaseException:
+        # Without its session row nothing would ever clean the part file up
+        conn.rollback()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return get_session(conn, upload_id)
+
+
+def get_session(conn, upload_id):
+    c = conn.cursor()
+    c.execute('SELECT * FROM upload_sessions WHERE id = ?', (upload_id,))
+    row = c.fetchone()
+    if row is None:
+        raise UploadError('Upload session not found', 404)
+    return dict(row)
+
+
+def received_chunks(conn, upload_id):
+    c = conn.cursor()
+    c.execute('SELECT idx FROM upload_chunks WHERE upload_id = ? ORDER BY idx', (upload_id,))
+    return [row[0] for row in c.fetchall()]
+
+
+def session_status(conn, upload_id):
+    """Session info plus which chunks have arrived and which are missing."""
+    session = get_session(conn, upload_id)
+    received = received_chunks(conn, upload_id)
+    have = set(received)
+    return {
+        'upload_id': upload_id,
+        'filename': session['filename'],
+        'size': session['size'],
+        'chunk_size': session['chunk_size'],
+        'total_chunks': total_chunks(session),
+        'state': session['state'],
+        'received': received,
+        'missing': [i for i in range(total_chunks(session)) if i not in have],
+    }
+
+
+def write_chunk(conn, partial_dir, upload_id, index, stream, checksum):
+    """Stream one chunk to its offset in the part file and verify its SHA-256."""
+    session = get_session(conn, upload_id)
+    if not 0 <= index < total_chunks(session):
+        raise UploadError('Chunk index out of range')
+    if session['state'] != 'open':
+        raise UploadError('Upload is being finalized', 409)
+    if not checksum:
+        raise UploadError('X-Chunk-SHA256 header is required')
+
+    # The range is about to be rewritten; it only counts again once verified
+    conn.execute('DELETE FROM upload_chunks WHERE upload_id = ? AND idx = ?', (upload_id, index))
+    conn.commit()
+
+    offset = index * session['chunk_size']
+    expected = min(session['chunk_size'], session['size'] - offset)
+    digest = hashlib.sha256()
+    written = 0
+
+    with open(part_path(partial_dir, upload_id), 'r+b') as f:
+        f.seek(offset)
+        while True:
+            block = stream.read(COPY_BUFFER_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if written > expected:
+                # Stop before spilling into the next chunk's range
+                raise UploadError(f'Chunk {index} is larger than {expected} bytes')
+            digest.update(block)
+            f.write(block)
+
+    if written != expected:
+        raise UploadError(f'Chunk {index} has {written} bytes, expected {expected}')
+    if digest.hexdigest() != checksum.lower():
+        raise UploadError(f'Checksum mismatch for chunk {index}', 422)
+
+    conn.execute('INSERT OR REPLACE INTO upload_chunks (upload_id, idx, sha256) VALUES (?, ?, ?)',
+                 (upload_id, index, checksum.lower()))
+    conn.commit()
+    return written
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _unique_path(folder, filename):
+    stem, ext = os.path.splitext(filename)
+    path = os.path.join(folder, filename)
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(folder, f"{stem}_{n}{ext}")
+        n += 1
+    return path
+
+
+def finalize(conn, partial_dir, upload_folder, upload_id):
+    """
+    Check that every chunk arrived (and the whole-file checksum, if one was
+    given), move the part file into the upload folder and drop the session.
+    Returns (session, final filename).
+    """
+    claimed = conn.execute("UPDATE upload_sessions SET state = 'finalizing' WHERE id = ? AND state = 'open'",
+                           (upload_id,)).rowcount
+    conn.commit()
+    if not claimed:
+        get_session(conn, upload_id)  # 404 once the winner has dropped the session
+        raise UploadError('Upload is already being finalized', 409)
+
+    try:
+        status = session_status(conn, upload_id)
+        if status['missing']:
+            raise UploadError(f"{len(status['missing'])} chunks still missing", 409)
+
+        session = get_session(conn, upload_id)
+        src = part_path(partial_dir, upload_id)
+        if session['sha256'] and _file_sha256(src) != session['sha256'].lower():
+            raise UploadError('Checksum mismatch for assembled file', 422)
+
+        dest = _unique_path(upload_folder, session['filename'])
+        os.replace(src, dest)
+    except BaseException:
+        # Not moved: hand the session back so the client can fix it and finalize again
+        conn.rollback()
+        conn.execute("UPDATE upload_sessions SET state = 'open' WHERE id = ?", (upload_id,))
+        conn.commit()
+        raise
+    delete_session(conn, partial_dir, upload_id)
+    return session, os.path.basename(dest)
+
+
+def delete_session(conn, partial_dir, upload_id):
+    conn.execute('DELETE FROM upload_chunks WHERE upload_id = ?', (upload_id,))
+    conn.execute('DELETE FROM upload_sessions WHERE id = ?', (upload_id,))
+    conn.commit()
+    try:
+        os.remove(part_path(partial_dir, upload_id))
+    except FileNotFoundError:
+        pass
+
+
+def cleanup_stale_sessions(conn, partial_dir, ttl=SESSION_TTL):
+    """Drop sessions (and their part files) that were started more than `ttl` seconds ago."""
+    c = conn.cursor()
+    c.execute('SELECT id FROM upload_sessions WHERE created_at < ?', (time.time() - ttl,))
+    for row in c.fetchall():
+        delete_session(conn, partial_dir, row[0])
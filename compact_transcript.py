@@ -0,0 +1,153 @@
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+# ─── Compact transcript representation ────────────────────────────────────────
+#
+# A transcript as a list of {'text', 'start', 'duration'} dicts costs a dict,
+# two floats and a string per caption line. CompactTranscript keeps the same
+# data in three arrays and one string:
+#
+#   starts, durations  array('d'), seconds, sorted by start
+#   text               every segment's text concatenated
+#   offsets            array('I'), segment i is text[offsets[i]:offsets[i + 1]]
+#
+# Lookups by time are binary searches on `starts`. Segments may overlap
+# (YouTube captions often do), so window queries also look back by the
+# longest duration in the transcript.
+#
+# It iterates and indexes as the usual segment dicts, built on demand, so
+# it can be passed to code written for lists (combine_transcript, the
+# subtitle_formats writers).
+#
+# to_bytes() / from_bytes() give the storage format used in
+# video_transcripts.segments: a small header, then zlib-compressed
+# millisecond times, text offsets and UTF-8 text.
+
+MAGIC = b'CTS1'
+_HEADER = struct.Struct('<4sI')  # magic, segment count
+
+
+def _little_endian(arr):
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+
+class CompactTranscript:
+    """Array-backed, read-only sequence of transcript segments."""
+
+    __slots__ = ('starts', 'durations', 'text', 'offsets', 'max_duration')
+
+    def __init__(self, starts, durations, text, offsets):
+        self.starts = starts
+        self.durations = durations
+        self.text = text
+        self.offsets = offsets
+        self.max_duration = max(durations, default=0.0)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """Build from {'text', 'start', 'duration'} dicts (any iterable; sorted by start here)."""
+        rows = sorted((float(s['start']), max(0.0, float(s.get('duration') or 0.0)), s['text'])
+                      for s in segments)
+        starts, durations, offsets = array('d'), array('d'), array('I', [0])
+        parts = []
+        position = 0
+        for start, duration, text in rows:
+            starts.append(start)
+            durations.append(duration)
+            parts.append(text)
+            position += len(text)
+            offsets.append(position)
+        return cls(starts, durations, ''.join(parts), offsets)
+
+    # ── Sequence protocol ──
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('transcript segment index out of range')
+        return {'text': self.segment_text(index), 'start': self.starts[index], 'duration': self.durations[index]}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_list(self):
+        return list(self)
+
+    def segment_text(self, index):
+        return self.text[self.offsets[index]:self.offsets[index + 1]]
+
+    def end(self, index):
+        return self.starts[index] + self.durations[index]
+
+    # ── Time lookups ──
+
+    def index_at(self, t):
+        """Index of the segment being spoken at `t` seconds (the latest-starting one if several), or None."""
+        i = bisect_right(self.starts, t) - 1
+        floor = t - self.max_duration
+        while i >= 0 and self.starts[i] >= floor:
+            if t < self.end(i) or self.starts[i] == t:
+                return i
+            i -= 1
+        return None
+
+    def indexes_between(self, start, end):
+        """Indexes of the segments overlapping [start, end], in order."""
+        lo = bisect_left(self.starts, start - self.max_duration)
+        hi = bisect_right(self.starts, end)
+        return [i for i in range(lo, hi) if self.end(i) > start or self.starts[i] >= start]
+
+    def segment_at(self, t):
+        i = self.index_at(t)
+        return None if i is None else self[i]
+
+    def between(self, start, end):
+        """Segment dicts overlapping [start, end]."""
+        return [self[i] for i in self.indexes_between(start, end)]
+
+    # ── Serialization ──
+
+    def to_bytes(self):
+        starts = _little_endian(array('I', (int(round(s * 1000)) for s in self.starts)))
+        durations = _little_endian(array('I', (int(round(d * 1000)) for d in self.durations)))
+        offsets = _little_endian(array('I', self.offsets))
+        body = starts.tobytes() + durations.tobytes() + offsets.tobytes() + self.text.encode('utf-8')
+        return _HEADER.pack(MAGIC, len(self)) + zlib.compress(body)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, count = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a compact transcript')
+        body = zlib.decompress(memoryview(data)[_HEADER.size:])
+        arrays = []
+        position = 0
+        for length in (count, count, count + 1):
+            arr = array('I')
+            arr.frombytes(body[position:position + 4 * length])
+            arrays.append(_little_endian(arr))
+            position += 4 * length
+        starts, durations, offsets = arrays
+        return cls(array('d', (ms / 1000 for ms in starts)), array('d', (ms / 1000 for ms in durations)),
+                   body[position:].decode('utf-8'), offsets)
+
+    @classmethod
+    def load(cls, stored):
+        """Decode a stored transcript: compact bytes, or a JSON list (rows written before the compact format)."""
+        if isinstance(stored, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(bytes(stored))
+        import json
+        return cls.from_segments(json.loads(stored))
@@ -0,0 +1,92 @@
+import contextlib
+import os
+import queue
+import sqlite3
+
+
+# ─── Pooled SQLite connections ────────────────────────────────────────────────
+#
+# Opening a connection per request costs a file open, a schema parse and a
+# cold page cache, and throws away sqlite3's per-connection prepared-statement
+# cache. Instead connections are kept in two small pools:
+#
+#   writer  - read/write connections; SQLite allows one writer at a time in
+#             WAL mode, busy_timeout makes the others wait instead of failing
+#   reader  - read-only (mode=ro, query_only) connections that never block
+#             on the writer under WAL
+#
+# Every connection is tuned once when it is opened (see PRAGMAS) and keeps
+# its statement cache (CACHED_STATEMENTS) for as long as it lives in the pool.
+
+DATABASE_PATH = os.getenv('APP_DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.db')
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 8))
+BUSY_TIMEOUT_MS = 10000
+CACHED_STATEMENTS = 256
+
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',  # durable across app crashes; WAL fsyncs on checkpoint
+    'PRAGMA cache_size=-16000',  # 16 MB page cache per connection
+    'PRAGMA mmap_size=268435456',  # map up to 256 MB of the file instead of read() calls
+    'PRAGMA temp_store=MEMORY',
+    f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}',
+)
+
+
+def _connect(readonly):
+    if readonly:
+        conn = sqlite3.connect(f'file:{DATABASE_PATH}?mode=ro', uri=True, timeout=BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    else:
+        conn = sqlite3.connect(DATABASE_PATH, timeout=BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        if readonly and pragma.startswith('PRAGMA journal_mode'):
+            continue  # set by the writer; a read-only connection cannot change it
+        conn.execute(pragma)
+    if readonly:
+        conn.execute('PRAGMA query_only=ON')
+    return conn
+
+
+class ConnectionPool:
+    """A LIFO pool of tuned connections (LIFO keeps the warmest connection in use)."""
+
+    def __init__(self, readonly=False, size=POOL_SIZE):
+        self.readonly = readonly
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    @contextlib.contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = _connect(self.readonly)
+        try:
+            yield conn
+        finally:
+            # Never hand an open transaction (and the write lock) to the next user
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+writer = ConnectionPool(readonly=False)
+reader = ConnectionPool(readonly=True)
+
+
+def close_all():
+    """Close every idle pooled connection (e.g. before forking worker processes)."""
+    writer.close_all()
+    reader.close_all()
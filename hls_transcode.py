@@ -0,0 +1,103 @@
+import os
+import shutil
+import subprocess
+
+
+# ─── Adaptive-bitrate HLS renditions ──────────────────────────────────────────
+#
+# Each upload is transcoded offline into an HLS ladder: one ffmpeg run scales
+# the source to every rung not taller than the original and writes
+#
+#   <out_dir>/master.m3u8
+#   <out_dir>/<height>p/index.m3u8, <out_dir>/<height>p/seg_00000.ts, ...
+#
+# Keyframes are forced on segment boundaries so players can switch rungs at
+# any segment. Transcodes run as 'transcode_hls' jobs on the durable job
+# queue (job_queue.py), so a restart mid-transcode only means the job is
+# picked up again.
+
+TRANSCODE_TIMEOUT = 6 * 3600
+SEGMENT_SECONDS = 6
+X264_PRESET = os.getenv('HLS_X264_PRESET', 'veryfast')
+
+# (height, video kbps, audio kbps)
+RENDITION_LADDER = [
+    (1080, 5000, 192),
+    (720, 2800, 128),
+    (480, 1400, 128),
+    (360, 800, 96),
+    (240, 400, 64),
+]
+
+def build_ladder(source_height):
+    """Rungs not taller than the source; always at least the smallest one."""
+    ladder = [rung for rung in RENDITION_LADDER if rung[0] <= (source_height or 0)]
+    return ladder or [RENDITION_LADDER[-1]]
+
+
+def _ffmpeg_command(path, out_dir, ladder, has_audio):
+    n = len(ladder)
+    splits = ''.join(f'[s{i}]' for i in range(n))
+    filters = [f'[0:v]split={n}{splits}']
+    filters += [f'[s{i}]scale=-2:{height}[v{i}]' for i, (height, _, _) in enumerate(ladder)]
+
+    cmd = ['ffmpeg', '-y', '-v', 'error', '-i', path, '-filter_complex', ';'.join(filters)]
+    stream_map = []
+    for i, (height, video_kbps, audio_kbps) in enumerate(ladder):
+        cmd += [
+            '-map', f'[v{i}]',
+            f'-c:v:{i}', 'libx264', f'-b:v:{i}', f'{video_kbps}k',
+            f'-maxrate:v:{i}', f'{int(video_kbps * 1.07)}k', f'-bufsize:v:{i}', f'{video_kbps * 2}k',
+        ]
+        if has_audio:
+            cmd += ['-map', 'a:0', f'-c:a:{i}', 'aac', f'-b:a:{i}', f'{audio_kbps}k']
+            stream_map.append(f'v:{i},a:{i},name:{height}p')
+        else:
+            stream_map.append(f'v:{i},name:{height}p')
+
+    if has_audio:
+        cmd += ['-ac', '2']
+    cmd += [
+        '-preset', X264_PRESET, '-sc_threshold', '0',
+        '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})',
+        '-f', 'hls', '-hls_time', str(SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', os.path.join(out_dir, '%v', 'seg_%05d.ts'),
+        '-master_pl_name', 'master.m3u8',
+        '-var_stream_map', ' '.join(stream_map),
+        os.path.join(out_dir, '%v', 'index.m3u8'),
+    ]
+    return cmd
+
+
+def transcode(path, out_dir, info):
+    """
+    Transcode `path` into an HLS ladder in `out_dir`, using the probe info
+    (height, audio_codec) from media_probe. Returns the rendition metadata.
+    """
+    if shutil.which('ffmpeg') is None:
+        raise RuntimeError('ffmpeg not found on PATH')
+
+    # Start from a clean directory so a re-run never mixes old segments in
+    shutil.rmtree(out_dir, ignore_errors=True)
+    ladder = build_ladder(info.get('height'))
+    for height, _, _ in ladder:
+        # %v in the output paths expands to the rendition name
+        os.makedirs(os.path.join(out_dir, f'{height}p'), exist_ok=True)
+
+    has_audio = bool(info.get('audio_codec'))
+    subprocess.run(_ffmpeg_command(path, out_dir, ladder, has_audio),
+                   capture_output=True, check=True, timeout=TRANSCODE_TIMEOUT)
+
+    source_w, source_h = info.get('width'), info.get('height')
+    renditions = []
+    for height, video_kbps, audio_kbps in ladder:
+        width = round(source_w * height / source_h / 2) * 2 if source_w and source_h else None
+        renditions.append({
+            'name': f'{height}p',
+            'width': width,
+            'height': height,
+            'bandwidth': (video_kbps + (audio_kbps if has_audio else 0)) * 1000,
+            'playlist': f'{height}p/index.m3u8',
+        })
+    return renditions
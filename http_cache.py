@@ -0,0 +1,128 @@
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import g, request
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+
+# ─── HTTP caching / compression layer ─────────────────────────────────────────
+#
+# Registered as an after_request hook on the Flask app. For JSON responses it
+#   - adds a strong ETag (hash of the body) and a Last-Modified header,
+#   - answers conditional GETs (If-None-Match / If-Modified-Since) with 304,
+#   - compresses large bodies with brotli or gzip and streams them in chunks.
+#
+# Routes that know when their data last changed can set `g.last_modified`
+# (a unix timestamp); otherwise the first time a given body was served is used.
+
+COMPRESS_MIN_SIZE = 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_FIRST_SEEN_MAX = 4096
+_first_seen = OrderedDict()
+
+ENCODING_SUFFIX = {'br': '-br', 'gzip': '-gz'}
+
+
+def _first_seen_time(etag):
+    """When a body with this ETag was first served (bounded LRU)."""
+    ts = _first_seen.get(etag)
+    if ts is None:
+        ts = time.time()
+        _first_seen[etag] = ts
+        if len(_first_seen) > _FIRST_SEEN_MAX:
+            _first_seen.popitem(last=False)
+    else:
+        _first_seen.move_to_end(etag)
+    return ts
+
+
+def _choose_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def _gzip_chunks(body):
+    comp = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for i in range(0, len(body), STREAM_CHUNK_SIZE):
+        data = comp.compress(body[i:i + STREAM_CHUNK_SIZE])
+        if data:
+            yield data
+    yield comp.flush()
+
+
+def _brotli_chunks(body):
+    comp = brotli.Compressor(quality=BROTLI_QUALITY)
+    for i in range(0, len(body), STREAM_CHUNK_SIZE):
+        data = comp.process(body[i:i + STREAM_CHUNK_SIZE])
+        if data:
+            yield data
+    yield comp.finish()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return any(request.if_none_match.contains(etag + suffix) for suffix in ('', *ENCODING_SUFFIX.values()))
+    since = request.if_modified_since
+    if since is not None:
+        return int(last_modified) <= int(since.timestamp())
+    return False
+
+
+def add_caching_headers(response):
+    """after_request hook: validators, conditional GETs and compression for JSON bodies."""
+    if (response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    encoding = _choose_encoding() if len(body) >= COMPRESS_MIN_SIZE else None
+    response.vary.add('Accept-Encoding')
+
+    if request.method in ('GET', 'HEAD'):
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        last_modified = getattr(g, 'last_modified', None) or _first_seen_time(etag)
+        response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+        response.headers['Cache-Control'] = 'no-cache'
+        # Each encoded representation needs its own strong validator
+        response.set_etag(etag + ENCODING_SUFFIX.get(encoding, ''))
+
+        not_modified = _not_modified(etag, last_modified)
+        if request.if_none_match or request.if_modified_since:
+            # Only revalidations count: a plain GET can never be a hit
+            metrics.cache_result('http_conditional', not_modified)
+        if not_modified:
+            response.status_code = 304
+            response.set_data(b'')
+            response.headers.pop('Content-Length', None)
+            return response
+
+    if encoding is None:
+        return response
+
+    response.headers['Content-Encoding'] = encoding
+    response.headers.pop('Content-Length', None)
+    response.response = _brotli_chunks(body) if encoding == 'br' else _gzip_chunks(body)
+    return response
+
+
+def init_http_cache(app):
+    """Register the caching / compression layer on a Flask app."""
+    app.after_request(add_caching_headers)
+    return app
@@ -0,0 +1,420 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+# ─── Durable job queue ────────────────────────────────────────────────────────
+#
+# Heavy work (ASR, Groq summaries, DOCX rendering) runs as jobs stored in the
+# `jobs` table of app.db, so queued and in-flight work survives restarts and
+# any process that opens app.db can run it: the web processes themselves
+# (JOB_WORKERS threads each, see transcript_api.start_job_workers) and any
+# number of standalone `python worker.py` processes. Several hosts can share
+# the queue only if they share app.db and the uploads folder on storage with
+# working file locks (SQLite must not be used over NFS).
+#
+# Life of a job:
+#   queued   -> claim() leases it to one worker for LEASE_SECONDS (atomic,
+#               under BEGIN IMMEDIATE); attempts + 1
+#   running  -> the worker renews the lease every LEASE_SECONDS / 4 while the
+#               handler runs (heartbeat); complete() -> done
+#            -> fail(): back to queued after an exponential backoff, or to
+#               dead (the dead-letter state) once max_attempts are used up
+#            -> lease expired (the worker crashed or hung): the next claim()
+#               anywhere requeues it, or dead-letters it if out of attempts
+#
+# Handlers are registered per kind with @handler(kind); they receive the
+# payload and the Job, return a JSON-serializable result and may attach a
+# binary artifact (job.artifact, e.g. a .docx) that is stored with it.
+# @handler(kind, on_dead=fn) also registers fn(conn, payload, error), run in
+# the same transaction whenever a job of that kind is dead-lettered (failed
+# last attempt or expired lease), to release state the job was holding,
+# e.g. a 'processing' status on its videos row.
+# dedupe_key keeps at most one queued/running job per key.
+#
+# Finished jobs are purged by the workers (purge(), at most once per
+# PURGE_INTERVAL_SECONDS per process): artifacts after JOB_ARTIFACT_TTL_HOURS,
+# done and dead rows after JOB_RETENTION_DAYS.
+
+LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', 120))
+POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 1.0))
+MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+ARTIFACT_TTL_SECONDS = float(os.getenv('JOB_ARTIFACT_TTL_HOURS', 24)) * 3600
+RETENTION_SECONDS = float(os.getenv('JOB_RETENTION_DAYS', 7)) * 86400
+PURGE_INTERVAL_SECONDS = 3600
+
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 10
+
+STATUSES = ('queued', 'running', 'done', 'dead')
+
+_handlers = {}
+_on_dead = {}
+
+
+def handler(kind, on_dead=None):
+    """Register fn(payload, job) -> result as the handler of a job kind."""
+    def register(fn):
+        _handlers[kind] = fn
+        if on_dead is not None:
+            _on_dead[kind] = on_dead
+        return fn
+    return register
+
+
+def _dead_lettered(conn, kind, payload, error):
+    """Run the on_dead hook of `kind`; a failing hook is logged and never blocks dead-lettering."""
+    hook = _on_dead.get(kind)
+    if hook is None:
+        return
+    conn.execute('SAVEPOINT on_dead')
+    try:
+        hook(conn, json.loads(payload) if isinstance(payload, str) else payload, error)
+    except Exception:
+        conn.execute('ROLLBACK TO on_dead')
+        log.exception("on_dead hook failed", extra={'kind': kind})
+    conn.execute('RELEASE on_dead')
+
+
+def kinds():
+    return list(_handlers)
+
+
+class Job:
+    """A claimed job as seen by its handler."""
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.kind = row['kind']
+        self.payload = json.loads(row['payload'])
+        self.priority = row['priority']
+        self.attempts = row['attempts']
+        self.max_attempts = row['max_attempts']
+        self.artifact = None  # bytes stored with the result, if the handler sets it
+
+    @property
+    def last_attempt(self):
+        return self.attempts >= self.max_attempts
+
+
+def init_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL, -- JSON
+            status TEXT NOT NULL DEFAULT 'queued', -- queued, running, done, dead
+            priority INTEGER NOT NULL DEFAULT 10, -- lower runs first
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            run_after REAL NOT NULL, -- not claimed before this unix time (retry backoff)
+            lease_owner TEXT,
+            lease_expires REAL,
+            dedupe_key TEXT,
+            result TEXT, -- JSON
+            artifact BLOB,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            finished_at REAL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs (status, lease_expires)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at)')
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key) "
+                 "WHERE status IN ('queued', 'running')")
+
+
+def enqueue(conn, kind, payload, priority=PRIORITY_LOW, max_attempts=MAX_ATTEMPTS, dedupe_key=None, delay=0):
+    """
+    Add a job and return its id (or the id of the active job with the same
+    dedupe_key). Does not commit, so it can share a transaction with the
+    caller's own writes.
+    """
+    now = time.time()
+    try:
+        c = conn.execute(
+            'INSERT INTO jobs (kind, payload, priority, max_attempts, run_after, dedupe_key, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (kind, json.dumps(payload), priority, max_attempts, now + delay, dedupe_key, now, now))
+        return c.lastrowid
+    except sqlite3.IntegrityError:
+        row = conn.execute("SELECT id FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+                           (dedupe_key,)).fetchone()
+        if row is None:
+            raise
+        return row['id']
+
+
+def is_active(conn, dedupe_key):
+    """True while a job with this dedupe_key is queued or running."""
+    return conn.execute("SELECT 1 FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')",
+                        (dedupe_key,)).fetchone() is not None
+
+
+def _backoff(attempts):
+    return min(RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1), RETRY_MAX_SECONDS)
+
+
+def _reap_expired(conn, now):
+    """Requeue (or dead-letter) running jobs whose worker stopped renewing the lease."""
+    expired = conn.execute("SELECT id, kind, payload, attempts, max_attempts, lease_owner FROM jobs "
+                           "WHERE status = 'running' AND lease_expires < ?", (now,)).fetchall()
+    for row in expired:
+        dead = row['attempts'] >= row['max_attempts']
+        error = f"Lease expired (worker {row['lease_owner']} lost)"
+        conn.execute('UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, run_after = ?, '
+                     'error = ?, updated_at = ?, finished_at = ? WHERE id = ?',
+                     ('dead' if dead else 'queued', now, error, now, now if dead else None, row['id']))
+        if dead:
+            _dead_lettered(conn, row['kind'], row['payload'], error)
+        log.warning("Job lease expired", extra={'job_id': row['id'], 'kind': row['kind'],
+                                                'owner': row['lease_owner'], 'dead': dead})
+
+
+def claim(conn, owner, kinds=None, lease=LEASE_SECONDS):
+    """Lease the next runnable job to `owner` and return it as a Job, or None. Commits."""
+    now = time.time()
+    conn.execute('BEGIN IMMEDIATE')  # one claimer at a time across all processes
+    try:
+        _reap_expired(conn, now)
+        query = "SELECT * FROM jobs WHERE status = 'queued' AND run_after <= ?"
+        params = [now]
+        if kinds:
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += list(kinds)
+        row = conn.execute(query + ' ORDER BY priority, id LIMIT 1', params).fetchone()
+        if row is not None:
+            conn.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?, "
+                         "lease_expires = ?, updated_at = ? WHERE id = ?", (owner, now + lease, now, row['id']))
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return Job(row) if row is not None else None
+
+
+def heartbeat(conn, job_id, owner, lease=LEASE_SECONDS):
+    """Extend a lease. False if `owner` no longer holds it. Commits."""
+    now = time.time()
+    c = conn.execute("UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                     "WHERE id = ? AND status = 'running' AND lease_owner = ?", (now + lease, now, job_id, owner))
+    conn.commit()
+    return c.rowcount == 1
+
+
+def complete(conn, job, owner, result=None):
+    """Store the result (and job.artifact). False if the lease was lost meanwhile. Commits."""
+    now = time.time()
+    c = conn.execute("UPDATE jobs SET status = 'done', result = ?, artifact = ?, error = NULL, lease_owner = NULL, "
+                     "lease_expires = NULL, updated_at = ?, finished_at = ? "
+                     "WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                     (json.dumps(result), job.artifact, now, now, job.id, owner))
+    conn.commit()
+    return c.rowcount == 1
+
+
+def fail(conn, job, owner, error):
+    """Schedule a retry with backoff, or dead-letter the job on its last attempt. Commits."""
+    now = time.time()
+    dead = job.last_attempt
+    c = conn.execute("UPDATE jobs SET status = ?, error = ?, run_after = ?, lease_owner = NULL, lease_expires = NULL, "
+                     "updated_at = ?, finished_at = ? WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                     ('dead' if dead else 'queued', error, now + (0 if dead else _backoff(job.attempts)),
+                      now, now if dead else None, job.id, owner))
+    if dead and c.rowcount == 1:
+        _dead_lettered(conn, job.kind, job.payload, error)
+    conn.commit()
+    return c.rowcount == 1
+
+
+def retry(conn, job_id):
+    """Put a dead-lettered job back in the queue with a fresh attempt budget. Commits."""
+    now = time.time()
+    try:
+        c = conn.execute("UPDATE jobs SET status = 'queued', attempts = 0, run_after = ?, error = NULL, "
+                         "updated_at = ?, finished_at = NULL WHERE id = ? AND status = 'dead'", (now, now, job_id))
+    except sqlite3.IntegrityError:
+        return False  # an equivalent job (same dedupe_key) is already queued
+    conn.commit()
+    return c.rowcount == 1
+
+
+def job_to_dict(row):
+    return {
+        'id': row['id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'priority': row['priority'],
+        'attempts': row['attempts'],
+        'max_attempts': row['max_attempts'],
+        'error': row['error'],
+        'result': json.loads(row['result']) if row['result'] else None,
+        'has_artifact': row['has_artifact'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'],
+        'finished_at': row['finished_at'],
+        'run_after': row['run_after'] if row['status'] == 'queued' else None,
+    }
+
+
+_SUMMARY_COLUMNS = ('id, kind, status, priority, attempts, max_attempts, error, result, created_at, updated_at, '
+                    'finished_at, run_after, artifact IS NOT NULL AS has_artifact')
+
+
+def get(conn, job_id):
+    """A job as a dict (without payload and artifact), or None."""
+    row = conn.execute(f'SELECT {_SUMMARY_COLUMNS} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return job_to_dict(row) if row else None
+
+
+def get_artifact(conn, job_id):
+    row = conn.execute("SELECT artifact FROM jobs WHERE id = ? AND status = 'done'", (job_id,)).fetchone()
+    return row['artifact'] if row else None
+
+
+def list_jobs(conn, status=None, kind=None, limit=50):
+    """Most recently updated jobs first."""
+    where, params = [], []
+    if status:
+        where.append('status = ?')
+        params.append(status)
+    if kind:
+        where.append('kind = ?')
+        params.append(kind)
+    query = f'SELECT {_SUMMARY_COLUMNS} FROM jobs'
+    if where:
+        query += ' WHERE ' + ' AND '.join(where)
+    query += ' ORDER BY updated_at DESC LIMIT ?'
+    params.append(limit)
+    return [job_to_dict(row) for row in conn.execute(query, params)]
+
+
+def purge(conn, artifact_ttl=ARTIFACT_TTL_SECONDS, retention=RETENTION_SECONDS):
+    """Drop old artifacts and old done/dead jobs. Returns (artifacts, jobs) removed. Commits."""
+    now = time.time()
+    artifacts = conn.execute('UPDATE jobs SET artifact = NULL WHERE finished_at < ? AND artifact IS NOT NULL',
+                             (now - artifact_ttl,)).rowcount
+    jobs = conn.execute("DELETE FROM jobs WHERE finished_at < ? AND status IN ('done', 'dead')",
+                        (now - retention,)).rowcount
+    conn.commit()
+    if artifacts or jobs:
+        log.info("Purged finished jobs", extra={'artifacts': artifacts, 'jobs': jobs})
+    return artifacts, jobs
+
+
+def count(conn, status='queued', kind=None):
+    if kind is None:
+        return conn.execute('SELECT count(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+    return conn.execute('SELECT count(*) FROM jobs WHERE status = ? AND kind = ?', (status, kind)).fetchone()[0]
+
+
+# ─── Workers ──────────────────────────────────────────────────────────────────
+
+class Worker:
+    """
+    Threads that claim and run jobs until stop(). `connect` is a context
+    manager factory yielding a read/write connection (e.g. db_pool.writer.connection).
+    """
+
+    def __init__(self, connect, threads=1, kinds=None, name=None, lease=LEASE_SECONDS, poll=POLL_SECONDS):
+        self.connect = connect
+        self.threads = threads
+        self.kinds = list(kinds) if kinds else None
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.lease = lease
+        self.poll = poll
+        self._stop = threading.Event()
+        self._threads = []
+        self._purge_lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def start(self):
+        for n in range(self.threads):
+            thread = threading.Thread(target=self._loop, args=(f'{self.name}/{n}',), name=f'job-worker-{n}',
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        log.info("Job worker started", extra={'worker': self.name, 'threads': self.threads,
+                                              'kinds': ','.join(self.kinds or kinds())})
+        return self
+
+    def stop(self, timeout=None):
+        """Stop claiming; wait up to `timeout` seconds for running jobs. True if all finished."""
+        self._stop.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in self._threads)
+
+    def _maybe_purge(self):
+        with self._purge_lock:
+            if time.monotonic() < self._next_purge:
+                return
+            self._next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+        try:
+            with self.connect() as conn:
+                purge(conn)
+        except Exception:
+            log.exception("Purging finished jobs failed")
+
+    def _loop(self, owner):
+        while not self._stop.is_set():
+            self._maybe_purge()
+            try:
+                with self.connect() as conn:
+                    job = claim(conn, owner, self.kinds or kinds(), self.lease)
+            except Exception:
+                log.exception("Claiming a job failed", extra={'worker': owner})
+                job = None
+            if job is None:
+                self._stop.wait(self.poll)
+                continue
+            try:
+                self._run(job, owner)
+            except Exception:
+                # Recording the outcome failed; the lease will expire and the job be retried
+                log.exception("Job bookkeeping failed", extra={'job_id': job.id, 'worker': owner})
+
+    def _heartbeat(self, job, owner, done):
+        while not done.wait(self.lease / 4):
+            try:
+                with self.connect() as conn:
+                    if not heartbeat(conn, job.id, owner, self.lease):
+                        log.warning("Job lease lost", extra={'job_id': job.id, 'worker': owner})
+                        return
+            except Exception:
+                log.exception("Job heartbeat failed", extra={'job_id': job.id})
+
+    def _run(self, job, owner):
+        start = time.perf_counter()
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job, owner, done), daemon=True)
+        beat.start()
+        error = None
+        try:
+            result = _handlers[job.kind](job.payload, job)
+        except Exception as e:
+            log.exception("Job failed", extra={'job_id': job.id, 'kind': job.kind, 'attempt': job.attempts,
+                                               'dead': job.last_attempt})
+            error = str(e) or type(e).__name__
+        else:
+            log.info("Job done", extra={'job_id': job.id, 'kind': job.kind,
+                                        'seconds': round(time.perf_counter() - start, 3)})
+        finally:
+            done.set()
+            beat.join()
+        with self.connect() as conn:
+            recorded = complete(conn, job, owner, result) if error is None else fail(conn, job, owner, error)
+        if not recorded:
+            log.warning("Job outcome discarded: lease was lost", extra={'job_id': job.id, 'worker': owner})
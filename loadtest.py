@@ -0,0 +1,332 @@
+"""
+Load test replaying the CoursePlayer flow against the Python backend:
+
+    login -> list videos -> transcript -> summarize -> save note -> export docx
+
+(then the note is deleted again so repeated runs don't fill notes/).
+
+YouTube captions and the Groq API are replaced by local stub servers with
+configurable latency and failure injection; the backend is pointed at them
+through YOUTUBE_CAPTIONS_URL and GROQ_BASE_URL. By default the backend is
+started as a subprocess on a scratch database; pass --target to test a
+server that is already running (start it with those variables yourself).
+
+    python loadtest.py --users 16 --iterations 10 --groq-latency 800 --groq-failure-rate 0.05
+    python loadtest.py --server gunicorn --users 64 --duration 60 --report report.json
+"""
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+import requests
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ('login', 'list_videos', 'transcript', 'summarize', 'save_note', 'export_docx', 'delete_note')
+
+LOREM = ("today we look at how the fourier transform turns a signal into its frequencies and why the "
+         "complex exponential e to the i omega t is the right basis for linear time invariant systems").split()
+
+
+# ─── Stub upstream services ───────────────────────────────────────────────────
+
+class StubConfig:
+    def __init__(self, latency_ms, jitter_ms, failure_rate):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+
+    def should_fail(self):
+        return random.random() < self.failure_rate
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject(self):
+        """Apply latency; True (and a 503 sent) when this request should fail."""
+        self.config.delay()
+        if self.config.should_fail():
+            self._send_json(503, {'error': {'message': 'injected failure'}})
+            return True
+        return False
+
+
+class YouTubeStubHandler(_StubHandler):
+    """GET /captions/<video_id>: a deterministic, ~10 minute caption track."""
+
+    def do_GET(self):
+        if not self.path.startswith('/captions/'):
+            return self._send_json(404, {'error': 'not found'})
+        if self._inject():
+            return
+        rng = random.Random(self.path)
+        segments, start = [], 0.0
+        for _ in range(200):
+            duration = round(rng.uniform(2.0, 4.0), 2)
+            segments.append({'text': ' '.join(rng.choices(LOREM, k=rng.randint(6, 14))),
+                             'start': round(start, 2), 'duration': duration})
+            start += duration
+        self._send_json(200, segments)
+
+
+class GroqStubHandler(_StubHandler):
+    """POST .../chat/completions: an OpenAI-style completion with token usage."""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            return self._send_json(404, {'error': {'message': 'not found'}})
+        if self._inject():
+            return
+        prompt = ' '.join(m.get('content', '') for m in request.get('messages', []))
+        topic = abs(hash(prompt)) % 1000
+        content = (f"TITLE: Lecture {topic}\n# Lecture {topic}\n\n## Key ideas\n\n"
+                   f"- The **Fourier transform** maps $f(t)$ to $\\hat{{f}}(\\omega)$.\n"
+                   f"- Basis: $$e^{{i \\omega t}}$$\n\n```python\nimport numpy as np\nnp.fft.fft(x)\n```\n")
+        self._send_json(200, {
+            'id': f'chatcmpl-{topic}', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4,
+                      'total_tokens': (len(prompt) + len(content)) // 4},
+        })
+
+
+def start_stub(handler, config):
+    handler = type(handler.__name__, (handler,), {'config': config})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ─── Backend under test ───────────────────────────────────────────────────────
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_backend(server, workers, env, workdir):
+    port = _free_port()
+    env = {**os.environ, **env, 'PORT': str(port), 'APP_DB_PATH': os.path.join(workdir, 'app.db')}
+    if server == 'gunicorn':
+        cmd = [sys.executable, os.path.join(HERE, 'serve.py'), '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--no-preload-whisper']
+    else:
+        cmd = [sys.executable, os.path.join(HERE, 'transcript_api.py')]
+    log = open(os.path.join(workdir, 'backend.log'), 'wb')
+    process = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            log.close()
+            with open(log.name, 'rb') as f:
+                tail = f.read()[-2000:].decode('utf-8', 'replace')
+            raise click.ClickException(f"backend exited:\n{tail}")
+        try:
+            if requests.get(f"{base}/api/ready", timeout=1).status_code == 200:
+                return process, base
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise click.ClickException('backend did not become ready within 60s')
+
+
+# ─── Virtual users ────────────────────────────────────────────────────────────
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)  # endpoint -> [(latency_s, ok)]
+
+    def call(self, endpoint, fn, *args, check=None, **kwargs):
+        """Time one request; it fails on a 4xx/5xx, a connection error or a false `check(response)`."""
+        start = time.perf_counter()
+        try:
+            response = fn(*args, **kwargs)
+            ok = response.status_code < 400 and (check is None or check(response))
+        except (requests.RequestException, ValueError):
+            response, ok = None, False
+        with self._lock:
+            self.samples[endpoint].append((time.perf_counter() - start, ok))
+        return response if ok else None
+
+
+def course_player_flow(session, base, recorder, user):
+    """One pass through the CoursePlayer screens; stops at the first failed step."""
+    if not recorder.call('login', session.post, f"{base}/api/auth/login",
+                         json={'username': 'student', 'password': 'student123'}):
+        return
+    listing = recorder.call('list_videos', session.get, f"{base}/api/videos", params={'limit': 20})
+    if not listing:
+        return
+    youtube = [v for v in listing.json()['videos'] if v['type'] == 'youtube' and v['url']]
+    if not youtube:
+        return
+    video = random.choice(youtube)
+
+    # The backend answers 200 with no segments when captions can't be fetched
+    transcript = recorder.call('transcript', session.post, f"{base}/api/transcript", json={'url': video['url']},
+                               check=lambda r: bool(r.json().get('transcripts')))
+    if not transcript:
+        return
+    text = ' '.join(t['text'] for t in transcript.json()['transcripts'])
+
+    summary = recorder.call('summarize', session.post, f"{base}/api/summarize", json={'transcript': text})
+    if not summary:
+        return
+    title, content = summary.json()['title'], summary.json()['summary']
+
+    saved = recorder.call('save_note', session.post, f"{base}/api/notes",
+                          json={'title': f"{title} (load test user {user})", 'content': content})
+    recorder.call('export_docx', session.post, f"{base}/api/export-docx", json={'content': content, 'title': title})
+    if saved and saved.json().get('filename'):
+        recorder.call('delete_note', session.delete, f"{base}/api/notes/{saved.json()['filename']}")
+
+
+def run_user(base, recorder, user, iterations, deadline):
+    with requests.Session() as session:
+        n = 0
+        while (iterations and n < iterations) or (not iterations and time.time() < deadline):
+            course_player_flow(session, base, recorder, user)
+            n += 1
+
+
+# ─── Report ───────────────────────────────────────────────────────────────────
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))]
+
+
+def summarize(recorder, elapsed):
+    report = {}
+    for endpoint in ENDPOINTS:
+        samples = recorder.samples.get(endpoint, [])
+        latencies = sorted(latency for latency, _ in samples)
+        errors = sum(1 for _, ok in samples if not ok)
+        report[endpoint] = {
+            'requests': len(samples),
+            'errors': errors,
+            'error_rate': errors / len(samples) if samples else 0.0,
+            'throughput_rps': len(samples) / elapsed if elapsed else 0.0,
+            'mean_ms': statistics.mean(latencies) * 1000 if latencies else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+        }
+    return report
+
+
+def print_report(report, elapsed):
+    print(f"\n{'endpoint':<12} {'reqs':>7} {'rps':>8} {'err %':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, row in report.items():
+        if not row['requests']:
+            continue
+        print(f"{endpoint:<12} {row['requests']:>7} {row['throughput_rps']:>8.1f} {row['error_rate'] * 100:>7.2f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    total = sum(row['requests'] for row in report.values())
+    errors = sum(row['errors'] for row in report.values())
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), {errors} errors")
+
+
+@click.command()
+@click.option('--target', default=None, help='URL of a running backend (default: start one)')
+@click.option('--server', type=click.Choice(['dev', 'gunicorn']), default='dev', show_default=True,
+              help='How to start the backend when no --target is given')
+@click.option('--workers', default=4, show_default=True, help='gunicorn workers')
+@click.option('--users', '-u', default=8, show_default=True, help='Concurrent virtual users')
+@click.option('--iterations', '-n', default=5, show_default=True, help='Flows per user (0 = run for --duration)')
+@click.option('--duration', default=30, show_default=True, help='Seconds to run when --iterations is 0')
+@click.option('--youtube-latency', default=150.0, show_default=True, help='Mean caption stub latency (ms)')
+@click.option('--groq-latency', default=1500.0, show_default=True, help='Mean Groq stub latency (ms)')
+@click.option('--jitter', default=0.25, show_default=True, help='Latency std-dev as a fraction of the mean')
+@click.option('--youtube-failure-rate', default=0.0, show_default=True, help='Fraction of caption requests failing')
+@click.option('--groq-failure-rate', default=0.0, show_default=True, help='Fraction of Groq requests failing')
+@click.option('--report', 'report_path', type=click.Path(), default=None, help='Also write the report as JSON')
+def main(target, server, workers, users, iterations, duration, youtube_latency, groq_latency, jitter,
+         youtube_failure_rate, groq_failure_rate, report_path):
+    """Replay the CoursePlayer flow at a given concurrency and report latency per endpoint."""
+    youtube, youtube_url = start_stub(YouTubeStubHandler,
+                                      StubConfig(youtube_latency, youtube_latency * jitter, youtube_failure_rate))
+    groq, groq_url = start_stub(GroqStubHandler, StubConfig(groq_latency, groq_latency * jitter, groq_failure_rate))
+    print(f"YouTube captions stub: {youtube_url}")
+    print(f"Groq API stub:         {groq_url}")
+
+    workdir = tempfile.mkdtemp(prefix='loadtest_')
+    process = None
+    try:
+        if target:
+            base = target.rstrip('/')
+        else:
+            process, base = start_backend(server, workers, {
+                'YOUTUBE_CAPTIONS_URL': youtube_url,
+                'GROQ_BASE_URL': groq_url,
+                'GROQ_API_KEY': 'load-test',
+                'LOG_LEVEL': 'WARNING',
+            }, workdir)
+        print(f"Backend:               {base}")
+        print(f"{users} users x {iterations or f'{duration}s'} flows")
+
+        recorder = Recorder()
+        deadline = time.time() + duration
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            for future in [pool.submit(run_user, base, recorder, user, iterations, deadline) for user in range(users)]:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        report = summarize(recorder, elapsed)
+        print_report(report, elapsed)
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump({'elapsed_s': elapsed, 'users': users, 'endpoints': report}, f, indent=2)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        youtube.shutdown()
+        groq.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
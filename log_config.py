@@ -0,0 +1,47 @@
+import logging
+import os
+
+
+# ─── Structured logging ───────────────────────────────────────────────────────
+#
+# Log lines are written to stderr in logfmt ("key=value") so they can be
+# grepped and ingested without parsing free text:
+#
+#   ts=2024-05-01T10:00:00 level=INFO logger=transcript_api msg="Transcribed audio file" segments=42
+#
+# Fields passed with `extra={...}` become extra key=value pairs. The level
+# comes from LOG_LEVEL (default INFO); DEBUG adds per-segment Whisper output.
+
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+def _quote(value):
+    text = str(value)
+    if text and not any(c in text for c in ' "=\n'):
+        return text
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+class LogfmtFormatter(logging.Formatter):
+    def format(self, record):
+        fields = [
+            ('ts', self.formatTime(record, '%Y-%m-%dT%H:%M:%S')),
+            ('level', record.levelname),
+            ('logger', record.name),
+            ('msg', record.getMessage()),
+        ]
+        fields += [(key, value) for key, value in vars(record).items() if key not in _RESERVED]
+        line = ' '.join(f'{key}={_quote(value)}' for key, value in fields)
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level=None):
+    """Send logs to stderr in logfmt, unless the host (e.g. gunicorn) already configured the root logger."""
+    root = logging.getLogger()
+    root.setLevel((level or os.getenv('LOG_LEVEL', 'INFO')).upper())
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(LogfmtFormatter())
+        root.addHandler(handler)
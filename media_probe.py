@@ -0,0 +1,149 @@
+import json
+import logging
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+
+
+# ─── Background media probing / thumbnails ────────────────────────────────────
+#
+# After an upload is stored, process_video() runs ffprobe for duration, codec,
+# resolution and bitrate, grabs a poster thumbnail, and builds a sprite sheet
+# of small frames for seek previews. The work is done by ffmpeg subprocesses
+# in a 'probe_video' job on the durable job queue (job_queue.py), off the
+# request path, so a restart does not leave uploads pending.
+#
+# Every image is grabbed by seeking (-ss before -i) to its frame rather than
+# decoding the whole file, so the cost does not grow with the video's length.
+# Thumbnail and sprite are best effort: if ffmpeg fails on them, the probed
+# metadata is still returned and stored.
+
+FFMPEG_TIMEOUT = 600
+FRAME_TIMEOUT = 60
+
+THUMBNAIL_WIDTH = 480
+SPRITE_TILE_WIDTH = 160
+SPRITE_COLUMNS = 10
+SPRITE_ROWS = 10
+
+log = logging.getLogger(__name__)
+
+
+def ffmpeg_available():
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+def _run(cmd, timeout=FFMPEG_TIMEOUT):
+    return subprocess.run(cmd, capture_output=True, check=True, timeout=timeout)
+
+
+def probe(path):
+    """Return duration, codec, width, height and bitrate of a media file."""
+    out = _run([
+        'ffprobe', '-v', 'error', '-print_format', 'json',
+        '-show_format', '-show_streams', path,
+    ]).stdout
+    data = json.loads(out)
+    fmt = data.get('format', {})
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+    duration = float(fmt.get('duration') or (video or audio or {}).get('duration') or 0)
+    return {
+        'duration': duration,
+        'codec': (video or audio or {}).get('codec_name'),
+        'audio_codec': audio.get('codec_name') if audio else None,
+        'width': video.get('width') if video else None,
+        'height': video.get('height') if video else None,
+        'bitrate': int(fmt['bit_rate']) if fmt.get('bit_rate') else None,
+    }
+
+
+def grab_frame(path, out_path, at, width, quality):
+    """Seek to `at` seconds and write that one frame, scaled to `width`, as a JPEG."""
+    _run([
+        'ffmpeg', '-y', '-v', 'error', '-ss', f'{at:.3f}', '-i', path,
+        '-frames:v', '1', '-vf', f'scale={width}:-2', '-q:v', str(quality), out_path,
+    ], timeout=FRAME_TIMEOUT)
+    return os.path.exists(out_path) and os.path.getsize(out_path) > 0
+
+
+def make_thumbnail(path, out_path, at):
+    """Grab one frame at `at` seconds as a JPEG poster."""
+    if not grab_frame(path, out_path, at, THUMBNAIL_WIDTH, 4):
+        raise RuntimeError(f'no frame at {at:.3f}s')
+
+
+def make_sprite(path, out_path, duration):
+    """
+    Tile evenly spaced frames into one JPEG for seek previews.
+    Returns the sprite layout (frame interval and tile geometry).
+    """
+    interval = max(duration / (SPRITE_COLUMNS * SPRITE_ROWS), 1.0)
+    count = min(SPRITE_COLUMNS * SPRITE_ROWS, math.ceil(duration / interval)) or 1
+    rows = math.ceil(count / SPRITE_COLUMNS)
+
+    with tempfile.TemporaryDirectory(prefix='sprite_') as tmp:
+        previous = None
+        for i in range(count):
+            frame = os.path.join(tmp, f'{i:04d}.jpg')
+            if grab_frame(path, frame, i * interval, SPRITE_TILE_WIDTH, 5):
+                previous = frame
+            elif previous is not None:
+                # Nothing decodable at this time (e.g. past the last keyframe): repeat the last tile
+                shutil.copyfile(previous, frame)
+            else:
+                raise RuntimeError(f'no frame at {i * interval:.3f}s')
+        _run([
+            'ffmpeg', '-y', '-v', 'error', '-framerate', '1', '-i', os.path.join(tmp, '%04d.jpg'),
+            '-vf', f'tile={SPRITE_COLUMNS}x{rows}', '-frames:v', '1', '-q:v', '5', out_path,
+        ], timeout=FRAME_TIMEOUT)
+    return {'interval': interval, 'columns': SPRITE_COLUMNS, 'rows': rows, 'tile_width': SPRITE_TILE_WIDTH}
+
+
+def tile_height(width, height, tile_width=SPRITE_TILE_WIDTH):
+    """Height ffmpeg gives a frame scaled to tile_width with `scale=W:-2` (aspect kept, even)."""
+    return int(tile_width * height / (width * 2) + 0.5) * 2
+
+
+def _error_text(error):
+    stderr = getattr(error, 'stderr', None)
+    if stderr:
+        return stderr.decode('utf-8', 'replace').strip()[-500:]
+    return str(error)
+
+
+def process_video(path, output_dir, name):
+    """
+    Probe a video and write `<name>.jpg` (thumbnail) and `<name>_sprite.jpg`
+    into output_dir; `name` must be unique per video (e.g. its id). Returns a
+    dict of the fields to store on the videos row, without 'thumbnail' /
+    'sprite' when ffmpeg could not produce them.
+    """
+    if not ffmpeg_available():
+        raise RuntimeError('ffmpeg/ffprobe not found on PATH')
+
+    info = probe(path)
+
+    if info['width']:
+        thumbnail = f"{name}.jpg"
+        try:
+            make_thumbnail(path, os.path.join(output_dir, thumbnail), min(info['duration'] * 0.1, 10.0))
+            info['thumbnail'] = thumbnail
+        except (RuntimeError, OSError, subprocess.SubprocessError) as e:
+            log.warning("Thumbnail failed", extra={'path': path, 'error': _error_text(e)})
+
+        if info['duration'] > 0:
+            sprite = f"{name}_sprite.jpg"
+            try:
+                layout = make_sprite(path, os.path.join(output_dir, sprite), info['duration'])
+                layout['tile_height'] = tile_height(info['width'], info['height'])
+                info['sprite_layout'] = layout
+                info['sprite'] = sprite
+            except (RuntimeError, OSError, subprocess.SubprocessError) as e:
+                log.warning("Sprite failed", extra={'path': path, 'error': _error_text(e)})
+
+    return info
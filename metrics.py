@@ -0,0 +1,403 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+try:
+    import fcntl
+except ImportError:  # Windows: dead processes' files are not compacted
+    fcntl = None
+
+
+# ─── Prometheus metrics ───────────────────────────────────────────────────────
+#
+# A small, dependency-free implementation of the Prometheus text exposition
+# format (counters, histograms and gauges with labels).
+#
+# Several processes (gunicorn workers, worker.py) share one view when
+# METRICS_MULTIPROC_DIR names a directory on the local disk: every process
+# writes its counters and histograms to <dir>/<pid>.json (every
+# METRICS_FLUSH_SECONDS and at exit), and render() sums all files with its
+# own live values, so whichever worker answers /api/metrics reports the
+# totals. Files of dead processes are folded into archive.json so counters
+# never go backwards. serve.py turns this on (enable_multiprocess) with a
+# fresh directory at startup; worker.py processes on the same host join by
+# running with the same METRICS_MULTIPROC_DIR. Gauges are callbacks read at
+# scrape time and are not shared. Without the directory each process
+# reports only its own values.
+#
+# Processes on hosts without a web server can expose their own values with
+# serve(port) (worker.py --metrics-port).
+
+MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR') or None
+FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', 5))
+ARCHIVE_FILE = 'archive.json'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; covers fast JSON routes up to long Whisper runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry = []
+_by_name = {}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+        _by_name[name] = self
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self, others=None):
+        """Text lines of this metric; `others` ({key: value}) from other processes is added in."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        values = self.snapshot()
+        for key, value in (others or {}).items():
+            values[key] = self._merge(values[key], value) if key in values else value
+        for key, value in sorted(values.items()):
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def snapshot(self):
+        """{label key: value}, copied under the lock."""
+        with self._lock:
+            return {key: self._copy(value) for key, value in self._values.items()}
+
+    def _copy(self, value):
+        return value
+
+    def _merge(self, a, b):
+        return a + b
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        _ensure_flusher()
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value read at scrape time from a callback per label set."""
+    kind = 'gauge'
+
+    def set_function(self, fn, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = fn
+
+    def _render_sample(self, key, fn):
+        try:
+            value = fn()
+        except Exception:
+            return []
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, plus their sum and count."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        _ensure_flusher()
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the with-block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _copy(self, state):
+        return [list(state[0]), state[1]]
+
+    def _merge(self, a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1]]
+
+    def _render_sample(self, key, state):
+        counts, total = state
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+def render(include_others=True):
+    """All registered metrics in the Prometheus text format (summed over processes in multiprocess mode)."""
+    others = _read_other_processes() if MULTIPROC_DIR and include_others else {}
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render(others.get(metric.name)))
+    return '\n'.join(lines) + '\n'
+
+
+# ─── Multiprocess mode ────────────────────────────────────────────────────────
+
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def _shared():
+    return [metric for metric in _registry if metric.kind != 'gauge']
+
+
+def _own_file():
+    return os.path.join(MULTIPROC_DIR, f'{os.getpid()}.json')
+
+
+def _write_json(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)  # readers never see a partial file
+
+
+def _load_file(path):
+    """{metric name: {key: value}} from a process file; empty if it vanished or is unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {name: {tuple(key): value for key, value in samples} for name, samples in data.items()
+            if name in _by_name}
+
+
+def _merge_into(total, data):
+    for name, samples in data.items():
+        metric = _by_name[name]
+        target = total.setdefault(name, {})
+        for key, value in samples.items():
+            target[key] = metric._merge(target[key], value) if key in target else value
+    return total
+
+
+def _dump(data):
+    return {name: [[list(key), value] for key, value in samples.items()] for name, samples in data.items()}
+
+
+def flush():
+    """Write this process's counters and histograms to its file in MULTIPROC_DIR."""
+    if MULTIPROC_DIR is None:
+        return
+    _write_json(_own_file(), _dump({metric.name: metric.snapshot() for metric in _shared()}))
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _ensure_flusher():
+    """Start this process's flush thread on its first recorded value (threads do not survive fork)."""
+    global _flusher_pid
+    if MULTIPROC_DIR is None or _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid != os.getpid():
+            _flusher_pid = os.getpid()
+            threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def _after_fork_in_child():
+    # The parent keeps reporting what it recorded before the fork; the child starts from zero
+    global _flusher_lock
+    _flusher_lock = threading.Lock()
+    for metric in _shared():
+        metric._lock = threading.Lock()
+        metric._values = {}
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def _archive_dead():
+    """Fold the files of processes that have exited into ARCHIVE_FILE."""
+    dead = [name for name in os.listdir(MULTIPROC_DIR)
+            if name.endswith('.json') and name[:-5].isdigit() and not _alive(int(name[:-5]))]
+    if not dead or fcntl is None:
+        return
+    with open(os.path.join(MULTIPROC_DIR, 'archive.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(MULTIPROC_DIR, ARCHIVE_FILE)
+        archive = _load_file(archive_path)
+        dead = [name for name in dead if os.path.exists(os.path.join(MULTIPROC_DIR, name))]
+        for name in dead:
+            _merge_into(archive, _load_file(os.path.join(MULTIPROC_DIR, name)))
+        _write_json(archive_path, _dump(archive))
+        for name in dead:
+            try:
+                os.remove(os.path.join(MULTIPROC_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+def _read_other_processes():
+    """{metric name: {key: value}} summed over every other process's file (and the archive)."""
+    try:
+        _archive_dead()
+        names = os.listdir(MULTIPROC_DIR)
+    except OSError:
+        return {}
+    own = os.path.basename(_own_file())
+    total = {}
+    for name in names:
+        if name.endswith('.json') and name != own:
+            _merge_into(total, _load_file(os.path.join(MULTIPROC_DIR, name)))
+    return total
+
+
+_hooks_installed = False
+
+
+def enable_multiprocess(directory, reset=False):
+    """
+    Share metrics through `directory` from now on (also exported to child
+    processes). reset=True removes files left by a previous run: call it
+    once, in the first process, before any worker starts.
+    """
+    global MULTIPROC_DIR, _hooks_installed
+    os.makedirs(directory, exist_ok=True)
+    if reset:
+        for name in os.listdir(directory):
+            if name.endswith(('.json', '.tmp')):
+                os.remove(os.path.join(directory, name))
+    MULTIPROC_DIR = directory
+    os.environ['METRICS_MULTIPROC_DIR'] = directory
+    if not _hooks_installed:
+        _hooks_installed = True
+        atexit.register(flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+if MULTIPROC_DIR is not None:
+    enable_multiprocess(MULTIPROC_DIR)
+
+
+def serve(port, host='0.0.0.0'):
+    """Expose this process's own metrics on a port from a daemon thread (processes without the Flask app)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render(include_others=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+# ─── Application metrics ──────────────────────────────────────────────────────
+
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP requests handled.', ('method', 'route', 'status'))
+HTTP_LATENCY = Histogram('http_request_duration_seconds', 'Time to produce the response (headers).',
+                         ('method', 'route'))
+TRANSCRIBE_STAGE = Histogram('transcription_stage_seconds', 'Whisper transcription time per stage.', ('stage',))
+GROQ_LATENCY = Histogram('groq_request_duration_seconds', 'Latency of Groq chat completions.', ('model',))
+GROQ_TOKENS = Counter('groq_tokens_total', 'Tokens used by Groq chat completions.', ('model', 'kind'))
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups by cache and result (hit/miss).',
+                         ('cache', 'result'))
+DOCX_RENDER = Histogram('docx_render_seconds', 'Time to render a note to .docx (cache misses only).')
+QUEUE_DEPTH = Gauge('job_queue_depth', 'Background jobs waiting to run.', ('queue',))
+
+
+def cache_result(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _record_request(response):
+    start = getattr(g, 'metrics_start', None)
+    if start is not None:
+        # Label by the URL rule, not the path, to keep label cardinality bounded
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, route=route)
+    return response
+
+
+def init_metrics(app):
+    """Time every request of a Flask app into the HTTP metrics."""
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    return app
@@ -0,0 +1,170 @@
+import difflib
+import hashlib
+import json
+import zlib
+
+
+# ─── Revision storage for notes ───────────────────────────────────────────────
+#
+# Every save of a note is kept in the `note_revisions` table. Most revisions
+# are stored as a line delta against the previous revision; every
+# NOTE_SNAPSHOT_INTERVAL revisions (or whenever a delta would not be smaller)
+# a full snapshot is written instead, so rebuilding any revision never replays
+# more than a handful of deltas. The latest content still lives in the note's
+# JSON file, so reading the current version stays a single fetch.
+
+NOTE_SNAPSHOT_INTERVAL = 16
+
+
+def content_hash(content):
+    """Return a short hash used to check that a delta base is what we expect."""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def make_delta(old, new):
+    """
+    Build a compact line delta turning `old` into `new`.
+
+    The delta is a list of ops: a positive int copies that many lines from
+    the old text, a negative int skips that many old lines, and a list of
+    strings inserts those lines.
+    """
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(-(i2 - i1))
+        if j2 > j1:
+            ops.append(b[j1:j2])
+    return ops
+
+
+def apply_delta(old, delta):
+    """Rebuild the new text from `old` and a delta produced by make_delta."""
+    a = old.splitlines(keepends=True)
+    out = []
+    pos = 0
+    for op in delta:
+        if isinstance(op, list):
+            out.extend(op)
+        elif op > 0:
+            out.extend(a[pos:pos + op])
+            pos += op
+        else:
+            pos -= op
+    return ''.join(out)
+
+
+def _pack(obj):
+    return zlib.compress(json.dumps(obj, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(payload):
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def _latest(conn, note):
+    c = conn.cursor()
+    c.execute('SELECT revision, kind, content_hash FROM note_revisions WHERE note = ? ORDER BY revision DESC LIMIT 1',
+              (note,))
+    return c.fetchone()
+
+
+def record_revision(conn, note, title, content, previous=None, previous_title=None):
+    """
+    Store `content` as the next revision of `note` and return its number.
+
+    `previous` is the content the note had before this save (normally read
+    from the note file). When it matches the latest stored revision the new
+    revision is stored as a delta against it; otherwise a snapshot is written.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        c = conn.cursor()
+        latest = _latest(conn, note)
+
+        # Notes saved before history existed get their old content as revision 1
+        if latest is None and previous is not None:
+            c.execute('INSERT INTO note_revisions (note, revision, kind, title, payload, size, content_hash) '
+                      'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                      (note, 1, 'snapshot', previous_title, _pack(previous), len(previous), content_hash(previous)))
+            latest = _latest(conn, note)
+
+        revision = latest['revision'] + 1 if latest else 1
+        kind = 'snapshot'
+        payload = _pack(content)
+
+        if latest and previous is not None and latest['content_hash'] == content_hash(previous):
+            c.execute("SELECT max(revision) FROM note_revisions WHERE note = ? AND kind = 'snapshot'", (note,))
+            last_snapshot = c.fetchone()[0] or 0
+            if revision - last_snapshot < NOTE_SNAPSHOT_INTERVAL:
+                delta_payload = _pack(make_delta(previous, content))
+                if len(delta_payload) < len(payload):
+                    kind = 'delta'
+                    payload = delta_payload
+
+        c.execute('INSERT INTO note_revisions (note, revision, kind, title, payload, size, content_hash) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                  (note, revision, kind, title, payload, len(content), content_hash(content)))
+        conn.commit()
+        return revision
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def list_revisions(conn, note):
+    """List the stored revisions of a note, newest first."""
+    c = conn.cursor()
+    c.execute('SELECT revision, kind, title, size, length(payload) AS stored_size, created_at '
+              'FROM note_revisions WHERE note = ? ORDER BY revision DESC', (note,))
+    return [dict(row) for row in c.fetchall()]
+
+
+def get_revision(conn, note, revision):
+    """Rebuild a revision from its nearest snapshot. Returns None if it does not exist."""
+    c = conn.cursor()
+    c.execute("SELECT max(revision) FROM note_revisions WHERE note = ? AND kind = 'snapshot' AND revision <= ?",
+              (note, revision))
+    base = c.fetchone()[0]
+    if base is None:
+        return None
+
+    c.execute('SELECT revision, kind, title, payload, created_at FROM note_revisions '
+              'WHERE note = ? AND revision BETWEEN ? AND ? ORDER BY revision', (note, base, revision))
+    rows = c.fetchall()
+    if not rows or rows[-1]['revision'] != revision:
+        return None
+
+    content = ''
+    for row in rows:
+        data = _unpack(row['payload'])
+        content = data if row['kind'] == 'snapshot' else apply_delta(content, data)
+
+    last = rows[-1]
+    return {'revision': revision, 'title': last['title'], 'content': content, 'created_at': last['created_at']}
+
+
+def latest_revision_number(conn, note):
+    latest = _latest(conn, note)
+    return latest['revision'] if latest else None
+
+
+def diff_revisions(old, new, from_label='', to_label=''):
+    """Return a unified diff between the contents of two revisions."""
+    return ''.join(difflib.unified_diff(
+        old['content'].splitlines(keepends=True),
+        new['content'].splitlines(keepends=True),
+        fromfile=from_label,
+        tofile=to_label,
+    ))
+
+
+def delete_revisions(conn, note):
+    conn.execute('DELETE FROM note_revisions WHERE note = ?', (note,))
+    conn.commit()
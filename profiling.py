@@ -0,0 +1,203 @@
+import functools
+import io
+import json
+import os
+import random
+import threading
+import time
+import uuid
+
+from flask import make_response, request
+
+from admin_auth import token_matches
+
+
+# ─── Opt-in per-request profiling ─────────────────────────────────────────────
+#
+# Routes decorated with @profiled can be run under a profiler when
+#   - the request carries `X-Profile: <PROFILE_TOKEN>`, or
+#   - it is picked by random sampling (PROFILE_SAMPLE_RATE, 0.0 - 1.0).
+#
+# PROFILE_MODE selects cProfile ('deterministic', the default, stdlib) or
+# pyinstrument ('sampling', optional dependency). Each profile is written to
+# PROFILE_DIR next to a JSON file with the request metadata; the directory is
+# pruned to PROFILE_MAX_FILES / PROFILE_MAX_BYTES, oldest first.
+# Stored profiles are listed and downloaded through /api/admin/profiles,
+# which requires ADMIN_TOKEN (see admin_auth.py), not PROFILE_TOKEN.
+#
+# The settings are read once at import. When neither a token nor a sample
+# rate is configured, @profiled returns the view unchanged: zero overhead.
+# Only one request per process is profiled at a time.
+
+PROFILE_DIR = os.getenv('PROFILE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN') or None
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0) or 0)
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'deterministic')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+PROFILE_MAX_BYTES = int(os.getenv('PROFILE_MAX_BYTES', 100 * 1024 * 1024))
+
+PROFILE_HEADER = 'X-Profile'
+
+# profile file extension per mode
+EXTENSIONS = {'deterministic': '.prof', 'sampling': '.html'}
+
+_active = threading.Lock()
+
+
+def enabled():
+    return PROFILE_TOKEN is not None or PROFILE_SAMPLE_RATE > 0
+
+
+def _trigger():
+    if token_matches(request.headers.get(PROFILE_HEADER), PROFILE_TOKEN):
+        return 'header'
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+class _DeterministicProfiler:
+    def __init__(self):
+        import cProfile
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def save(self, path):
+        self.profiler.dump_stats(path)
+
+
+class _SamplingProfiler:
+    def __init__(self):
+        from pyinstrument import Profiler
+        self.profiler = Profiler()
+
+    def start(self):
+        self.profiler.start()
+
+    def stop(self):
+        self.profiler.stop()
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.profiler.output_html())
+
+
+def _new_profiler():
+    return _SamplingProfiler() if PROFILE_MODE == 'sampling' else _DeterministicProfiler()
+
+
+def _save(profiler, metadata):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    mode = 'sampling' if isinstance(profiler, _SamplingProfiler) else 'deterministic'
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    profile_file = profile_id + EXTENSIONS[mode]
+    profiler.save(os.path.join(PROFILE_DIR, profile_file))
+    metadata.update({'id': profile_id, 'mode': mode, 'file': profile_file})
+    with open(os.path.join(PROFILE_DIR, profile_id + '.json'), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+    prune()
+
+
+def profiled(view):
+    """Decorator for routes that may be profiled (see module comment)."""
+    if not enabled():
+        return view
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        trigger = _trigger()
+        if trigger is None or not _active.acquire(blocking=False):
+            return view(*args, **kwargs)
+        try:
+            profiler = _new_profiler()
+            status = 500
+            started_at = time.time()
+            start = time.perf_counter()
+            profiler.start()
+            try:
+                response = make_response(view(*args, **kwargs))
+                status = response.status_code
+                return response
+            finally:
+                profiler.stop()
+                _save(profiler, {
+                    'trigger': trigger,
+                    'method': request.method,
+                    'path': request.path,
+                    'route': request.url_rule.rule if request.url_rule is not None else None,
+                    'query': request.query_string.decode('utf-8', 'replace'),
+                    'status': status,
+                    'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+                    'started_at': started_at,
+                    'remote_addr': request.remote_addr,
+                    'content_length': request.content_length,
+                    'user_agent': request.user_agent.string,
+                })
+        finally:
+            _active.release()
+
+    return wrapper
+
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name), 'r', encoding='utf-8') as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda p: p.get('started_at', 0), reverse=True)
+    return profiles
+
+
+def get_profile(profile_id):
+    """(metadata, path of the profile file) or None. `profile_id` must be a bare id."""
+    if not profile_id or os.path.basename(profile_id) != profile_id or profile_id.startswith('.'):
+        return None
+    meta_path = os.path.join(PROFILE_DIR, profile_id + '.json')
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return None
+    path = os.path.join(PROFILE_DIR, metadata['file'])
+    return (metadata, path) if os.path.isfile(path) else None
+
+
+def profile_summary(path, limit=60):
+    """Text report of a cProfile dump, sorted by cumulative time."""
+    import pstats
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def prune(max_files=PROFILE_MAX_FILES, max_bytes=PROFILE_MAX_BYTES):
+    """Delete the oldest profiles until both limits hold."""
+    entries = []
+    for meta in list_profiles():
+        files = [meta['id'] + '.json', meta['file']]
+        size = sum(os.path.getsize(os.path.join(PROFILE_DIR, f))
+                   for f in files if os.path.exists(os.path.join(PROFILE_DIR, f)))
+        entries.append((files, size))
+
+    total = sum(size for _, size in entries)
+    while entries and (len(entries) > max_files or total > max_bytes):
+        files, size = entries.pop()  # oldest
+        total -= size
+        for f in files:
+            try:
+                os.remove(os.path.join(PROFILE_DIR, f))
+            except FileNotFoundError:
+                pass
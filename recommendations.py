@@ -0,0 +1,253 @@
+import logging
+import re
+import threading
+
+import transcript_search
+
+log = logging.getLogger(__name__)
+
+
+# ─── Related-lecture recommendations ──────────────────────────────────────────
+#
+# Each lecture is a document (title + transcript text) turned into a sparse
+# BM25-weighted vector (NumPy/SciPy CSR matrix, rows L2-normalized), so the
+# similarity of two lectures is the dot product of their rows. The top
+# TOP_K neighbours of every lecture are precomputed; serving a
+# recommendation is a dict lookup.
+#
+# Documents are the transcripts in the search index (transcript_search), so
+# uploads and fetched YouTube captions are both covered. Each process keeps
+# its own RecommendationIndex and syncs it with app.db on use:
+#   - new lectures are added incrementally: their vector is computed, their
+#     neighbours found with one sparse mat-vec, and they are inserted into
+#     the neighbour lists they beat;
+#   - re-transcribed lectures, or growth by REBUILD_GROWTH since the last
+#     full build (IDF weights drift as documents are added), trigger a full
+#     rebuild.
+#
+# Notes are not linked to lectures; a note can be used as a query against
+# the same vectors (related lectures for a note).
+#
+# numpy and scipy are imported lazily; without them recommendations are
+# unavailable (RecommendationsUnavailable).
+
+TOP_K = 20
+REBUILD_GROWTH = 0.25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Rows per block when computing all-pairs similarities (bounds peak memory)
+BLOCK_ROWS = 256
+
+_STOPWORDS = frozenset('''
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just let like me more most my no nor not now of off on once
+only or other our ours out over own really right same she should so some such than that the their theirs
+them then there these they this those through to too um uh under until up us very was we well were what
+when where which while who whom why will with would yeah you your yours okay ok gonna going get got
+'''.split())
+
+
+class RecommendationsUnavailable(Exception):
+    pass
+
+
+def tokenize(text):
+    return [w for w in re.findall(r'[^\W_]+', text.lower()) if len(w) > 1 and w not in _STOPWORDS]
+
+
+def _require_numpy():
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as e:
+        raise RecommendationsUnavailable('Recommendations need numpy and scipy') from e
+    return np, sparse
+
+
+class RecommendationIndex:
+    """BM25 document vectors and precomputed top-k neighbours of every indexed lecture."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.video_ids = []      # row -> video id
+        self.rows = {}           # video id -> row
+        self.vocab = {}          # term -> column
+        self.counts = None       # CSR (documents x terms), raw term counts
+        self.vectors = None      # CSR, BM25 weights, rows L2-normalized
+        self.idf = None
+        self.avgdl = 0.0
+        self.neighbours = {}     # video id -> [(video id, score)], best first
+        self.signature = None    # state of transcript_search_index last synced
+        self.indexed_at = {}     # video id -> indexed_at when last synced
+        self.built_with = 0      # documents at the last full build
+
+    # ── Vectors ──
+
+    def _count_rows(self, documents):
+        """CSR term counts of tokenized `documents`, growing the vocabulary."""
+        np, sparse = _require_numpy()
+        indptr, indices, data = [0], [], []
+        for tokens in documents:
+            row = {}
+            for token in tokens:
+                column = self.vocab.setdefault(token, len(self.vocab))
+                row[column] = row.get(column, 0) + 1
+            indices.extend(row)
+            data.extend(row.values())
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.array(data, dtype=np.float32), np.array(indices, dtype=np.int64), indptr),
+                                 shape=(len(documents), len(self.vocab)))
+
+    def _weigh(self, counts):
+        """BM25 weights of count rows with the current idf/avgdl, L2-normalized."""
+        np, sparse = _require_numpy()
+        counts = counts.tocsr(copy=True)
+        lengths = np.asarray(counts.sum(axis=1)).ravel()
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(self.avgdl, 1.0))
+        row_of = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        tf = counts.data
+        counts.data = (tf * (BM25_K1 + 1) / (tf + norm[row_of]) * self.idf[counts.indices]).astype(np.float32)
+        squared = counts.multiply(counts).sum(axis=1)
+        scale = 1 / np.sqrt(np.maximum(np.asarray(squared).ravel(), 1e-12))
+        return sparse.diags(scale.astype(np.float32)) @ counts
+
+    def _update_statistics(self):
+        np, _ = _require_numpy()
+        n = self.counts.shape[0]
+        df = np.bincount(self.counts.indices, minlength=self.counts.shape[1])
+        self.idf = np.log(1 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        self.avgdl = float(self.counts.sum()) / n if n else 0.0
+
+    def _top_k(self, scores, k, exclude=None):
+        """[(video id, score)] of the k best positive scores, best first."""
+        np, _ = _require_numpy()
+        if exclude is not None:
+            scores = scores.copy()
+            scores[exclude] = -1
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.video_ids[j], float(scores[j])) for j in best if scores[j] > 0]
+
+    # ── Building ──
+
+    def rebuild(self, documents):
+        """Full build from {video id: text}."""
+        self.video_ids = list(documents)
+        self.rows = {vid: i for i, vid in enumerate(self.video_ids)}
+        self.vocab = {}
+        self.counts = self._count_rows([tokenize(text) for text in documents.values()])
+        self._update_statistics()
+        self.vectors = self._weigh(self.counts)
+        neighbours = {}
+        for lo in range(0, len(self.video_ids), BLOCK_ROWS):
+            block = (self.vectors[lo:lo + BLOCK_ROWS] @ self.vectors.T).toarray()
+            for offset, scores in enumerate(block):
+                row = lo + offset
+                neighbours[self.video_ids[row]] = self._top_k(scores, TOP_K, exclude=row)
+        self.neighbours = neighbours  # swapped in whole: readers never see a partial build
+        self.built_with = len(self.video_ids)
+
+    def add(self, documents):
+        """Add new lectures ({video id: text}) without recomputing every pair."""
+        _, sparse = _require_numpy()
+        new = self._count_rows([tokenize(text) for text in documents.values()])
+        old = self.counts
+        old.resize((old.shape[0], len(self.vocab)))
+        self.counts = sparse.vstack([old, new], format='csr')
+        start = len(self.video_ids)
+        for vid in documents:
+            self.rows[vid] = len(self.video_ids)
+            self.video_ids.append(vid)
+        self._update_statistics()
+        self.vectors = self._weigh(self.counts)
+
+        scores = (self.vectors[start:] @ self.vectors.T).toarray()
+        for offset, row_scores in enumerate(scores):
+            row = start + offset
+            vid = self.video_ids[row]
+            self.neighbours[vid] = self._top_k(row_scores, TOP_K, exclude=row)
+            # Insert the new lecture into the lists of the older lectures it beats
+            for other in range(start):
+                score = float(row_scores[other])
+                if score <= 0:
+                    continue
+                other_vid = self.video_ids[other]
+                current = self.neighbours.get(other_vid, [])
+                if len(current) < TOP_K or score > current[-1][1]:
+                    current = sorted(current + [(vid, score)], key=lambda item: -item[1])[:TOP_K]
+                    self.neighbours[other_vid] = current
+
+    # ── Sync with app.db ──
+
+    def sync(self, conn):
+        """Bring the index up to date with the transcripts in the search index."""
+        if not transcript_search.enabled:
+            raise RecommendationsUnavailable('Recommendations need the transcript search index (SQLite FTS5)')
+        _require_numpy()
+        row = conn.execute('SELECT count(*), max(indexed_at), total(segments) FROM transcript_search_index').fetchone()
+        signature = tuple(row)
+        if signature == self.signature:
+            return
+        with self._lock:
+            if signature == self.signature:
+                return
+            indexed = {r['video_id']: r['indexed_at'] for r in
+                       conn.execute('SELECT video_id, indexed_at FROM transcript_search_index')}
+            known = self.indexed_at
+            new_ids = [vid for vid in indexed if vid not in known]
+            changed = any(vid not in indexed or indexed[vid] != at for vid, at in known.items())
+            grown = len(self.video_ids) + len(new_ids) > self.built_with * (1 + REBUILD_GROWTH)
+
+            if self.counts is None or changed or grown:
+                self.rebuild(_load_documents(conn, list(indexed)))
+                log.info("Built recommendation index", extra={'videos': len(self.video_ids),
+                                                              'terms': len(self.vocab)})
+            elif new_ids:
+                self.add(_load_documents(conn, new_ids))
+                log.info("Added videos to recommendation index", extra={'added': len(new_ids)})
+            self.indexed_at = indexed
+            self.signature = signature
+
+    # ── Queries ──
+
+    def related(self, video_id, k=10):
+        """[(video id, score)] most similar to an indexed lecture (empty if it is not indexed)."""
+        return self.neighbours.get(video_id, [])[:k]
+
+    def related_to_text(self, text, k=10):
+        """[(video id, score)] most similar to free text (e.g. a note), scored against the current vectors."""
+        with self._lock:
+            if self.vectors is None or not self.video_ids:
+                return []
+            # Unknown terms are dropped so the vocabulary does not grow
+            tokens = [t for t in tokenize(text) if t in self.vocab]
+            if not tokens:
+                return []
+            scores = (self.vectors @ self._weigh(self._count_rows([tokens])).T).toarray().ravel()
+            return self._top_k(scores, k)
+
+
+def _load_documents(conn, video_ids):
+    """{video id: title + transcript text} for indexed lectures, from the search index."""
+    documents = {}
+    for vid in video_ids:
+        title = conn.execute('SELECT title FROM videos WHERE id = ?', (vid,)).fetchone()
+        base = vid * transcript_search.ROWID_STRIDE
+        texts = [r['text'] for r in conn.execute(
+            'SELECT text FROM transcript_search_fts WHERE rowid >= ? AND rowid < ? ORDER BY rowid',
+            (base, base + transcript_search.ROWID_STRIDE))]
+        documents[vid] = ' '.join(([title['title']] if title else []) + texts)
+    return documents
+
+
+_index = RecommendationIndex()
+
+
+def get_index(conn):
+    """The process-wide index, synced with app.db."""
+    _index.sync(conn)
+    return _index
@@ -0,0 +1,146 @@
+"""
+Production entry point: runs the API under gunicorn's pre-fork server.
+
+The master process builds the app and preloads the heavy, read-only state
+(Whisper weights, the DOCX style template, the compiled LaTeX/markdown
+regexes) before forking, so every worker shares those pages copy-on-write
+instead of loading its own copy.
+
+    python serve.py --workers 4 --threads 8 --bind 0.0.0.0:3001 --pid server.pid
+
+Graceful restarts (gunicorn signals sent to the master):
+    kill -HUP  $(cat server.pid)   replace workers one generation at a time
+    kill -USR2 $(cat server.pid)   start a new master on new code, then
+    kill -TERM <old master pid>    stop the old one once the new one is ready
+Workers finish in-flight requests for up to --graceful-timeout seconds.
+
+Background jobs (job_queue.py: transcription, probing, HLS, async exports)
+run in `python worker.py` processes, here or on other hosts sharing app.db
+and uploads/ (see worker.py). Web workers run none by default: gunicorn
+kills a worker's threads when it recycles it (--max-requests), which would
+cost a job its lease and an attempt. --job-workers N runs N job threads per
+web worker instead, and then turns --max-requests off.
+
+Workers share their metrics through files in --metrics-dir, so GET
+/api/metrics reports the sum over all of them (see metrics.py).
+
+Load balancers should poll GET /api/ready. gunicorn is POSIX-only; on
+Windows keep using `python transcript_api.py` (development server).
+"""
+import gc
+import multiprocessing
+import os
+import tempfile
+
+import click
+
+import asr_backends
+import db_pool
+import metrics
+import transcript_api
+
+
+def default_workers():
+    return int(os.getenv('WEB_WORKERS', multiprocessing.cpu_count()))
+
+
+def preload(whisper=True):
+    """Build the app and load shared state in the master, before any worker is forked."""
+    app = transcript_api.create_app()
+
+    import word_export_utils  # compiles the LaTeX / markdown regexes at import
+    word_export_utils.base_template()
+    if whisper:
+        asr_backends.get_backend().load()
+
+    # SQLite connections must never be shared across fork(); workers open their own
+    db_pool.close_all()
+    # Move everything loaded so far out of the GC's reach, so collections in
+    # the workers don't write to (and un-share) these pages
+    gc.freeze()
+    return app
+
+
+def post_fork(server, worker):
+    """Split the CPU between workers for torch's intra-op thread pool, then start the job threads."""
+    import sys
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(max(1, multiprocessing.cpu_count() // server.cfg.workers))
+    transcript_api.start_job_workers()
+
+
+def run(app, options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise click.ClickException('gunicorn is required for the production server: pip install gunicorn')
+
+    class ProductionServer(BaseApplication):
+        def __init__(self, application, settings):
+            self.application = application
+            self.settings = settings
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    ProductionServer(app, options).run()
+
+
+@click.command()
+@click.option('--bind', '-b', default=os.getenv('WEB_BIND', '0.0.0.0:3001'), show_default=True)
+@click.option('--workers', '-w', type=int, default=default_workers, show_default='CPU count, or WEB_WORKERS')
+@click.option('--threads', '-t', type=int, default=lambda: int(os.getenv('WEB_THREADS', 4)), show_default='4, or WEB_THREADS',
+              help='Request threads per worker')
+@click.option('--timeout', type=int, default=300, show_default=True,
+              help='Seconds before a silent worker is killed (Whisper requests are long)')
+@click.option('--graceful-timeout', type=int, default=60, show_default=True,
+              help='Seconds workers get to finish in-flight requests on restart/shutdown')
+@click.option('--max-requests', type=int, default=1000, show_default=True,
+              help='Recycle a worker after this many requests (0 to disable)')
+@click.option('--pid', type=click.Path(), default=None, help='Write the master PID here')
+@click.option('--preload-whisper/--no-preload-whisper', default=True, show_default=True,
+              help='Load the default ASR model (ASR_BACKEND) in the master')
+@click.option('--job-workers', type=int, default=lambda: int(os.getenv('JOB_WORKERS', 0)),
+              show_default='0, or JOB_WORKERS',
+              help='Background job threads per web worker (0: jobs run only in worker.py processes)')
+@click.option('--metrics-dir', type=click.Path(file_okay=False), default=lambda: os.getenv('METRICS_MULTIPROC_DIR'),
+              show_default='METRICS_MULTIPROC_DIR, or a per-port temp directory',
+              help='Where workers share metrics; run worker.py with the same METRICS_MULTIPROC_DIR to include it')
+def main(bind, workers, threads, timeout, graceful_timeout, max_requests, pid, preload_whisper, job_workers,
+         metrics_dir):
+    """Run the API under gunicorn with preloaded, fork-shared workers."""
+    os.environ['JOB_WORKERS'] = str(job_workers)  # read by post_fork in every worker
+    # Every worker reports the totals of all of them at /api/metrics
+    metrics_dir = metrics_dir or os.path.join(tempfile.gettempdir(), f"e_learning_metrics_{bind.rsplit(':', 1)[-1]}")
+    metrics.enable_multiprocess(metrics_dir, reset=True)
+    if job_workers > 0 and max_requests:
+        # Recycling a worker would kill its job threads mid-job
+        click.echo('--job-workers is set: disabling --max-requests worker recycling', err=True)
+        max_requests = 0
+    elif job_workers <= 0:
+        click.echo('No in-process job workers: run `python worker.py` to process background jobs', err=True)
+    app = preload(whisper=preload_whisper)
+    run(app, {
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests // 10,
+        'preload_app': True,
+        'pidfile': pid,
+        'post_fork': post_fork,
+        'accesslog': '-',
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -2,15 +2,24 @@ import React, { useEffect, useState } from 'react';
 
 const VideoLibrary = ({ onPlayVideo }) => {
     const [videos, setVideos] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    // The list is paginated: load one page now, the next one on request
+    const fetchPage = async (cursor) => {
+        const params = new URLSearchParams();
+        if (cursor) params.set('cursor', cursor);
+        const res = await fetch(`/api/videos?${params}`);
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return res.json();
+    };
 
     const fetchVideos = async () => {
         try {
-            const res = await fetch('/api/videos');
-            if (res.ok) {
-                const data = await res.json();
-                setVideos(data.videos || []);
-            }
+            const data = await fetchPage(null);
+            setVideos(data.videos || []);
+            setNextCursor(data.next_cursor || null);
         } catch (err) {
             console.error("Failed to fetch videos", err);
         } finally {
@@ -18,6 +27,20 @@ const VideoLibrary = ({ onPlayVideo }) => {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor || loadingMore) return;
+        setLoadingMore(true);
+        try {
+            const data = await fetchPage(nextCursor);
+            setVideos(prev => [...prev, ...(data.videos || [])]);
+            setNextCursor(data.next_cursor || null);
+        } catch (err) {
+            console.error("Failed to fetch more videos", err);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         fetchVideos();
     }, []);
@@ -96,6 +119,14 @@ const VideoLibrary = ({ onPlayVideo }) => {
                     ))}
                 </div>
             )}
+
+            {nextCursor && (
+                <div style={{ textAlign: 'center', marginTop: '1.5rem' }}>
+                    <button className="extract-btn" onClick={loadMore} disabled={loadingMore}>
+                        {loadingMore ? 'Loading...' : 'Load more'}
+                    </button>
+                </div>
+            )}
         </div>
     );
 };
@@ -0,0 +1,93 @@
+import json
+
+
+# ─── Streaming transcript writers ─────────────────────────────────────────────
+#
+# Each writer takes an iterable of segments ({'text', 'start', 'duration'},
+# seconds) and is a generator yielding one chunk of text per segment, so a
+# transcript of any length is written in constant memory and the first cues
+# go out as soon as the first segment is available:
+#
+#   txt   - one line per segment, optionally prefixed with [HH:MM:SS]
+#   srt   - SubRip cues (HH:MM:SS,mmm)
+#   vtt   - WebVTT cues (HH:MM:SS.mmm), after the WEBVTT header
+#   jsonl - one JSON object per segment
+#
+# Used by the CLI (--format), the batch CLI and the transcript endpoints
+# (?format=).
+
+FORMATS = ('txt', 'srt', 'vtt', 'jsonl')
+
+MIMETYPES = {
+    'txt': 'text/plain',
+    'srt': 'application/x-subrip',
+    'vtt': 'text/vtt',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def _clock(seconds, separator):
+    millis = max(0, int(round(seconds * 1000)))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def _cue_text(text):
+    # A blank line ends a cue in both SRT and WebVTT
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _end(segment):
+    return segment['start'] + max(0.0, segment.get('duration') or 0.0)
+
+
+def write_txt(segments, timestamps=True):
+    for segment in segments:
+        if timestamps:
+            seconds = int(segment['start'])
+            clock = f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+            yield f"[{clock}] {segment['text']}\n"
+        else:
+            yield f"{segment['text']}\n"
+
+
+def write_srt(segments):
+    index = 0
+    for segment in segments:
+        text = _cue_text(segment['text'])
+        if not text:
+            continue
+        index += 1
+        yield (f"{index}\n{_clock(segment['start'], ',')} --> {_clock(_end(segment), ',')}\n"
+               f"{text}\n\n")
+
+
+def write_vtt(segments):
+    yield "WEBVTT\n\n"
+    for segment in segments:
+        text = _cue_text(segment['text'])
+        if not text:
+            continue
+        text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        yield f"{_clock(segment['start'], '.')} --> {_clock(_end(segment), '.')}\n{text}\n\n"
+
+
+def write_jsonl(segments):
+    for segment in segments:
+        yield json.dumps({'start': segment['start'], 'duration': segment.get('duration', 0.0),
+                          'text': segment['text']}, ensure_ascii=False) + '\n'
+
+
+def stream(fmt, segments, timestamps=True):
+    """Generator of `segments` rendered as `fmt` (one of FORMATS)."""
+    if fmt == 'txt':
+        return write_txt(segments, timestamps)
+    if fmt == 'srt':
+        return write_srt(segments)
+    if fmt == 'vtt':
+        return write_vtt(segments)
+    if fmt == 'jsonl':
+        return write_jsonl(segments)
+    raise ValueError(f"Unknown transcript format: {fmt}")
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root; make them importable when pytest
+# is started as `pytest` rather than `python -m pytest`.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    """A fresh app database (full schema from transcript_api.init_db) in tmp_path."""
+    import db_pool
+    import transcript_api
+
+    db_pool.close_all()
+    monkeypatch.setattr(db_pool, 'DATABASE_PATH', str(tmp_path / 'app.db'))
+    transcript_api.init_db()
+    yield transcript_api
+    db_pool.close_all()
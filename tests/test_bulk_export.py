@@ -0,0 +1,57 @@
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+import bulk_export
+
+
+@pytest.fixture
+def notes(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"note_{i}.json"
+        path.write_text(json.dumps({'title': f"Note {i}", 'content': f"# Heading {i}\n\n- item"}), encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    yield
+    if bulk_export._pool is not None:
+        bulk_export._pool.shutdown(wait=True, cancel_futures=True)
+        bulk_export._pool = None
+
+
+def _bundle(paths):
+    data = b''.join(bulk_export.stream_bundle(paths))
+    return sorted(zipfile.ZipFile(io.BytesIO(data)).namelist())
+
+
+def test_stream_bundle_renders_every_note(notes):
+    assert _bundle(notes) == ['Note_0.docx', 'Note_1.docx', 'Note_2.docx']
+
+
+def test_duplicate_titles_get_unique_names(notes):
+    assert _bundle([notes[0], notes[0]]) == ['Note_0.docx', 'Note_0_2.docx']
+
+
+def test_broken_shared_pool_is_replaced(notes):
+    broken = bulk_export.get_pool()
+    # Kill a worker the way an OOM kill or a segfault would
+    with pytest.raises(Exception):
+        broken.submit(os._exit, 1).result()
+
+    assert _bundle(notes) == ['Note_0.docx', 'Note_1.docx', 'Note_2.docx']
+    assert bulk_export.get_pool() is not broken
+
+
+def test_resolve_note_paths(notes):
+    notes_dir = os.path.dirname(notes[0])
+    paths, missing = bulk_export.resolve_note_paths(['note_1.json', '../secret.json', 'nope.json'], notes_dir)
+
+    assert paths == [notes[1]]
+    assert missing == ['../secret.json', 'nope.json']
@@ -0,0 +1,111 @@
+import hashlib
+import io
+import threading
+
+import pytest
+
+import chunked_upload
+from chunked_upload import UploadError
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    partial, uploads = tmp_path / 'partial', tmp_path / 'videos'
+    partial.mkdir()
+    uploads.mkdir()
+    return str(partial), str(uploads)
+
+
+def _upload(app_db, partial, data, chunk_size=4, sha256=None):
+    with app_db.get_db() as conn:
+        session = chunked_upload.create_session(conn, partial, 'lecture.mp4', 'Lecture', len(data),
+                                                chunk_size=chunk_size, sha256=sha256)
+        for i in range(0, len(data), chunk_size):
+            chunk = data[i:i + chunk_size]
+            chunked_upload.write_chunk(conn, partial, session['id'], i // chunk_size,
+                                       io.BytesIO(chunk), hashlib.sha256(chunk).hexdigest())
+    return session['id']
+
+
+def test_finalize_moves_the_assembled_file(app_db, dirs):
+    partial, uploads = dirs
+    upload_id = _upload(app_db, partial, b'0123456789')
+
+    with app_db.get_db() as conn:
+        session, filename = chunked_upload.finalize(conn, partial, uploads, upload_id)
+        with pytest.raises(UploadError) as missing:
+            chunked_upload.get_session(conn, upload_id)
+
+    assert filename == 'lecture.mp4'
+    with open(f"{uploads}/{filename}", 'rb') as f:
+        assert f.read() == b'0123456789'
+    assert missing.value.status == 404
+
+
+def test_finalize_with_missing_chunks_can_be_retried(app_db, dirs):
+    partial, uploads = dirs
+    with app_db.get_db() as conn:
+        session = chunked_upload.create_session(conn, partial, 'a.mp4', 'A', 8, chunk_size=4)
+        with pytest.raises(UploadError) as error:
+            chunked_upload.finalize(conn, partial, uploads, session['id'])
+        status = chunked_upload.session_status(conn, session['id'])
+
+    assert error.value.status == 409
+    assert status['state'] == 'open' and status['missing'] == [0, 1]
+
+
+def test_concurrent_finalize_moves_the_file_once(app_db, dirs, monkeypatch):
+    partial, uploads = dirs
+    data = b'abcdefgh'
+    upload_id = _upload(app_db, partial, data, sha256=hashlib.sha256(data).hexdigest())
+
+    # Hold the first finalize inside its checksum pass while the second one runs
+    hashing, release = threading.Event(), threading.Event()
+    real_sha256 = chunked_upload._file_sha256
+
+    def slow_sha256(path):
+        hashing.set()
+        release.wait(5)
+        return real_sha256(path)
+
+    monkeypatch.setattr(chunked_upload, '_file_sha256', slow_sha256)
+    results = []
+
+    def first():
+        with app_db.get_db() as conn:
+            results.append(chunked_upload.finalize(conn, partial, uploads, upload_id))
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert hashing.wait(5)
+    with app_db.get_db() as conn:
+        with pytest.raises(UploadError) as loser:
+            chunked_upload.finalize(conn, partial, uploads, upload_id)
+        with pytest.raises(UploadError) as late_chunk:
+            chunked_upload.write_chunk(conn, partial, upload_id, 0, io.BytesIO(b'abcd'),
+                                       hashlib.sha256(b'abcd').hexdigest())
+    release.set()
+    thread.join(5)
+
+    assert loser.value.status == 409
+    assert late_chunk.value.status == 409
+    assert [filename for _, filename in results] == ['lecture.mp4']
+
+
+def test_failed_checksum_reopens_the_session(app_db, dirs):
+    partial, uploads = dirs
+    upload_id = _upload(app_db, partial, b'abcdefgh', sha256='0' * 64)
+
+    with app_db.get_db() as conn:
+        with pytest.raises(UploadError) as error:
+            chunked_upload.finalize(conn, partial, uploads, upload_id)
+        assert chunked_upload.session_status(conn, upload_id)['state'] == 'open'
+    assert error.value.status == 422
+
+
+def test_announced_size_is_bounded(app_db, dirs):
+    partial, _ = dirs
+    with app_db.get_db() as conn:
+        with pytest.raises(UploadError) as error:
+            chunked_upload.create_session(conn, partial, 'big.mp4', 'Big', chunked_upload.MAX_UPLOAD_SIZE + 1)
+    assert error.value.status == 413
@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from compact_transcript import CompactTranscript
+
+SEGMENTS = [
+    {'text': 'Bonjour à tous', 'start': 0.0, 'duration': 2.5},
+    {'text': 'Schrödinger’s ψ', 'start': 2.5, 'duration': 3.0},
+    {'text': '', 'start': 6.0, 'duration': 0.0},
+    {'text': 'overlapping caption', 'start': 5.0, 'duration': 4.0},
+    {'text': '漢字 and emoji 🎓', 'start': 10.125, 'duration': 1.375},
+]
+
+
+@pytest.fixture
+def transcript():
+    return CompactTranscript.from_segments(SEGMENTS)
+
+
+def test_segments_are_sorted_by_start(transcript):
+    assert [s['start'] for s in transcript] == [0.0, 2.5, 5.0, 6.0, 10.125]
+    assert transcript[1]['text'] == 'Schrödinger’s ψ'
+    assert transcript[-1]['text'] == '漢字 and emoji 🎓'
+    assert len(transcript) == 5
+
+
+def test_binary_round_trip(transcript):
+    data = transcript.to_bytes()
+    loaded = CompactTranscript.from_bytes(data)
+
+    assert data[:4] == b'CTS1'
+    assert loaded.to_list() == transcript.to_list()
+    assert loaded.max_duration == transcript.max_duration
+
+
+def test_times_are_stored_in_milliseconds():
+    loaded = CompactTranscript.from_bytes(
+        CompactTranscript.from_segments([{'text': 'a', 'start': 1.23456, 'duration': 0.0004}]).to_bytes())
+
+    assert (loaded[0]['start'], loaded[0]['duration']) == (1.235, 0.0)
+
+
+def test_empty_transcript_round_trip():
+    loaded = CompactTranscript.from_bytes(CompactTranscript.from_segments([]).to_bytes())
+
+    assert len(loaded) == 0
+    assert loaded.segment_at(1.0) is None
+    assert loaded.between(0, 10) == []
+
+
+def test_load_accepts_bytes_and_legacy_json(transcript):
+    assert CompactTranscript.load(memoryview(transcript.to_bytes())).to_list() == transcript.to_list()
+    assert CompactTranscript.load(json.dumps(SEGMENTS)).to_list() == transcript.to_list()
+
+
+def test_from_bytes_rejects_other_data():
+    with pytest.raises(ValueError):
+        CompactTranscript.from_bytes(b'JSON' + b'\0' * 8)
+
+
+@pytest.mark.parametrize('t, text', [
+    (0.0, 'Bonjour à tous'),
+    (2.49, 'Bonjour à tous'),
+    (2.5, 'Schrödinger’s ψ'),
+    (5.5, 'overlapping caption'),  # inside two segments: the later-starting one wins
+    (8.9, 'overlapping caption'),  # only covered by the long overlapping segment
+    (6.0, ''),                     # zero-length segment at exactly its start
+    (9.5, None),
+    (-1.0, None),
+])
+def test_segment_at(transcript, t, text):
+    segment = transcript.segment_at(t)
+    assert (segment['text'] if segment else None) == text
+
+
+def test_between_includes_segments_overlapping_the_window(transcript):
+    texts = [s['text'] for s in transcript.between(7.0, 10.2)]
+
+    # The segment starting at 5.0 is still running at 7.0
+    assert texts == ['overlapping caption', '漢字 and emoji 🎓']
@@ -0,0 +1,106 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, g, jsonify
+
+import http_cache
+
+LARGE = {'items': [{'id': i, 'title': f'Lecture {i}'} for i in range(200)]}
+
+
+@pytest.fixture
+def state():
+    return {'value': 1}
+
+
+@pytest.fixture
+def client(state):
+    app = Flask(__name__)
+
+    @app.route('/small', methods=['GET', 'POST'])
+    def small():
+        return jsonify({'value': state['value']})
+
+    @app.route('/large')
+    def large():
+        return jsonify(LARGE)
+
+    @app.route('/dated')
+    def dated():
+        g.last_modified = 1_700_000_000
+        return jsonify({'value': 1})
+
+    @app.route('/text')
+    def text():
+        return 'plain text'
+
+    http_cache.init_http_cache(app)
+    return app.test_client()
+
+
+def test_json_gets_validators(client):
+    response = client.get('/small')
+
+    assert response.status_code == 200
+    assert response.headers['ETag']
+    assert response.headers['Last-Modified']
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+def test_matching_etag_gets_304(client):
+    etag = client.get('/small').headers['ETag']
+
+    response = client.get('/small', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_changed_body_gets_new_etag(client, state):
+    etag = client.get('/small').headers['ETag']
+    state['value'] = 2
+
+    response = client.get('/small', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json() == {'value': 2}
+
+
+def test_large_body_is_gzipped_with_its_own_etag(client):
+    plain = client.get('/large', headers={'Accept-Encoding': 'identity'})
+    zipped = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(zipped.data)) == LARGE
+    assert zipped.headers['ETag'] == plain.headers['ETag'][:-1] + '-gz"'
+    # Either representation's validator revalidates
+    for etag in (plain.headers['ETag'], zipped.headers['ETag']):
+        assert client.get('/large', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+
+
+def test_small_body_is_not_compressed(client):
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+
+
+def test_if_modified_since_uses_route_last_modified(client):
+    response = client.get('/dated')
+    assert response.headers['Last-Modified'] == 'Tue, 14 Nov 2023 22:13:20 GMT'
+
+    assert client.get('/dated', headers={'If-Modified-Since': 'Tue, 14 Nov 2023 22:13:20 GMT'}).status_code == 304
+    assert client.get('/dated', headers={'If-Modified-Since': 'Mon, 13 Nov 2023 00:00:00 GMT'}).status_code == 200
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(client):
+    response = client.get('/dated', headers={'If-None-Match': '"other"',
+                                             'If-Modified-Since': 'Tue, 14 Nov 2023 22:13:20 GMT'})
+    assert response.status_code == 200
+
+
+def test_non_get_and_non_json_are_left_alone(client):
+    assert 'ETag' not in client.post('/small').headers
+    assert 'ETag' not in client.get('/text').headers
@@ -0,0 +1,263 @@
+import contextlib
+import sqlite3
+import threading
+import time
+import types
+
+import pytest
+
+import job_queue
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue, 'time', types.SimpleNamespace(
+        time=clock, monotonic=time.monotonic, perf_counter=time.perf_counter))
+    return clock
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'jobs.db', check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    job_queue.init_schema(conn)
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Register test handlers without leaking them into the app's registry."""
+    monkeypatch.setattr(job_queue, '_handlers', {})
+    monkeypatch.setattr(job_queue, '_on_dead', {})
+
+
+def _status(conn, job_id):
+    return conn.execute('SELECT status, attempts, run_after, error FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+
+def test_claim_takes_highest_priority_then_oldest(conn, clock):
+    low = job_queue.enqueue(conn, 'a', {'n': 1})
+    high = job_queue.enqueue(conn, 'a', {'n': 2}, priority=job_queue.PRIORITY_HIGH)
+    later_low = job_queue.enqueue(conn, 'a', {'n': 3})
+    conn.commit()
+
+    claimed = [job_queue.claim(conn, 'w').id for _ in range(3)]
+
+    assert claimed == [high, low, later_low]
+    assert job_queue.claim(conn, 'w') is None
+
+
+def test_claim_leases_and_counts_the_attempt(conn, clock):
+    job_id = job_queue.enqueue(conn, 'a', {'x': 1})
+    conn.commit()
+
+    job = job_queue.claim(conn, 'w1', lease=60)
+
+    assert (job.id, job.kind, job.payload, job.attempts) == (job_id, 'a', {'x': 1}, 1)
+    row = conn.execute('SELECT status, lease_owner, lease_expires FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    assert tuple(row) == ('running', 'w1', clock.now + 60)
+
+
+def test_claim_filters_by_kind(conn, clock):
+    job_queue.enqueue(conn, 'a', {})
+    b = job_queue.enqueue(conn, 'b', {})
+    conn.commit()
+
+    assert job_queue.claim(conn, 'w', kinds=['b']).id == b
+    assert job_queue.claim(conn, 'w', kinds=['b']) is None
+
+
+def test_complete_stores_result_and_artifact(conn, clock):
+    job_id = job_queue.enqueue(conn, 'a', {})
+    conn.commit()
+    job = job_queue.claim(conn, 'w')
+    job.artifact = b'docx bytes'
+
+    assert job_queue.complete(conn, job, 'w', {'ok': True})
+    assert job_queue.get(conn, job_id)['status'] == 'done'
+    assert job_queue.get(conn, job_id)['result'] == {'ok': True}
+    assert job_queue.get_artifact(conn, job_id) == b'docx bytes'
+
+
+def test_dedupe_key_allows_one_active_job(conn, clock):
+    first = job_queue.enqueue(conn, 'a', {}, dedupe_key='video_1')
+    again = job_queue.enqueue(conn, 'a', {}, dedupe_key='video_1')
+    conn.commit()
+    assert again == first and job_queue.is_active(conn, 'video_1')
+
+    job_queue.complete(conn, job_queue.claim(conn, 'w'), 'w')
+
+    assert not job_queue.is_active(conn, 'video_1')
+    assert job_queue.enqueue(conn, 'a', {}, dedupe_key='video_1') != first
+
+
+def test_fail_retries_with_exponential_backoff(conn, clock):
+    job_id = job_queue.enqueue(conn, 'a', {}, max_attempts=3)
+    conn.commit()
+
+    job = job_queue.claim(conn, 'w')
+    assert job_queue.fail(conn, job, 'w', 'boom')
+    row = _status(conn, job_id)
+    assert (row['status'], row['error']) == ('queued', 'boom')
+    assert row['run_after'] == clock.now + job_queue.RETRY_BASE_SECONDS
+
+    # Not runnable again before the backoff has passed
+    assert job_queue.claim(conn, 'w') is None
+    clock.now += job_queue.RETRY_BASE_SECONDS
+    job = job_queue.claim(conn, 'w')
+    assert job.attempts == 2
+
+    job_queue.fail(conn, job, 'w', 'boom')
+    assert _status(conn, job_id)['run_after'] == clock.now + 2 * job_queue.RETRY_BASE_SECONDS
+
+
+def test_backoff_is_capped():
+    assert job_queue._backoff(1) == job_queue.RETRY_BASE_SECONDS
+    assert job_queue._backoff(50) == job_queue.RETRY_MAX_SECONDS
+
+
+def test_last_failed_attempt_dead_letters_and_runs_on_dead(conn, clock, registry):
+    seen = []
+    job_queue.handler('a', on_dead=lambda c, payload, error: seen.append((payload, error)))(lambda p, j: None)
+    job_id = job_queue.enqueue(conn, 'a', {'video_id': 7}, max_attempts=1)
+    conn.commit()
+
+    job = job_queue.claim(conn, 'w')
+    assert job.last_attempt
+    job_queue.fail(conn, job, 'w', 'boom')
+
+    assert _status(conn, job_id)['status'] == 'dead'
+    assert seen == [({'video_id': 7}, 'boom')]
+    assert job_queue.claim(conn, 'w') is None
+
+
+def test_failing_on_dead_hook_does_not_block_dead_lettering(conn, clock, registry):
+    def broken_hook(c, payload, error):
+        c.execute("UPDATE jobs SET error = 'hook wrote this'")
+        raise RuntimeError('hook failed')
+
+    job_queue.handler('a', on_dead=broken_hook)(lambda p, j: None)
+    job_id = job_queue.enqueue(conn, 'a', {}, max_attempts=1)
+    conn.commit()
+
+    job_queue.fail(conn, job_queue.claim(conn, 'w'), 'w', 'boom')
+
+    row = _status(conn, job_id)
+    assert (row['status'], row['error']) == ('dead', 'boom')
+
+
+def test_expired_lease_is_requeued_for_another_worker(conn, clock):
+    job_id = job_queue.enqueue(conn, 'a', {})
+    conn.commit()
+    lost = job_queue.claim(conn, 'crashed', lease=60)
+
+    clock.now += 61
+    job = job_queue.claim(conn, 'w2')
+
+    assert (job.id, job.attempts) == (job_id, 2)
+    # The first worker's late heartbeat and outcome are rejected
+    assert not job_queue.heartbeat(conn, job_id, 'crashed')
+    assert not job_queue.complete(conn, lost, 'crashed', {'late': True})
+    assert job_queue.complete(conn, job, 'w2', {'ok': True})
+
+
+def test_heartbeat_extends_the_lease(conn, clock):
+    job_queue.enqueue(conn, 'a', {})
+    conn.commit()
+    job = job_queue.claim(conn, 'w', lease=60)
+
+    clock.now += 50
+    assert job_queue.heartbeat(conn, job.id, 'w', lease=60)
+    clock.now += 50
+
+    assert job_queue.claim(conn, 'other') is None
+
+
+def test_expired_lease_on_last_attempt_dead_letters(conn, clock, registry):
+    seen = []
+    job_queue.handler('a', on_dead=lambda c, payload, error: seen.append(error))(lambda p, j: None)
+    job_id = job_queue.enqueue(conn, 'a', {}, max_attempts=1)
+    conn.commit()
+    job_queue.claim(conn, 'crashed', lease=60)
+
+    clock.now += 61
+    assert job_queue.claim(conn, 'w') is None
+
+    assert _status(conn, job_id)['status'] == 'dead'
+    assert seen == ['Lease expired (worker crashed lost)']
+
+
+def test_retry_requeues_dead_job_with_fresh_budget(conn, clock):
+    job_id = job_queue.enqueue(conn, 'a', {}, max_attempts=1)
+    conn.commit()
+    job_queue.fail(conn, job_queue.claim(conn, 'w'), 'w', 'boom')
+
+    assert job_queue.retry(conn, job_id)
+    row = _status(conn, job_id)
+    assert (row['status'], row['attempts'], row['error']) == ('queued', 0, None)
+    assert not job_queue.retry(conn, job_id)  # only dead jobs
+
+
+def test_purge_drops_old_artifacts_then_old_jobs(conn, clock):
+    job_id = job_queue.enqueue(conn, 'a', {})
+    conn.commit()
+    job = job_queue.claim(conn, 'w')
+    job.artifact = b'data'
+    job_queue.complete(conn, job, 'w')
+
+    clock.now += 10
+    assert job_queue.purge(conn, artifact_ttl=5, retention=20) == (1, 0)
+    assert job_queue.get_artifact(conn, job_id) is None
+    clock.now += 20
+    assert job_queue.purge(conn, artifact_ttl=5, retention=20) == (0, 1)
+    assert job_queue.get(conn, job_id) is None
+
+
+def test_worker_runs_and_retries_jobs(conn, registry):
+    lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connect():
+        with lock:
+            yield conn
+
+    calls = []
+
+    @job_queue.handler('flaky')
+    def flaky(payload, job):
+        calls.append(job.attempts)
+        if job.attempts == 1:
+            raise ValueError('first attempt fails')
+        return {'double': payload['n'] * 2}
+
+    with lock:
+        job_id = job_queue.enqueue(conn, 'flaky', {'n': 21}, delay=0)
+        conn.commit()
+    worker = job_queue.Worker(connect, poll=0.01).start()
+    try:
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with lock:
+                # Skip the backoff so the retry runs right away
+                conn.execute("UPDATE jobs SET run_after = 0 WHERE status = 'queued'")
+                conn.commit()
+                if job_queue.get(conn, job_id)['status'] == 'done':
+                    break
+            time.sleep(0.01)
+    finally:
+        assert worker.stop(timeout=5)
+
+    with lock:
+        assert job_queue.get(conn, job_id)['result'] == {'double': 42}
+    assert calls == [1, 2]
@@ -0,0 +1,105 @@
+import pytest
+
+import note_history
+from note_history import NOTE_SNAPSHOT_INTERVAL
+
+BASE = ''.join(f"Line {i}: some lecture notes about topic {i}\n" for i in range(200))
+
+
+def _edit(n):
+    """The n-th saved version: a few lines changed, one added, relative to BASE."""
+    lines = BASE.splitlines(keepends=True)
+    lines[n % 200] = f"Edited in version {n}\n"
+    lines.insert((7 * n) % 200, f"Inserted in version {n}\n")
+    return ''.join(lines)
+
+
+@pytest.mark.parametrize('old, new', [
+    ('', ''),
+    ('', 'a\nb\n'),
+    ('a\nb\n', ''),
+    ('a\nb\nc\n', 'a\nc\n'),
+    ('a\nb\nc\n', 'x\na\nb\nc\ny\n'),
+    ('no trailing newline', 'no trailing newline\nmore'),
+    ('a\r\nb\r\n', 'a\r\nB\r\n'),
+    (BASE, _edit(3)),
+])
+def test_delta_round_trip(old, new):
+    assert note_history.apply_delta(old, note_history.make_delta(old, new)) == new
+
+
+def _save_versions(conn, note, count):
+    versions, previous = [], None
+    for n in range(count):
+        content = _edit(n)
+        note_history.record_revision(conn, note, f"Title {n}", content, previous=previous)
+        versions.append(content)
+        previous = content
+    return versions
+
+
+def _kinds(conn, note):
+    return {r['revision']: r['kind'] for r in note_history.list_revisions(conn, note)}
+
+
+def test_snapshot_every_interval(app_db):
+    with app_db.get_db() as conn:
+        _save_versions(conn, 'n.json', 2 * NOTE_SNAPSHOT_INTERVAL + 2)
+        kinds = _kinds(conn, 'n.json')
+
+    snapshots = sorted(r for r, kind in kinds.items() if kind == 'snapshot')
+    assert snapshots == [1, NOTE_SNAPSHOT_INTERVAL + 1, 2 * NOTE_SNAPSHOT_INTERVAL + 1]
+    assert kinds[NOTE_SNAPSHOT_INTERVAL] == 'delta'
+    assert kinds[NOTE_SNAPSHOT_INTERVAL + 2] == 'delta'
+
+
+def test_every_revision_is_rebuilt_exactly(app_db):
+    count = 2 * NOTE_SNAPSHOT_INTERVAL + 2
+    with app_db.get_db() as conn:
+        versions = _save_versions(conn, 'n.json', count)
+        rebuilt = [note_history.get_revision(conn, 'n.json', r) for r in range(1, count + 1)]
+
+    assert [r['content'] for r in rebuilt] == versions
+    assert [r['title'] for r in rebuilt] == [f"Title {n}" for n in range(count)]
+
+
+@pytest.mark.parametrize('revision', [
+    NOTE_SNAPSHOT_INTERVAL - 1,
+    NOTE_SNAPSHOT_INTERVAL,       # last delta before the boundary
+    NOTE_SNAPSHOT_INTERVAL + 1,   # the snapshot at the boundary
+    NOTE_SNAPSHOT_INTERVAL + 2,   # first delta after it
+])
+def test_revisions_around_the_snapshot_boundary(app_db, revision):
+    with app_db.get_db() as conn:
+        versions = _save_versions(conn, 'n.json', NOTE_SNAPSHOT_INTERVAL + 3)
+        assert note_history.get_revision(conn, 'n.json', revision)['content'] == versions[revision - 1]
+
+
+def test_unknown_previous_content_forces_a_snapshot(app_db):
+    with app_db.get_db() as conn:
+        note_history.record_revision(conn, 'n.json', 'T', _edit(0))
+        # The note file was changed outside the history: no delta against revision 1
+        revision = note_history.record_revision(conn, 'n.json', 'T', _edit(2), previous=_edit(1))
+
+        assert _kinds(conn, 'n.json')[revision] == 'snapshot'
+        assert note_history.get_revision(conn, 'n.json', revision)['content'] == _edit(2)
+
+
+def test_note_saved_before_history_keeps_its_old_content(app_db):
+    with app_db.get_db() as conn:
+        revision = note_history.record_revision(conn, 'old.json', 'New', _edit(1),
+                                                previous=_edit(0), previous_title='Old')
+
+        assert revision == 2
+        first = note_history.get_revision(conn, 'old.json', 1)
+        assert (first['title'], first['content']) == ('Old', _edit(0))
+        assert note_history.get_revision(conn, 'old.json', 2)['content'] == _edit(1)
+
+
+def test_missing_revision(app_db):
+    with app_db.get_db() as conn:
+        _save_versions(conn, 'n.json', 2)
+
+        assert note_history.get_revision(conn, 'n.json', 3) is None
+        assert note_history.get_revision(conn, 'other.json', 1) is None
+        assert note_history.latest_revision_number(conn, 'n.json') == 2
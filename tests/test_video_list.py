@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+import db_pool
+
+
+@pytest.fixture
+def api(app_db):
+    with app_db.get_db() as conn:
+        conn.execute('DELETE FROM videos')  # init_db seeds sample videos
+        conn.commit()
+    app_db.invalidate_video_list()
+    app = Flask(__name__)
+    app.register_blueprint(app_db.bp)
+    yield app.test_client()
+    app_db.invalidate_video_list()
+
+
+def _add_videos(videos):
+    # Written through a separate connection, like another process would
+    conn = sqlite3.connect(db_pool.DATABASE_PATH)
+    conn.executemany('INSERT INTO videos (title, filename, url, type, upload_date) VALUES (?, ?, ?, ?, ?)', videos)
+    conn.commit()
+    conn.close()
+
+
+def _pages(api, **params):
+    titles, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        data = api.get('/api/videos', query_string=query).get_json()
+        titles += [v['title'] for v in data['videos']]
+        pages += 1
+        cursor = data['next_cursor']
+        if cursor is None:
+            return titles, pages
+
+
+def test_cursor_round_trip(app_db):
+    cursor = app_db.encode_video_cursor('2025-01-02 03:04:05', 42)
+    assert app_db.decode_video_cursor(cursor) == ('2025-01-02 03:04:05', 42)
+
+
+def test_keyset_pages_cover_every_video_once(api):
+    # Several videos share an upload_date: ties are broken by id
+    _add_videos([(f'Video {i}', f'v{i}.mp4', None, 'upload', f'2025-01-0{1 + i // 3} 10:00:00')
+                 for i in range(8)])
+
+    titles, pages = _pages(api, limit=3)
+
+    assert pages == 3
+    assert titles == [f'Video {i}' for i in reversed(range(8))]
+
+
+def test_filters_apply_across_pages(api):
+    _add_videos([(f'Physics {i}', None, f'https://youtu.be/{i}', 'youtube', f'2025-02-0{1 + i} 10:00:00')
+                 for i in range(5)]
+                + [('Physics 100% guide', 'p.mp4', None, 'upload', '2025-03-01 10:00:00'),
+                   ('Chemistry', 'c.mp4', None, 'upload', '2025-03-02 10:00:00')])
+
+    youtube, pages = _pages(api, limit=2, type='youtube')
+    assert youtube == [f'Physics {i}' for i in reversed(range(5))]
+    assert pages == 3
+
+    titles = [v['title'] for v in api.get('/api/videos', query_string={'q': 'Physics 100%'}).get_json()['videos']]
+    assert titles == ['Physics 100% guide']
+
+
+def test_invalid_cursor(api):
+    assert api.get('/api/videos', query_string={'cursor': 'not-a-cursor'}).status_code == 400
+
+
+def test_writes_from_other_processes_invalidate_the_cache(api):
+    _add_videos([('First', 'a.mp4', None, 'upload', '2025-01-01 10:00:00')])
+    assert len(api.get('/api/videos').get_json()['videos']) == 1
+
+    _add_videos([('Second', 'b.mp4', None, 'upload', '2025-01-02 10:00:00')])
+
+    assert [v['title'] for v in api.get('/api/videos').get_json()['videos']] == ['Second', 'First']
@@ -0,0 +1,111 @@
+import pytest
+from flask import Flask
+from werkzeug.wsgi import FileWrapper
+
+from video_streaming import send_media_file
+
+DATA = bytes(range(256)) * 4  # 1024 bytes
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / 'lecture.mp4'
+    path.write_bytes(DATA)
+    app = Flask(__name__)
+    app.add_url_rule('/video', 'video', lambda: send_media_file(str(path)), methods=['GET', 'HEAD'])
+    return app.test_client()
+
+
+def _get(client, **headers):
+    return client.get('/video', headers=headers)
+
+
+def test_full_file_without_range(client):
+    response = _get(client)
+
+    assert response.status_code == 200
+    assert response.data == DATA
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    assert response.headers['Content-Length'] == str(len(DATA))
+    assert response.mimetype == 'video/mp4'
+
+
+@pytest.mark.parametrize('header, start, stop', [
+    ('bytes=0-99', 0, 100),
+    ('bytes=100-199', 100, 200),
+    ('bytes=1000-', 1000, 1024),     # open-ended: to EOF
+    ('bytes=-24', 1000, 1024),       # suffix: the last 24 bytes
+    ('bytes=1000-5000', 1000, 1024), # end past EOF is clipped
+    ('bytes=-5000', 0, 1024),        # suffix longer than the file
+])
+def test_single_range(client, header, start, stop):
+    response = _get(client, Range=header)
+
+    assert response.status_code == 206
+    assert response.data == DATA[start:stop]
+    assert response.headers['Content-Range'] == f'bytes {start}-{stop - 1}/{len(DATA)}'
+    assert response.headers['Content-Length'] == str(stop - start)
+
+
+@pytest.mark.parametrize('header', ['bytes=1024-', 'bytes=5000-6000'])
+def test_unsatisfiable_range(client, header):
+    response = _get(client, Range=header)
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(DATA)}'
+
+
+@pytest.mark.parametrize('header', ['bytes=abc', 'bytes=20-10', 'items=0-10', 'bytes=0-1,5-6'])
+def test_invalid_or_multiple_ranges_send_the_whole_file(client, header):
+    response = _get(client, Range=header)
+
+    assert response.status_code == 200
+    assert response.data == DATA
+
+
+def test_bounded_range_with_file_wrapper_stops_at_range_end(client):
+    response = client.get('/video', headers={'Range': 'bytes=10-19'},
+                          environ_overrides={'wsgi.file_wrapper': FileWrapper})
+
+    assert response.status_code == 206
+    assert response.data == DATA[10:20]
+
+
+def test_open_range_with_file_wrapper(client):
+    response = client.get('/video', headers={'Range': 'bytes=1000-'},
+                          environ_overrides={'wsgi.file_wrapper': FileWrapper})
+
+    assert response.data == DATA[1000:]
+
+
+def test_if_range_with_current_etag_honours_range(client):
+    etag = _get(client).headers['ETag']
+
+    response = _get(client, Range='bytes=0-9', **{'If-Range': etag})
+
+    assert response.status_code == 206
+    assert response.data == DATA[:10]
+
+
+def test_if_range_with_stale_validator_sends_the_whole_file(client):
+    response = _get(client, Range='bytes=0-9', **{'If-Range': '"stale"'})
+    assert (response.status_code, response.data) == (200, DATA)
+
+    response = _get(client, Range='bytes=0-9', **{'If-Range': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+    assert (response.status_code, response.data) == (200, DATA)
+
+
+def test_conditional_get(client):
+    first = _get(client)
+
+    assert _get(client, **{'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert _get(client, **{'If-None-Match': '"other"'}).status_code == 200
+    assert _get(client, **{'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+
+
+def test_head_sends_headers_only(client):
+    response = client.head('/video', headers={'Range': 'bytes=0-9'})
+
+    assert response.status_code == 206
+    assert response.data == b''
+    assert response.headers['Content-Length'] == '10'
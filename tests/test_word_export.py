@@ -0,0 +1,91 @@
+import io
+import zipfile
+
+from docx import Document
+from docx.oxml.styles import CT_Styles
+
+import word_export_utils
+
+NOTE = """# Title
+
+Some **bold `code`** and *italic* $x^2$
+
+## Section
+
+- item `x`
+  - nested
+1. first
+> a quote
+
+---
+
+```
+code block
+```
+
+$$a+b$$
+
+#### Deep heading
+
+plain `z`
+"""
+
+
+def _render(content):
+    buffer = io.BytesIO()
+    word_export_utils.create_word_document(content, buffer)
+    return Document(io.BytesIO(buffer.getvalue()))
+
+
+def test_blocks_get_note_styles():
+    doc = _render(NOTE)
+    styles = [p.style.name for p in doc.paragraphs if p.text or p.style.name != 'Normal']
+
+    assert styles[0] == 'Heading 1'
+    assert 'Heading 2' in styles
+    for name in ('Note Code', 'Note Math', 'Note Quote', 'Note Rule',
+                 'Note List Bullet', 'Note List Number'):
+        assert name in styles
+    # Headings below level 3 fall back to Heading 3
+    assert doc.paragraphs[styles.index('Heading 3')].text == 'Deep heading'
+
+
+def test_inline_code_runs_get_code_char_style():
+    doc = _render("text `code` more")
+    runs = doc.paragraphs[-1].runs
+
+    assert [(r.text, r.style.name) for r in runs if r.style.name == word_export_utils.INLINE_CODE_STYLE] \
+        == [('code', word_export_utils.INLINE_CODE_STYLE)]
+
+
+def test_add_formatted_run_without_style_ids():
+    doc = word_export_utils.new_document()
+    p = doc.add_paragraph()
+    word_export_utils.add_formatted_run(p, 'a `b`')
+
+    assert [r.style.name for r in p.runs if r.text == 'b'] == [word_export_utils.INLINE_CODE_STYLE]
+
+
+def test_render_does_not_rescan_styles_per_paragraph(monkeypatch):
+    # python-docx's public .style setters call CT_Styles.default_for, which
+    # walks every style in styles.xml. Doing that per paragraph made exports
+    # slower than before the template renderer; styles must be resolved once.
+    calls = []
+    original = CT_Styles.default_for
+
+    def counting_default_for(self, style_type):
+        calls.append(style_type)
+        return original(self, style_type)
+
+    monkeypatch.setattr(CT_Styles, 'default_for', counting_default_for)
+    word_export_utils.create_word_document(NOTE * 100, io.BytesIO())
+
+    assert len(calls) <= 2
+
+
+def test_bytes_are_cached_and_valid_docx():
+    key, data = word_export_utils.create_word_document_bytes(NOTE)
+    again_key, again = word_export_utils.create_word_document_bytes(NOTE)
+
+    assert key == again_key and data == again
+    assert 'word/document.xml' in zipfile.ZipFile(io.BytesIO(data)).namelist()
@@ -22,49 +22,71 @@ load_dotenv()
 # Fix for OpenMP duplicate runtime error
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
-# Add FFmpeg to PATH for this session (Winget install location)
-ffmpeg_path = os.path.join(os.environ['LOCALAPPDATA'], r"Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0.1-full_build\bin")
-if os.path.exists(ffmpeg_path):
-    os.environ["PATH"] += os.pathsep + ffmpeg_path
-
 import io
 from typing import Optional
 import click
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, request, jsonify, g
 from flask_cors import CORS
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-import whisper
 import tempfile
+import time
+import socket
 from werkzeug.utils import secure_filename
-import speech_recognition as sr
-from pydub import AudioSegment
-from groq import Groq
-from word_export_utils import create_word_document
+import note_history
+from http_cache import init_http_cache
+from video_streaming import send_media_file
+import chunked_upload
+import media_probe
+import hls_transcode
+import job_queue
+import asr_backends
+import subtitle_formats
+from compact_transcript import CompactTranscript
+import transcript_search
+import recommendations
+import db_pool
+import metrics
+import profiling
+import admin_auth
+import logging
+from log_config import configure_logging
 from flask import send_file
 import sqlite3
 import contextlib
 
-# Database Helper
+log = logging.getLogger('transcript_api')
+
+# Heavy dependencies (whisper/torch, speech_recognition, pydub, groq, python-docx)
+# are imported on first use inside the functions that need them, so the CLI and
+# the app start without paying for libraries a request may never touch.
+
+def add_winget_ffmpeg_to_path():
+    """Add FFmpeg to PATH for this session (Winget install location on Windows)."""
+    local_app_data = os.environ.get('LOCALAPPDATA')
+    if not local_app_data:
+        return
+    ffmpeg_path = os.path.join(local_app_data, r"Microsoft\WinGet\Packages\Gyan.FFmpeg_Microsoft.Winget.Source_8wekyb3d8bbwe\ffmpeg-8.0.1-full_build\bin")
+    if os.path.exists(ffmpeg_path) and ffmpeg_path not in os.environ["PATH"].split(os.pathsep):
+        os.environ["PATH"] += os.pathsep + ffmpeg_path
+
+# Database Helpers (pooled, tuned connections - see db_pool.py)
 @contextlib.contextmanager
 def get_db():
-    conn = sqlite3.connect('app.db', timeout=10) # 10s timeout to handle locking
-    conn.row_factory = sqlite3.Row
-    try:
+    """Read/write connection; commit explicitly, anything left uncommitted is rolled back."""
+    with db_pool.writer.connection() as conn:
+        yield conn
+
+@contextlib.contextmanager
+def get_read_db():
+    """Read-only connection for queries that never write."""
+    with db_pool.reader.connection() as conn:
         yield conn
-    finally:
-        conn.close()
 
 # Database Setup
 def init_db():
     with get_db() as conn:
         c = conn.cursor()
         
-        # Enable WAL mode for better concurrency
-        try:
-            c.execute('PRAGMA journal_mode=WAL')
-        except:
-            pass
-        
         # Create videos table
         # Create videos table
         c.execute('''
@@ -88,6 +110,38 @@ def init_db():
         except sqlite3.OperationalError:
             pass # Columns likely exist
             
+        # Catalog listing is ordered (and paginated) by upload date
+        c.execute('CREATE INDEX IF NOT EXISTS idx_videos_upload_date ON videos (upload_date DESC, id DESC)')
+        
+        # Change counter of the videos table, bumped by triggers on every write from any
+        # process; cached video list pages are only served while it is unchanged
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS videos_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        c.execute('INSERT OR IGNORE INTO videos_version (id, version) VALUES (1, 0)')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            c.execute(f'CREATE TRIGGER IF NOT EXISTS videos_version_{event.lower()} AFTER {event} ON videos '
+                      'BEGIN UPDATE videos_version SET version = version + 1 WHERE id = 1; END')
+        
+        # Media metadata filled in by the background prober (see media_probe.py)
+        for column in ('codec TEXT', 'width INTEGER', 'height INTEGER', 'bitrate INTEGER',
+                       'sprite TEXT', 'media_info TEXT', 'media_status TEXT', 'hls_status TEXT',
+                       'transcript_status TEXT', 'transcript_error TEXT', 'sprite_layout TEXT'):
+            try:
+                c.execute(f'ALTER TABLE videos ADD COLUMN {column}')
+            except sqlite3.OperationalError:
+                pass # Column exists
+        
+        # Sprite layouts used to be stored only inside media_info
+        try:
+            c.execute("UPDATE videos SET sprite_layout = json_extract(media_info, '$.sprite_layout') "
+                      "WHERE sprite_layout IS NULL AND sprite IS NOT NULL AND media_info IS NOT NULL")
+        except sqlite3.OperationalError:
+            pass # SQLite without JSON functions
+            
         conn.commit()
         
         # Create users table
@@ -101,6 +155,81 @@ def init_db():
             )
         ''')
         
+        # Create note revisions table (see note_history.py)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS note_revisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                note TEXT NOT NULL,
+                revision INTEGER NOT NULL,
+                kind TEXT NOT NULL, -- 'snapshot' or 'delta'
+                title TEXT,
+                payload BLOB NOT NULL,
+                size INTEGER,
+                content_hash TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (note, revision)
+            )
+        ''')
+        
+        # Create HLS rendition table (see hls_transcode.py)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS video_renditions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                video_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                bandwidth INTEGER,
+                playlist TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (video_id, name)
+            )
+        ''')
+        
+        # Create precomputed transcript table, filled by the background transcriber
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS video_transcripts (
+                video_id INTEGER PRIMARY KEY,
+                segments BLOB NOT NULL, -- CompactTranscript bytes (older rows: JSON list of {text, start, duration})
+                language TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create the transcript search index (see transcript_search.py)
+        if transcript_search.init_schema(conn):
+            transcript_search.backfill(conn)
+        
+        # Create the background job table (see job_queue.py)
+        job_queue.init_schema(conn)
+        requeue_orphaned_jobs(conn)
+        
+        # Create resumable upload tables (see chunked_upload.py)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS upload_sessions (
+                id TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                title TEXT,
+                size INTEGER NOT NULL,
+                chunk_size INTEGER NOT NULL,
+                sha256 TEXT,
+                created_at REAL,
+                state TEXT NOT NULL DEFAULT 'open' -- 'open' or 'finalizing'
+            )
+        ''')
+        try:
+            c.execute("ALTER TABLE upload_sessions ADD COLUMN state TEXT NOT NULL DEFAULT 'open'")
+        except sqlite3.OperationalError:
+            pass # Column exists
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS upload_chunks (
+                upload_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                sha256 TEXT,
+                PRIMARY KEY (upload_id, idx)
+            )
+        ''')
+        
         # Check if admin exists
         try:
             c.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
@@ -109,7 +238,7 @@ def init_db():
                      ('teacher', 'teacher123', 'teacher'))
             c.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
                      ('student', 'student123', 'student'))
-            print("Initialized default users: admin, teacher, student")
+            log.info("Initialized default users: admin, teacher, student")
         except sqlite3.IntegrityError:
             pass # Users already exist
             
@@ -122,35 +251,40 @@ def init_db():
                 ('Data Science Full Course', 'https://www.youtube.com/watch?v=X3paOmcrTjQ', 'youtube', 'https://img.youtube.com/vi/X3paOmcrTjQ/hqdefault.jpg')
             ]
             c.executemany('INSERT INTO videos (title, url, type, thumbnail, duration, filename) VALUES (?, ?, ?, ?, 0, "external_link")', seed_courses)
-            print(f"Seeded {len(seed_courses)} YouTube courses")
-            conn.commit()
-
-# Initialize DB on startup
-init_db()
+            log.info("Seeded YouTube courses", extra={'count': len(seed_courses)})
+        conn.commit()
 
-app = Flask(__name__)
-CORS(app)
+# Routes are collected on a blueprint and attached to the app in create_app()
+bp = Blueprint('api', __name__)
 
 # Configure upload settings
-app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max file size
+MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
 ALLOWED_EXTENSIONS = {'mp3', 'wav', 'm4a', 'flac', 'ogg', 'aac', 'wma', 'webm', 'mp4', 'mov', 'avi'}
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'videos')
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
+# Part files of resumable uploads (same filesystem, so finalizing is a rename)
+PARTIAL_UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'partial')
+# Thumbnails and seek-preview sprites generated for uploads
+THUMBNAIL_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'thumbnails')
+# HLS renditions, one directory per video id
+HLS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads', 'hls')
 
 # Groq Client - Load API key from environment variable
 groq_api_key = os.getenv('GROQ_API_KEY')
-if not groq_api_key:
-    print("WARNING: GROQ_API_KEY not found in environment variables. Summarization will not work.")
-    print("Please add your Groq API key to the .env file")
-groq_client = Groq(api_key=groq_api_key) if groq_api_key else None
+_groq_client = None
+
+def get_groq_client():
+    """Groq client, created on first use; None when no API key is configured."""
+    global _groq_client
+    if _groq_client is None and groq_api_key:
+        from groq import Groq
+        _groq_client = Groq(api_key=groq_api_key)
+    return _groq_client
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # --- Auth Endpoints ---
-@app.route('/api/auth/login', methods=['POST'])
+@bp.route('/api/auth/login', methods=['POST'])
 def api_login():
     data = request.get_json()
     username = data.get('username')
@@ -159,7 +293,7 @@ def api_login():
     if not username or not password:
         return jsonify({'error': 'Username and password required'}), 400
         
-    with get_db() as conn:
+    with get_read_db() as conn:
         c = conn.cursor()
         c.execute('SELECT * FROM users WHERE username = ?', (username,))
         user = c.fetchone()
@@ -176,7 +310,7 @@ def api_login():
     
     return jsonify({'error': 'Invalid credentials'}), 401
 
-@app.route('/api/auth/register', methods=['POST'])
+@bp.route('/api/auth/register', methods=['POST'])
 def api_register():
     data = request.get_json()
     username = data.get('username')
@@ -208,7 +342,7 @@ def api_register():
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/health', methods=['GET'])
+@bp.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
     return jsonify({
@@ -217,125 +351,51 @@ def health_check():
         'message': 'Backend is running'
     })
 
-def transcribe_audio_file(audio_file_path):
-    """Transcribe audio file using Whisper."""
+@bp.route('/api/asr/backends', methods=['GET'])
+def api_asr_backends():
+    """Speech recognition backends, whether their engine is installed, and the default."""
+    return jsonify({'default': asr_backends.ASR_BACKEND,
+                    'backends': [backend.info() for backend in asr_backends.BACKENDS.values()]})
+
+def get_whisper_model():
+    """Load the Whisper model once per process and reuse it for every transcription."""
+    return asr_backends.get_backend('whisper').load()
+
+def transcribe_audio_file(audio_file_path, method=None):
+    """Transcribe an audio/video file with an ASR backend (default ASR_BACKEND). None on failure."""
     try:
-        print(f"Loading Whisper model...")
-        model = whisper.load_model("base")  # Use base model for faster processing
-        
-        print(f"Transcribing audio file: {audio_file_path}")
-        print(f"File exists: {os.path.exists(audio_file_path)}")
-        print(f"File size: {os.path.getsize(audio_file_path)} bytes")
+        backend = asr_backends.get_backend(method)
         
         # Check if file exists and is readable
         if not os.path.exists(audio_file_path):
-            print(f"Error: Audio file does not exist: {audio_file_path}")
+            log.error("Audio file does not exist", extra={'path': audio_file_path})
             return None
         
         # Check if file is empty
-        if os.path.getsize(audio_file_path) == 0:
-            print(f"Error: Audio file is empty")
+        size = os.path.getsize(audio_file_path)
+        if size == 0:
+            log.error("Audio file is empty", extra={'path': audio_file_path})
             return None
-            
-        # Transcribe with verbose output to debug
-        result = model.transcribe(
-            audio_file_path,
-            language='en',
-            verbose=True,
-            fp16=False  # Disable fp16 for better compatibility
-        )
         
-        print(f"Whisper result keys: {result.keys()}")
-        print(f"Number of segments: {len(result.get('segments', []))}")
-        print(f"Detected language: {result.get('language', 'unknown')}")
-        print(f"Full text length: {len(result.get('text', ''))}")
-        
-        # Convert Whisper format to our standard format
-        transcript_data = []
-        for segment in result.get('segments', []):
-            transcript_data.append({
-                'text': segment['text'].strip(),
-                'start': segment['start'],
-                'duration': segment['end'] - segment['start']
-            })
+        log.info("Transcribing audio file", extra={'path': audio_file_path, 'bytes': size, 'backend': backend.name})
+        transcript_data = backend.transcribe(audio_file_path, language='en')
         
-        # If no segments but we have text, create a single segment
-        if not transcript_data and result.get('text', '').strip():
-            print("No segments found, but text exists. Creating single segment.")
-            transcript_data.append({
-                'text': result['text'].strip(),
-                'start': 0.0,
-                'duration': 0.0
-            })
+        if log.isEnabledFor(logging.DEBUG):
+            for segment in transcript_data:
+                log.debug("ASR segment", extra=segment)
         
-        print(f"Successfully transcribed {len(transcript_data)} segments")
+        log.info("Transcribed audio file", extra={
+            'path': audio_file_path,
+            'backend': backend.name,
+            'segments': len(transcript_data),
+            'chars': sum(len(segment['text']) for segment in transcript_data),
+        })
         return transcript_data
         
-    except Exception as e:
-        print(f"Error transcribing audio: {e}")
-        print(f"Error type: {type(e)}")
-        print(f"Error details: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        log.exception("Error transcribing audio", extra={'path': audio_file_path, 'backend': method})
         return None
 
-# -------------------------------------------------
-# Google Speech Recognition (Alternative to Whisper)
-# -------------------------------------------------
-def prepare_voice_file(path: str) -> str:
-    """
-    Converts input audio file to WAV format if necessary and returns the path to the WAV file.
-    """
-    if os.path.splitext(path)[1] == '.wav':
-        return path
-    elif os.path.splitext(path)[1] in ('.mp3', '.m4a', '.ogg', '.flac'):
-        audio_file = AudioSegment.from_file(
-            path, format=os.path.splitext(path)[1][1:])
-        wav_file = os.path.splitext(path)[0] + '.wav'
-        audio_file.export(wav_file, format='wav')
-        return wav_file
-    else:
-        raise ValueError(
-            f'Unsupported audio format: {os.path.splitext(path)[1]}')
-
-
-def transcribe_with_google_speech(audio_data, language='en-US') -> str:
-    """
-    Transcribes audio data to text using Google's speech recognition API.
-    """
-    r = sr.Recognizer()
-    try:
-        text = r.recognize_google(audio_data, language=language)
-        return text
-    except sr.UnknownValueError:
-        return "Google Speech Recognition could not understand audio"
-    except sr.RequestError:
-        return "Could not request results from Google Speech Recognition service"
-    except Exception as e:
-        return f"Speech recognition error: {str(e)}"
-
-
-def write_transcription_to_file(text, output_file) -> None:
-    """
-    Writes the transcribed text to the output file.
-    """
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(text)
-
-
-def speech_to_text(input_path: str, output_path: str, language: str = 'en-US') -> None:
-    """
-    Transcribes an audio file at the given path to text and writes the transcribed text to the output file.
-    """
-    wav_file = prepare_voice_file(input_path)
-    with sr.AudioFile(wav_file) as source:
-        audio_data = sr.Recognizer().record(source, duration=30)  # Record for 30 seconds
-        text = transcribe_with_google_speech(audio_data, language)
-        write_transcription_to_file(text, output_path)
-        print('Transcription:')
-        print(text)
-
-
 def extract_video_id(url: str) -> Optional[str]:
     """Extract YouTube video ID from various URL formats."""
     patterns = [
@@ -359,9 +419,24 @@ def format_timestamp(seconds: float) -> str:
     return f"{hours:02d}:{minutes:02d}:{secs:02d}"
 
 
+# Optional captions service standing in for YouTube (e.g. the load-test stub):
+# GET <YOUTUBE_CAPTIONS_URL>/captions/<video_id> -> [{text, start, duration}], 404 if none
+YOUTUBE_CAPTIONS_URL = os.getenv('YOUTUBE_CAPTIONS_URL')
+
+def fetch_captions_from_service(video_id: str):
+    import requests
+    response = requests.get(f"{YOUTUBE_CAPTIONS_URL.rstrip('/')}/captions/{video_id}", timeout=30)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
 def get_transcript_data(video_id: str):
     """Get transcript data for a video."""
     try:
+        if YOUTUBE_CAPTIONS_URL:
+            return fetch_captions_from_service(video_id)
+        
         # Create an instance and use the fetch method
         api = YouTubeTranscriptApi()
         transcript = api.fetch(video_id, languages=('en',))
@@ -378,20 +453,25 @@ def get_transcript_data(video_id: str):
         return transcript_data
     except (TranscriptsDisabled, NoTranscriptFound):
         return None
-    except Exception as e:
-        print(f"Error getting transcript: {e}")
+    except Exception:
+        log.exception("Error getting transcript")
         return None
 
 
-@app.route('/api/transcribe-audio', methods=['POST'])
+@bp.route('/api/transcribe-audio', methods=['POST'])
+@profiling.profiled
 def api_transcribe_audio():
-    """Web API endpoint to transcribe audio file."""
+    """Web API endpoint to transcribe audio file. Form field `method` picks the ASR backend."""
     temp_file_path = None
     try:
         # Check if file is in request
         if 'audio' not in request.files:
             return jsonify({'error': 'No audio file provided'}), 400
         
+        method = request.form.get('method') or asr_backends.ASR_BACKEND
+        if method not in asr_backends.BACKENDS:
+            return jsonify({'error': f"Unknown method. Available: {', '.join(asr_backends.BACKENDS)}"}), 400
+        
         file = request.files['audio']
         
         if file.filename == '':
@@ -400,9 +480,7 @@ def api_transcribe_audio():
         if not allowed_file(file.filename):
             return jsonify({'error': f'File type not allowed. Allowed types: {", ".join(sorted(ALLOWED_EXTENSIONS))}'}), 400
         
-        print(f"\n=== Audio Transcription Request ===")
-        print(f"Received audio file: {file.filename}")
-        print(f"Content type: {file.content_type}")
+        log.info("Audio transcription request", extra={'upload': file.filename, 'content_type': file.content_type})
         
         # Get file extension
         filename = secure_filename(file.filename)
@@ -410,21 +488,19 @@ def api_transcribe_audio():
         
         # Read file directly into memory
         audio_bytes = file.read()
-        print(f"Audio bytes read: {len(audio_bytes)}")
+        log.debug("Audio bytes read", extra={'bytes': len(audio_bytes)})
         
         if len(audio_bytes) == 0:
             return jsonify({'error': 'Uploaded file is empty'}), 400
         
-        # Save to temporary file for Whisper with proper extension
+        # Save to temporary file for the ASR backend with proper extension
         with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext, mode='wb') as temp_file:
             temp_file.write(audio_bytes)
             temp_file_path = temp_file.name
             temp_file.flush()
             os.fsync(temp_file.fileno())
         
-        print(f"Temp file created: {temp_file_path}")
-        print(f"Temp file size: {os.path.getsize(temp_file_path)} bytes")
-        print(f"Temp file exists: {os.path.exists(temp_file_path)}")
+        log.debug("Temp file created", extra={'path': temp_file_path})
         
         # Verify the file was written correctly
         if not os.path.exists(temp_file_path):
@@ -434,14 +510,14 @@ def api_transcribe_audio():
             return jsonify({'error': 'Temporary file is empty'}), 500
         
         # Transcribe the audio file
-        transcript_data = transcribe_audio_file(temp_file_path)
+        transcript_data = transcribe_audio_file(temp_file_path, method=method)
         
         if transcript_data is None:
             return jsonify({
                 'filename': file.filename,
                 'transcripts': [],
                 'totalSegments': 0,
-                'message': 'Failed to transcribe audio file - Whisper returned no results'
+                'message': f'Failed to transcribe audio file - {method} returned no results'
             }), 500
         
         if len(transcript_data) == 0:
@@ -452,20 +528,16 @@ def api_transcribe_audio():
                 'message': 'No speech detected in audio file'
             }), 200
         
-        print(f"Successfully transcribed {len(transcript_data)} segments")
-        print(f"=== Transcription Complete ===\n")
         
         return jsonify({
             'filename': file.filename,
             'transcripts': transcript_data,
-            'totalSegments': len(transcript_data)
+            'totalSegments': len(transcript_data),
+            'method': method
         })
         
     except Exception as e:
-        print(f"\n!!! Audio transcription API Error !!!")
-        print(f"Error: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Audio transcription API error")
         return jsonify({
             'error': 'Failed to transcribe audio',
             'details': str(e)
@@ -477,15 +549,16 @@ def api_transcribe_audio():
             try:
                 if os.path.exists(temp_file_path):
                     os.unlink(temp_file_path)
-                    print(f"Cleaned up temp file: {temp_file_path}")
+                    log.debug("Cleaned up temp file", extra={'path': temp_file_path})
             except Exception as cleanup_error:
-                print(f"Failed to cleanup temp file: {cleanup_error}")
+                log.warning("Failed to cleanup temp file", extra={'path': temp_file_path, 'error': cleanup_error})
 
 
 # -------------------------------------------------
 # API: Google Speech Recognition
 # -------------------------------------------------
-@app.route("/api/transcribe-google", methods=["POST"])
+@bp.route("/api/transcribe-google", methods=["POST"])
+@profiling.profiled
 def api_transcribe_google():
     """Web API endpoint to transcribe audio using Google Speech Recognition."""
     try:
@@ -500,7 +573,7 @@ def api_transcribe_google():
         if not allowed_file(file.filename):
             return jsonify({"error": "Unsupported audio format"}), 400
         
-        print(f"Google Speech Recognition: {file.filename}")
+        log.info("Google Speech Recognition request", extra={'upload': file.filename})
         
         # Read file directly into memory
         audio_bytes = file.read()
@@ -508,36 +581,24 @@ def api_transcribe_google():
         if len(audio_bytes) == 0:
             return jsonify({"error": "Uploaded file is empty"}), 400
         
-        # Save to temporary file for Google Speech
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
+        # Save to temporary file for the google ASR backend (ffmpeg decodes any supported format)
+        suffix = os.path.splitext(secure_filename(file.filename))[1] or ".wav"
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
             temp_file.write(audio_bytes)
             temp_file_path = temp_file.name
         
         try:
-            # Convert to WAV format if needed
-            wav_path = prepare_voice_file(temp_file_path)
-            
-            # Transcribe using Google Speech Recognition
-            with sr.AudioFile(wav_path) as source:
-                audio_data = sr.Recognizer().record(source, duration=30)
-                text = transcribe_with_google_speech(audio_data)
+            transcript_data = transcribe_audio_file(temp_file_path, method='google')
             
-            if text.startswith("Google Speech Recognition") or text.startswith("Speech recognition error"):
+            if transcript_data is None:
                 return jsonify({
                     "filename": file.filename,
                     "transcripts": [],
                     "totalSegments": 0,
-                    "message": text
+                    "message": "Google Speech Recognition failed"
                 }), 500
             
-            # Create transcript segments
-            transcript_data = [{
-                "text": text.strip(),
-                "start": 0.0,
-                "duration": 30.0
-            }]
-            
-            print(f"Google Speech Recognition completed: {len(text)} characters")
+            log.info("Google Speech Recognition completed", extra={'segments': len(transcript_data)})
             
             return jsonify({
                 "filename": file.filename,
@@ -547,44 +608,131 @@ def api_transcribe_google():
             })
             
         finally:
-            # Clean up temporary files
-            for temp_path in [temp_file_path, wav_path]:
-                try:
-                    if os.path.exists(temp_path):
-                        os.unlink(temp_path)
-                        print(f"Cleaned up: {temp_path}")
-                except:
-                    pass
+            try:
+                os.unlink(temp_file_path)
+            except OSError:
+                pass
         
     except Exception as e:
-        print(f"Google Speech Recognition Error: {e}")
+        log.exception("Google Speech Recognition Error")
         return jsonify({
             "error": "Failed to transcribe audio",
             "details": str(e)
         }), 500
 
 
-@app.route('/api/transcript', methods=['POST'])
+def combine_transcript(video_id, transcript_data):
+    """Response body for /api/transcript: all segments joined into one text block."""
+    # Combine all transcripts into a single text block (User requested "no time line")
+    full_text = " ".join([item['text'] for item in transcript_data])
+    
+    # Clean up whitespace
+    full_text = " ".join(full_text.split())
+    
+    # Create a single segment containing the entire text
+    segmented_transcripts = [{
+        'start': 0,
+        'end': transcript_data[-1]['start'] + transcript_data[-1]['duration'] if transcript_data else 0,
+        'text': full_text
+    }]
+    
+    return {
+        'videoId': video_id,
+        'transcripts': segmented_transcripts,
+        'totalSegments': len(segmented_transcripts)
+    }
+
+
+def index_catalog_captions(youtube_id, transcript_data):
+    """Make fetched captions of a catalog YouTube video searchable (once; they are not stored otherwise)."""
+    if not transcript_search.enabled:
+        return
+    try:
+        with get_read_db() as conn:
+            rows = conn.execute("SELECT id, url FROM videos WHERE type = 'youtube' AND url LIKE ?",
+                                (f'%{youtube_id}%',)).fetchall()
+            video_ids = [row['id'] for row in rows if extract_video_id(row['url'] or '') == youtube_id
+                         and not transcript_search.is_indexed(conn, row['id'])]
+        if not video_ids:
+            return
+        with get_db() as conn:
+            for video_id in video_ids:
+                transcript_search.index_transcript(conn, video_id, transcript_data)
+            conn.commit()
+    except Exception:
+        log.exception("Indexing captions failed", extra={'video_id': youtube_id})
+
+def transcript_file_response(name, transcript_data, fmt):
+    """Stream segments as a subtitle/text file (see subtitle_formats), one chunk per segment."""
+    response = Response(subtitle_formats.stream(fmt, transcript_data),
+                        mimetype=subtitle_formats.MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'inline; filename="{name}.{fmt}"'
+    return response
+
+
+@bp.route('/api/transcript', methods=['GET', 'POST'])
+@profiling.profiled
 def api_get_transcript():
-    """Web API endpoint to get transcript."""
+    """Web API endpoint to get transcript. GET (?url=) responses can be revalidated with ETags.
+    
+    `format` (query or body) selects json (default, combined text) or txt/srt/vtt/jsonl (streamed, timed).
+    `t` (± `context`) or `start`/`end`, in seconds, return the timed segments of that window instead.
+    """
     try:
-        data = request.get_json()
-        url = data.get('url')
+        if request.method == 'GET':
+            params = request.args
+            url = request.args.get('url')
+            upload_id = request.args.get('video_id', type=int)
+            fmt = request.args.get('format', 'json')
+        else:
+            data = request.get_json()
+            params = data
+            url = data.get('url')
+            upload_id = data.get('video_id')
+            fmt = data.get('format', 'json')
         
-        if not url:
+        if not url and upload_id is None:
             return jsonify({'error': 'YouTube URL is required'}), 400
+        if fmt != 'json' and fmt not in subtitle_formats.FORMATS:
+            return jsonify({'error': f"Unsupported format: {fmt}"}), 400
+        
+        # Uploaded lectures are transcribed in the background right after upload
+        upload = find_uploaded_video(url=url, video_id=upload_id)
+        if upload is not None:
+            transcript_data = get_stored_transcript(upload['id'])
+            if transcript_data is None:
+                return jsonify({
+                    'videoId': upload['id'],
+                    'transcript_status': upload['transcript_status'],
+                    'transcripts': [],
+                    'totalSegments': 0,
+                    'message': 'Transcript is not ready yet'
+                }), 202
+            if fmt != 'json':
+                return transcript_file_response(f"video_{upload['id']}", transcript_data, fmt)
+            try:
+                window = transcript_window(transcript_data, params)
+            except ValueError:
+                return jsonify({'error': 'Times must be numbers (seconds)'}), 400
+            if window is not None:
+                return jsonify({'videoId': upload['id'], **window})
+            return jsonify(combine_transcript(upload['id'], transcript_data))
+        if not url:
+            return jsonify({'error': 'Uploaded video not found'}), 404
         
         video_id = extract_video_id(url) or url
         
         if not video_id:
             return jsonify({'error': 'Invalid YouTube URL'}), 400
         
-        print(f"Processing video ID: {video_id}")
+        log.info("Fetching YouTube transcript", extra={'video_id': video_id})
         
         # Get transcript data
         transcript_data = get_transcript_data(video_id)
         
         if not transcript_data:
+            if fmt != 'json':
+                return jsonify({'error': 'No captions available for this video'}), 404
             return jsonify({
                 'videoId': video_id,
                 'transcripts': [],
@@ -592,40 +740,54 @@ def api_get_transcript():
                 'message': 'No captions available for this video'
             })
         
-        print(f"Successfully retrieved {len(transcript_data)} transcript items")
-        
-        # Combine all transcripts into a single text block (User requested "no time line")
-        full_text = " ".join([item['text'] for item in transcript_data])
+        log.info("Retrieved YouTube transcript", extra={'video_id': video_id, 'items': len(transcript_data)})
+        index_catalog_captions(video_id, transcript_data)
         
-        # Clean up whitespace
-        full_text = " ".join(full_text.split())
-        
-        # Create a single segment containing the entire text
-        segmented_transcripts = [{
-            'start': 0,
-            'end': transcript_data[-1]['start'] + transcript_data[-1]['duration'] if transcript_data else 0,
-            'text': full_text
-        }]
-        
-        return jsonify({
-            'videoId': video_id,
-            'transcripts': segmented_transcripts,
-            'totalSegments': len(segmented_transcripts)
-        })
+        if fmt != 'json':
+            return transcript_file_response(video_id, transcript_data, fmt)
+        try:
+            window = transcript_window(transcript_data, params)
+        except ValueError:
+            return jsonify({'error': 'Times must be numbers (seconds)'}), 400
+        if window is not None:
+            return jsonify({'videoId': video_id, **window})
+        return jsonify(combine_transcript(video_id, transcript_data))
         
     except Exception as e:
-        print(f"API Error: {e}")
+        log.exception("API Error")
         return jsonify({
             'error': 'Failed to fetch transcript',
             'details': str(e)
         }), 500
 
 
-@app.route('/api/summarize', methods=['POST'])
+DOCX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+def wants_async(data=None):
+    """True when the client asked for a background job (?async=1 or "async": true in the JSON body)."""
+    flag = request.args.get('async')
+    if flag is None and isinstance(data, dict):
+        flag = data.get('async')
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+def enqueue_job_response(kind, payload):
+    """Queue a job and answer 202 with where to poll for its result."""
+    with get_db() as conn:
+        job_id = job_queue.enqueue(conn, kind, payload)
+        conn.commit()
+    log.info("Job queued", extra={'job_id': job_id, 'kind': kind})
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f'/api/jobs/{job_id}'}), 202
+
+
+GROQ_MODEL = "llama-3.3-70b-versatile"
+
+@bp.route('/api/summarize', methods=['POST'])
+@profiling.profiled
 def api_summarize():
-    """Generate generic summary using Groq."""
+    """Generate generic summary using Groq (with "async": true, queue it as a job and return 202)."""
     try:
         # Check if Groq client is configured
+        groq_client = get_groq_client()
         if not groq_client:
             return jsonify({
                 'error': 'Groq API key not configured',
@@ -637,10 +799,29 @@ def api_summarize():
         
         if not transcript_text:
             return jsonify({'error': 'Transcript text is required'}), 400
-            
-        print("Generating summary with Groq...")
         
-        system_prompt = """You are an expert academic summarizer and scientific note-taker.
+        if wants_async(data):
+            return enqueue_job_response('summarize', {'transcript': transcript_text})
+        
+        return jsonify(summarize_transcript(transcript_text))
+        
+    except Exception as e:
+        log.exception("Summary Error")
+        return jsonify({
+            'error': 'Failed to generate summary',
+            'details': str(e)
+        }), 500
+
+
+def summarize_transcript(transcript_text):
+    """{'title', 'summary'}: structured Markdown notes of a transcript, written by Groq."""
+    groq_client = get_groq_client()
+    if not groq_client:
+        raise RuntimeError('Groq API key not configured')
+    
+    log.info("Generating summary with Groq", extra={'chars': len(transcript_text)})
+    
+    system_prompt = """You are an expert academic summarizer and scientific note-taker.
 
 You will be given the COMPLETE transcript of a lecture or video.
 Your task is to create a DETAILED, PROFESSIONALLY STRUCTURED note in GitHub-flavored Markdown.
@@ -671,12 +852,13 @@ OUTPUT FORMAT:
 The first line MUST be: TITLE: [Your Generated Title]
 Followed by the structured markdown content."""
 
-        # Limit transcript length to roughly stay within token limits for free tier
-        max_chars = 25000 
-        if len(transcript_text) > max_chars:
-            print(f"Truncating transcript from {len(transcript_text)} to {max_chars} chars")
-            transcript_text = transcript_text[:max_chars] + "... [Transcript truncated due to length]"
+    # Limit transcript length to roughly stay within token limits for free tier
+    max_chars = 25000 
+    if len(transcript_text) > max_chars:
+        log.info("Truncating transcript", extra={'chars': len(transcript_text), 'max_chars': max_chars})
+        transcript_text = transcript_text[:max_chars] + "... [Transcript truncated due to length]"
 
+    with metrics.GROQ_LATENCY.time(model=GROQ_MODEL):
         chat_completion = groq_client.chat.completions.create(
             messages=[
                 {
@@ -688,34 +870,37 @@ Followed by the structured markdown content."""
                     "content": transcript_text,
                 }
             ],
-            model="llama-3.3-70b-versatile",
+            model=GROQ_MODEL,
             temperature=0.4,
         )
-        
-        raw_content = chat_completion.choices[0].message.content
-        print("Summary generated successfully")
-        
-        # Parse title and content
-        title = "Lecture Summary"
-        content = raw_content
-        
-        if raw_content.startswith("TITLE:"):
-            lines = raw_content.split('\n', 1)
-            title = lines[0].replace("TITLE:", "").strip()
-            if len(lines) > 1:
-                content = lines[1].strip()
-        
-        return jsonify({
-            'title': title,
-            'summary': content
-        })
-        
-    except Exception as e:
-        print(f"Summary Error: {e}")
-        return jsonify({
-            'error': 'Failed to generate summary',
-            'details': str(e)
-        }), 500
+    
+    usage = getattr(chat_completion, 'usage', None)
+    if usage is not None:
+        metrics.GROQ_TOKENS.inc(usage.prompt_tokens or 0, model=GROQ_MODEL, kind='prompt')
+        metrics.GROQ_TOKENS.inc(usage.completion_tokens or 0, model=GROQ_MODEL, kind='completion')
+    
+    raw_content = chat_completion.choices[0].message.content
+    log.info("Summary generated", extra={'model': GROQ_MODEL, 'chars': len(raw_content)})
+    
+    # Parse title and content
+    title = "Lecture Summary"
+    content = raw_content
+    
+    if raw_content.startswith("TITLE:"):
+        lines = raw_content.split('\n', 1)
+        title = lines[0].replace("TITLE:", "").strip()
+        if len(lines) > 1:
+            content = lines[1].strip()
+    
+    return {
+        'title': title,
+        'summary': content
+    }
+
+
+@job_queue.handler('summarize')
+def run_summarize_job(payload, job):
+    return summarize_transcript(payload['transcript'])
 
 
 @click.command()
@@ -723,12 +908,18 @@ Followed by the structured markdown content."""
 @click.option('--output', '-o', type=click.Path(), help='Output file path (default: stdout)')
 @click.option('--timestamps/--no-timestamps', default=True, help='Include timestamps (default: True)')
 @click.option('--audio/--no-audio', default=None, help='Force process as audio file')
-@click.option('--method', type=click.Choice(['whisper', 'google']), default='whisper', help='Transcription method (whisper or google)')
-def main(input_path: str, output: Optional[str], timestamps: bool, audio: Optional[bool], method: str) -> None:
+@click.option('--method', type=click.Choice(list(asr_backends.BACKENDS)), default=asr_backends.ASR_BACKEND,
+              show_default=True, help='ASR backend for audio files (see asr_backends.py)')
+@click.option('--format', 'fmt', type=click.Choice(subtitle_formats.FORMATS), default='txt', show_default=True,
+              help='Output format: plain text, SubRip, WebVTT or JSON lines')
+def main(input_path: str, output: Optional[str], timestamps: bool, audio: Optional[bool], method: str, fmt: str) -> None:
     """Extract transcript from YouTube video or audio file.
     
     INPUT_PATH can be a YouTube URL, video ID, or path to audio file.
+    Output is streamed segment by segment; progress messages go to stderr.
     """
+    configure_logging()
+    add_winget_ffmpeg_to_path()
     try:
         # Determine if input is YouTube URL or audio file
         is_audio = audio or (audio is None and (os.path.isfile(input_path) and not input_path.startswith(('http://', 'https://'))))
@@ -739,33 +930,10 @@ def main(input_path: str, output: Optional[str], timestamps: bool, audio: Option
                 click.echo("Error: Unsupported audio format. Allowed: mp3, wav, m4a, flac, ogg, aac, wma", err=True)
                 sys.exit(1)
             
-            click.echo(f"Transcribing audio file: {input_path}")
+            click.echo(f"Transcribing audio file: {input_path}", err=True)
             
-            if method == 'google':
-                click.echo("Using Google Speech Recognition...")
-                transcript_data = []
-                wav_file = prepare_voice_file(input_path)
-                
-                with sr.AudioFile(wav_file) as source:
-                    audio_data = sr.Recognizer().record(source, duration=30)
-                    text = transcribe_with_google_speech(audio_data)
-                    
-                    if text.startswith("Google Speech Recognition") or text.startswith("Speech recognition error"):
-                        click.echo("Speech recognition failed", err=True)
-                        sys.exit(1)
-                    
-                    # Create transcript segments
-                    transcript_data.append({
-                        'text': text.strip(),
-                        'start': 0.0,
-                        'duration': 30.0
-                    })
-                    
-                    click.echo(f"Google Speech Recognition completed: {len(text)} characters")
-            else:
-                # Use Whisper
-                click.echo("Using Whisper...")
-                transcript_data = transcribe_audio_file(input_path)
+            click.echo(f"Using {asr_backends.get_backend(method).description}...", err=True)
+            transcript_data = transcribe_audio_file(input_path, method=method)
             
             if not transcript_data:
                 click.echo("Transcription failed", err=True)
@@ -776,33 +944,22 @@ def main(input_path: str, output: Optional[str], timestamps: bool, audio: Option
             api = YouTubeTranscriptApi()
             transcript = api.fetch(video_id, languages=('en',))
             
-            # Convert to standard format
-            transcript_data = []
-            for entry in transcript:
-                transcript_data.append({
-                    'text': entry.text,
-                    'start': entry.start,
-                    'duration': entry.duration
-                })
-        
-        # Format the transcript
-        formatted_lines = []
-        for entry in transcript_data:
-            if timestamps:
-                timestamp = format_timestamp(entry['start'])
-                formatted_lines.append(f"[{timestamp}] {entry['text']}")
-            else:
-                formatted_lines.append(entry['text'])
-        
-        transcript_text = '\n'.join(formatted_lines)
+            # Convert to standard format lazily, one snippet at a time
+            transcript_data = ({'text': entry.text, 'start': entry.start, 'duration': entry.duration}
+                               for entry in transcript)
         
-        # Output handling
+        # Write each segment as soon as it is formatted (constant memory)
+        chunks = subtitle_formats.stream(fmt, transcript_data, timestamps=timestamps)
         if output:
             with open(output, 'w', encoding='utf-8') as f:
-                f.write(transcript_text)
-            click.echo(f"Transcript saved to: {output}")
+                for chunk in chunks:
+                    f.write(chunk)
+            click.echo(f"Transcript saved to: {output}", err=True)
         else:
-            click.echo(transcript_text)
+            stdout = click.get_text_stream('stdout')
+            for chunk in chunks:
+                stdout.write(chunk)
+                stdout.flush()
             
     except (TranscriptsDisabled, NoTranscriptFound):
         click.echo("Error: No transcript found for this video.", err=True)
@@ -815,10 +972,31 @@ def main(input_path: str, output: Optional[str], timestamps: bool, audio: Option
 # --- Note Management ---
 
 NOTES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'notes')
-if not os.path.exists(NOTES_DIR):
-    os.makedirs(NOTES_DIR)
 
-@app.route('/api/notes', methods=['GET', 'POST'])
+def read_note_file(file_path):
+    """Read a note file and return {'title', 'content'}."""
+    import json
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith('.json'):
+            data = json.load(f)
+            return {'title': data.get('title', ''), 'content': data.get('content', '')}
+        return {'title': '', 'content': f.read()}
+
+
+def save_note_file(filename, file_path, title, content, previous=None):
+    """Write the latest note content and keep it as a new revision. Returns the revision number."""
+    import json
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump({'title': title, 'content': content}, f)
+    
+    with get_db() as conn:
+        return note_history.record_revision(
+            conn, filename, title, content,
+            previous=previous['content'] if previous else None,
+            previous_title=previous['title'] if previous else None,
+        )
+
+@bp.route('/api/notes', methods=['GET', 'POST'])
 def manage_notes():
     """List or Save notes."""
     try:
@@ -826,6 +1004,7 @@ def manage_notes():
             notes = []
             if os.path.exists(NOTES_DIR):
                 files = sorted(os.listdir(NOTES_DIR), reverse=True)
+                g.last_modified = max([os.path.getmtime(NOTES_DIR)] + [os.path.getmtime(os.path.join(NOTES_DIR, f)) for f in files])
                 import json
                 for filename in files:
                     file_path = os.path.join(NOTES_DIR, filename)
@@ -856,13 +1035,15 @@ def manage_notes():
             if not content:
                 return jsonify({'error': 'Content is required'}), 400
                 
-            import json
+            previous = None
             if filename:
                 filename = secure_filename(filename)
                 old_file_path = os.path.join(NOTES_DIR, filename)
                 if not os.path.exists(old_file_path):
                     return jsonify({'error': 'Note not found for update'}), 404
                 
+                previous = read_note_file(old_file_path)
+                
                 if filename.endswith('.txt'):
                     os.remove(old_file_path)
                     filename = filename[:-4] + '.json'
@@ -873,16 +1054,25 @@ def manage_notes():
                 timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"note_{timestamp}.json"
                 file_path = os.path.join(NOTES_DIR, filename)
+                # Reserve the name atomically: notes saved in the same second must not overwrite each other
+                n = 1
+                while True:
+                    try:
+                        open(file_path, 'x').close()
+                        break
+                    except FileExistsError:
+                        filename = f"note_{timestamp}_{n}.json"
+                        file_path = os.path.join(NOTES_DIR, filename)
+                        n += 1
             
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump({'title': title, 'content': content}, f)
-            return jsonify({'message': 'Note saved', 'filename': filename})
+            revision = save_note_file(filename, file_path, title, content, previous)
+            return jsonify({'message': 'Note saved', 'filename': filename, 'revision': revision})
             
     except Exception as e:
-        print(f"Error managing notes: {e}")
+        log.exception("Error managing notes")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/notes/<filename>', methods=['GET', 'DELETE'])
+@bp.route('/api/notes/<filename>', methods=['GET', 'DELETE'])
 def manage_note(filename):
     """Get or Delete a specific note."""
     try:
@@ -890,13 +1080,15 @@ def manage_note(filename):
         file_path = os.path.join(NOTES_DIR, filename)
         
         if request.method == 'DELETE':
-            print(f"Deleting note: {filename}")
+            log.info("Deleting note", extra={'note': filename})
             if os.path.exists(file_path):
                 os.remove(file_path)
-                print("File deleted successfully")
+                with get_db() as conn:
+                    note_history.delete_revisions(conn, filename)
+                log.info("Note deleted", extra={'note': filename})
                 return jsonify({'message': 'Note deleted successfully'})
             else:
-                print("File not found for deletion")
+                log.warning("Note not found for deletion", extra={'note': filename})
                 return jsonify({'error': 'Note not found'}), 404
                 
         elif request.method == 'GET':
@@ -906,6 +1098,8 @@ def manage_note(filename):
 
             if not os.path.exists(file_path):
                 return jsonify({'error': 'Note not found'}), 404
+            
+            g.last_modified = os.path.getmtime(file_path)
                 
             if filename.endswith('.json'):
                 with open(file_path, 'r', encoding='utf-8') as f:
@@ -917,13 +1111,102 @@ def manage_note(filename):
                 return jsonify({'content': content})
             
     except Exception as e:
-        print(f"Error managing note ({request.method}): {e}")
+        log.exception("Error managing note", extra={'method': request.method})
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/notes/<filename>/related', methods=['GET'])
+def api_note_related_videos(filename):
+    """Lectures whose transcripts are most similar to a note (?k=, default 5)."""
+    try:
+        file_path = os.path.join(NOTES_DIR, secure_filename(filename))
+        if not os.path.exists(file_path):
+            return jsonify({'error': 'Note not found'}), 404
+        note = read_note_file(file_path)
+        k = min(max(request.args.get('k', RELATED_DEFAULT_K, type=int), 1), recommendations.TOP_K)
+        with get_read_db() as conn:
+            index = recommendations.get_index(conn)
+            return jsonify({'note': filename,
+                            'related': related_videos(conn, index.related_to_text(f"{note['title']} {note['content']}", k))})
+    except recommendations.RecommendationsUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        log.exception("Related videos error", extra={'note': filename})
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/notes/<filename>/revisions', methods=['GET'])
+def list_note_revisions(filename):
+    """List the saved revisions of a note."""
+    try:
+        filename = secure_filename(filename)
+        with get_read_db() as conn:
+            revisions = note_history.list_revisions(conn, filename)
+        return jsonify({'filename': filename, 'revisions': revisions})
+    except Exception as e:
+        log.exception("Error listing revisions")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/notes/<filename>/revisions/<int:revision>', methods=['GET'])
+def get_note_revision(filename, revision):
+    """Get the content of a specific revision of a note."""
+    try:
+        filename = secure_filename(filename)
+        with get_read_db() as conn:
+            data = note_history.get_revision(conn, filename, revision)
+        if data is None:
+            return jsonify({'error': 'Revision not found'}), 404
+        return jsonify(data)
+    except Exception as e:
+        log.exception("Error getting revision")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/notes/<filename>/diff', methods=['GET'])
+def diff_note_revisions(filename):
+    """Unified diff between two revisions (?from=&to=, defaulting to the last two)."""
+    try:
+        filename = secure_filename(filename)
+        with get_read_db() as conn:
+            to_rev = request.args.get('to', type=int) or note_history.latest_revision_number(conn, filename)
+            if to_rev is None:
+                return jsonify({'error': 'Note has no revisions'}), 404
+            from_rev = request.args.get('from', type=int) or max(to_rev - 1, 1)
+            old = note_history.get_revision(conn, filename, from_rev)
+            new = note_history.get_revision(conn, filename, to_rev)
+        if old is None or new is None:
+            return jsonify({'error': 'Revision not found'}), 404
+        
+        diff = note_history.diff_revisions(old, new, f"{filename}@{from_rev}", f"{filename}@{to_rev}")
+        return jsonify({'filename': filename, 'from': from_rev, 'to': to_rev, 'diff': diff})
+    except Exception as e:
+        log.exception("Error diffing revisions")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/notes/<filename>/revisions/<int:revision>/restore', methods=['POST'])
+def restore_note_revision(filename, revision):
+    """Restore an old revision. The restored content is saved as a new revision."""
+    try:
+        filename = secure_filename(filename)
+        file_path = os.path.join(NOTES_DIR, filename)
+        if not filename.endswith('.json') or not os.path.exists(file_path):
+            return jsonify({'error': 'Note not found'}), 404
+        
+        with get_read_db() as conn:
+            data = note_history.get_revision(conn, filename, revision)
+        if data is None:
+            return jsonify({'error': 'Revision not found'}), 404
+        
+        previous = read_note_file(file_path)
+        title = data['title'] if data['title'] is not None else previous['title']
+        new_revision = save_note_file(filename, file_path, title, data['content'], previous)
+        return jsonify({'message': f'Restored revision {revision}', 'filename': filename, 'revision': new_revision})
+    except Exception as e:
+        log.exception("Error restoring revision")
+        return jsonify({'error': str(e)}), 500
 
-@app.route('/api/export-docx', methods=['POST'])
+
+@bp.route('/api/export-docx', methods=['POST'])
+@profiling.profiled
 def export_docx():
-    """Export note content to a Word document."""
+    """Export note content to a Word document (with "async": true, render it as a job and return 202)."""
     try:
         if not request.is_json:
             return jsonify({'error': 'Request must be JSON'}), 400
@@ -944,33 +1227,66 @@ def export_docx():
             safe_title = 'exported_note'
             
         filename = f"{safe_title}.docx"
-        temp_dir = tempfile.gettempdir()
-        file_path = os.path.join(temp_dir, filename)
         
-        print(f"Exporting Word doc: {filename}")
+        if wants_async(data):
+            return enqueue_job_response('export_docx', {'content': content, 'filename': filename})
         
-        # Generate the Word document
-        create_word_document(content, file_path)
+        log.info("Exporting Word doc", extra={'export': filename})
         
-        if not os.path.exists(file_path):
-             return jsonify({'error': 'Failed to generate Word document on disk'}), 500
+        # Render in memory; unchanged notes come straight from the export cache
+        from word_export_utils import create_word_document_bytes
+        cache_key, docx_bytes = create_word_document_bytes(content)
 
         return send_file(
-            file_path,
+            io.BytesIO(docx_bytes),
             as_attachment=True,
             download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+            mimetype=DOCX_MIMETYPE,
+            etag=cache_key
+        )
+    except Exception as e:
+        log.exception("Error exporting docx")
+        return jsonify({'error': str(e)}), 500
+
+
+@job_queue.handler('export_docx')
+def run_export_docx_job(payload, job):
+    """Render a note to .docx; the document is the job's artifact (GET /api/jobs/<id>/artifact)."""
+    from word_export_utils import create_word_document_bytes
+    _, job.artifact = create_word_document_bytes(payload['content'])
+    return {'filename': payload['filename'], 'mimetype': DOCX_MIMETYPE, 'size': len(job.artifact)}
+
+
+@bp.route('/api/notes/export-bundle', methods=['POST'])
+def export_notes_bundle():
+    """Export several notes as a zip of Word documents, streamed as each one is rendered."""
+    try:
+        data = request.get_json(silent=True) or {}
+        filenames = data.get('filenames')
+        
+        if not filenames or not isinstance(filenames, list):
+            return jsonify({'error': 'A list of note filenames is required'}), 400
+        
+        import bulk_export
+        paths, missing = bulk_export.resolve_note_paths(filenames, NOTES_DIR)
+        if missing:
+            return jsonify({'error': 'Notes not found', 'missing': missing}), 404
+        
+        log.info("Bulk exporting notes", extra={'count': len(paths)})
+        
+        return Response(
+            bulk_export.stream_bundle(paths),
+            mimetype='application/zip',
+            headers={'Content-Disposition': 'attachment; filename=notes.zip'}
         )
     except Exception as e:
-        print(f"Error exporting docx: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error exporting notes bundle")
         return jsonify({'error': str(e)}), 500
 
 
 # --- Video Management ---
 
-@app.route('/api/videos/upload', methods=['POST'])
+@bp.route('/api/videos/upload', methods=['POST'])
 def api_upload_video():
     """Upload a video file."""
     try:
@@ -988,72 +1304,774 @@ def api_upload_video():
             file_path = os.path.join(UPLOAD_FOLDER, filename)
             file.save(file_path)
             
-            # Save to DB
-            with get_db() as conn:
-                c = conn.cursor()
-                c.execute('INSERT INTO videos (title, filename, duration, type) VALUES (?, ?, ?, ?)',
-                          (title, filename, 0, 'upload'))
-                conn.commit()
-                video_id = c.lastrowid
+            video_id = register_uploaded_video(title, filename)
             
             return jsonify({'message': 'Video uploaded successfully', 'id': video_id, 'filename': filename})
             
     except Exception as e:
-        print(f"Upload Error: {e}")
+        log.exception("Upload Error")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/videos', methods=['GET'])
-def api_list_videos():
-    """List all videos."""
+def register_uploaded_video(title, filename):
+    """Insert the `videos` row for a file stored in UPLOAD_FOLDER and queue media probing. Returns the new id."""
+    with get_db() as conn:
+        c = conn.cursor()
+        c.execute('INSERT INTO videos (title, filename, duration, type, media_status) VALUES (?, ?, ?, ?, ?)',
+                  (title, filename, 0, 'upload', 'pending'))
+        conn.commit()
+        video_id = c.lastrowid
+    invalidate_video_list()
+    
+    queue_media_probe(video_id, filename)
+    queue_video_transcription(video_id, filename)
+    return video_id
+
+def queue_media_probe(video_id, filename, conn=None):
+    """Add a probe/thumbnail job for an upload (media_status stays 'pending' until it is done)."""
+    payload = {'video_id': video_id, 'filename': filename}
+    if conn is not None:
+        return job_queue.enqueue(conn, 'probe_video', payload, priority=job_queue.PRIORITY_HIGH,
+                                 dedupe_key=f'probe_video:{video_id}')
+    with get_db() as conn:
+        job_id = queue_media_probe(video_id, filename, conn)
+        conn.commit()
+    return job_id
+
+def media_probe_dead(conn, payload, error):
+    conn.execute('UPDATE videos SET media_status = ? WHERE id = ?', ('failed', payload['video_id']))
+
+@job_queue.handler('probe_video', on_dead=media_probe_dead)
+def probe_uploaded_video(payload, job):
+    """Job: fill in duration, codec, resolution, bitrate, thumbnail and sprite."""
+    import json
+    video_id, filename = payload['video_id'], payload['filename']
+    # Named by id: uploads with the same stem (lecture.mp4, lecture.mkv) must not share images
+    info = media_probe.process_video(os.path.join(UPLOAD_FOLDER, filename), THUMBNAIL_FOLDER, f"video_{video_id}")
+    thumbnail = f"/api/videos/thumbnails/{info['thumbnail']}" if info.get('thumbnail') else None
+    sprite = f"/api/videos/thumbnails/{info['sprite']}" if info.get('sprite') else None
+    
+    with get_db() as conn:
+        updated = conn.execute('''UPDATE videos SET duration = ?, codec = ?, width = ?, height = ?, bitrate = ?,
+                                  thumbnail = COALESCE(?, thumbnail), sprite = ?, sprite_layout = ?,
+                                  media_info = ?, media_status = ?
+                                  WHERE id = ?''',
+                               (info['duration'], info['codec'], info['width'], info['height'], info['bitrate'],
+                                thumbnail, sprite, json.dumps(info['sprite_layout']) if sprite else None,
+                                json.dumps(info), 'ready', video_id)).rowcount
+        conn.commit()
+    if not updated:
+        return {'video_id': video_id, 'skipped': 'video was deleted'}
+    invalidate_video_list()
+    log.info("Probed video", extra={'video_id': video_id, 'duration': info['duration'], 'codec': info['codec'],
+                                    'width': info['width'], 'height': info['height']})
+    
+    if info['width']:
+        queue_hls_transcode(video_id, filename, info)
+    return {'video_id': video_id, 'duration': info['duration']}
+
+def requeue_orphaned_jobs(conn):
+    """
+    Queue jobs for uploads left waiting by an older release, whose in-process
+    queues lost their work on restart. Active jobs are deduplicated. Does not commit.
+    """
+    rows = conn.execute("SELECT id, filename FROM videos WHERE type = 'upload' AND media_status = 'pending'").fetchall()
+    for row in rows:
+        queue_media_probe(row['id'], row['filename'], conn)
+    transcodes = conn.execute("SELECT id, filename FROM videos WHERE type = 'upload' "
+                              "AND hls_status IN ('queued', 'processing')").fetchall()
+    for row in transcodes:
+        if not job_queue.is_active(conn, f"transcode_hls:{row['id']}"):
+            queue_hls_transcode(row['id'], row['filename'], conn=conn)
+    return len(rows) + len(transcodes)
+
+def queue_video_transcription(video_id, filename, priority=job_queue.PRIORITY_LOW):
+    """Mark a video's transcript as queued and add a transcription job (see job_queue.py)."""
+    with get_db() as conn:
+        conn.execute('UPDATE videos SET transcript_status = ?, transcript_error = NULL WHERE id = ?',
+                     ('queued', video_id))
+        job_id = job_queue.enqueue(conn, 'transcribe_video', {'video_id': video_id, 'filename': filename},
+                                   priority=priority, dedupe_key=f'transcribe_video:{video_id}')
+        conn.commit()
+    invalidate_video_list()
+    return job_id
+
+def transcription_dead(conn, payload, error):
+    """A transcription job gave up: the video is no longer in flight and can be re-run."""
+    conn.execute('UPDATE videos SET transcript_status = ?, transcript_error = ? WHERE id = ?',
+                 ('failed', error, payload['video_id']))
+
+@job_queue.handler('transcribe_video', on_dead=transcription_dead)
+def transcribe_uploaded_video(payload, job):
+    """Job: run ASR over an upload and store the segments against its videos row."""
+    video_id, filename = payload['video_id'], payload['filename']
+    try:
+        with get_db() as conn:
+            updated = conn.execute('UPDATE videos SET transcript_status = ? WHERE id = ?',
+                                   ('processing', video_id)).rowcount
+            conn.commit()
+        if not updated:
+            return {'video_id': video_id, 'skipped': 'video was deleted'}
+        invalidate_video_list()
+        
+        transcript_data = transcribe_audio_file(os.path.join(UPLOAD_FOLDER, filename))
+        if transcript_data is None:
+            raise RuntimeError('Transcription failed')
+        
+        with get_db() as conn:
+            conn.execute('INSERT OR REPLACE INTO video_transcripts (video_id, segments, language) VALUES (?, ?, ?)',
+                         (video_id, CompactTranscript.from_segments(transcript_data).to_bytes(), 'en'))
+            if transcript_search.enabled:
+                transcript_search.index_transcript(conn, video_id, transcript_data)
+            conn.execute('UPDATE videos SET transcript_status = ? WHERE id = ?', ('ready', video_id))
+            conn.commit()
+        invalidate_video_list()
+        log.info("Transcript ready", extra={'video_id': video_id, 'segments': len(transcript_data)})
+        return {'video_id': video_id, 'segments': len(transcript_data)}
+    except Exception as e:
+        # Queued again for the retry; transcription_dead marks it failed once the job gives up
+        with get_db() as conn:
+            conn.execute('UPDATE videos SET transcript_status = ?, transcript_error = ? WHERE id = ?',
+                         ('queued', str(e), video_id))
+            conn.commit()
+        invalidate_video_list()
+        raise
+
+def get_stored_transcript(video_id):
+    """Precomputed transcript of an upload as a CompactTranscript, or None if there is none yet."""
+    with get_read_db() as conn:
+        c = conn.cursor()
+        c.execute('SELECT segments FROM video_transcripts WHERE video_id = ?', (video_id,))
+        row = c.fetchone()
+    return CompactTranscript.load(row['segments']) if row else None
+
+TRANSCRIPT_CONTEXT_SECONDS = 15
+
+def transcript_window(transcript, params):
+    """
+    Segments around ?t= (± ?context= seconds) or within ?start=&end=, or None when
+    no time was asked for. Raises ValueError on non-numeric times.
+    """
+    t, start, end = params.get('t'), params.get('start'), params.get('end')
+    if t is None and start is None and end is None:
+        return None
+    if not isinstance(transcript, CompactTranscript):
+        transcript = CompactTranscript.from_segments(transcript)
+    if t is not None:
+        t = float(t)
+        context = float(params.get('context', TRANSCRIPT_CONTEXT_SECONDS))
+        start, end = t - context, t + context
+    else:
+        start = float(start) if start is not None else 0.0
+        end = float(end) if end is not None else (transcript.end(len(transcript) - 1) if len(transcript) else 0.0)
+    segments = transcript.between(start, end)
+    return {
+        'at': transcript.segment_at(t) if t is not None else None,
+        'start': max(0.0, start),
+        'end': end,
+        'transcripts': segments,
+        'totalSegments': len(segments)
+    }
+
+def find_uploaded_video(url=None, video_id=None):
+    """Look up the videos row of an upload by id or by its /api/videos/<filename> URL."""
+    with get_read_db() as conn:
+        c = conn.cursor()
+        if video_id is not None:
+            c.execute("SELECT id, filename, transcript_status FROM videos WHERE id = ? AND type = 'upload'",
+                      (video_id,))
+        else:
+            match = re.search(r'/api/videos/([^/?#]+)$', url.split('?', 1)[0])
+            if not match:
+                return None
+            c.execute("SELECT id, filename, transcript_status FROM videos WHERE filename = ? AND type = 'upload'",
+                      (secure_filename(match.group(1)),))
+        return c.fetchone()
+
+@bp.route('/api/videos/<int:video_id>/transcript', methods=['GET', 'POST'])
+def api_video_transcript(video_id):
+    """GET: transcript status and segments of an upload (?format=txt|srt|vtt|jsonl streams the
+    segments as a file instead; ?t= or ?start=&end= returns only that time window).
+    POST: re-run its transcription."""
+    try:
+        video = find_uploaded_video(video_id=video_id)
+        if not video:
+            return jsonify({'error': 'Uploaded video not found'}), 404
+        
+        if request.method == 'POST':
+            if video['transcript_status'] in ('queued', 'processing'):
+                return jsonify({'error': 'Transcription already in progress'}), 409
+            # An explicit re-run jumps ahead of automatic jobs for new uploads
+            queue_video_transcription(video_id, video['filename'], priority=job_queue.PRIORITY_HIGH)
+            return jsonify({'message': 'Transcription queued', 'transcript_status': 'queued'}), 202
+        
+        fmt = request.args.get('format')
+        if fmt is not None:
+            if fmt not in subtitle_formats.FORMATS:
+                return jsonify({'error': f"Unsupported format: {fmt}"}), 400
+            segments = get_stored_transcript(video_id)
+            if segments is None:
+                return jsonify({'error': 'Transcript is not ready yet',
+                                'transcript_status': video['transcript_status']}), 404
+            return transcript_file_response(f"video_{video_id}", segments, fmt)
+        
+        with get_read_db() as conn:
+            c = conn.cursor()
+            c.execute('SELECT transcript_status, transcript_error FROM videos WHERE id = ?', (video_id,))
+            status = c.fetchone()
+        transcript = get_stored_transcript(video_id) or CompactTranscript.from_segments([])
+        try:
+            window = transcript_window(transcript, request.args)
+        except ValueError:
+            return jsonify({'error': 'Times must be numbers (seconds)'}), 400
+        body = {
+            'video_id': video_id,
+            'transcript_status': status['transcript_status'],
+            'error': status['transcript_error'],
+        }
+        if window is not None:
+            body.update(window)
+        else:
+            body.update({'transcripts': transcript.to_list(), 'totalSegments': len(transcript)})
+        return jsonify(body)
+    except Exception as e:
+        log.exception("Transcript Status Error")
+        return jsonify({'error': str(e)}), 500
+
+# --- Resumable (chunked) uploads ---
+
+@bp.route('/api/videos/uploads', methods=['POST'])
+def api_create_upload():
+    """Start a resumable upload: {filename, size, title?, chunk_size?, sha256?}."""
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = secure_filename(data.get('filename') or '')
+        size = data.get('size')
+        
+        if not filename:
+            return jsonify({'error': 'Filename is required'}), 400
+        if not allowed_file(filename):
+            return jsonify({'error': f'File type not allowed. Allowed types: {", ".join(sorted(ALLOWED_EXTENSIONS))}'}), 400
+        if not isinstance(size, int):
+            return jsonify({'error': 'Integer file size is required'}), 400
+        
+        with get_db() as conn:
+            session = chunked_upload.create_session(
+                conn, PARTIAL_UPLOAD_FOLDER, filename, data.get('title') or filename, size,
+                chunk_size=data.get('chunk_size'), sha256=data.get('sha256'))
+            status = chunked_upload.session_status(conn, session['id'])
+        
+        return jsonify(status), 201
+    except chunked_upload.UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        log.exception("Upload Session Error")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/videos/uploads/<upload_id>', methods=['GET', 'DELETE'])
+def api_upload_session(upload_id):
+    """Get the received/missing chunks of an upload, or abort it."""
+    try:
+        with get_db() as conn:
+            if request.method == 'DELETE':
+                chunked_upload.get_session(conn, upload_id)
+                chunked_upload.delete_session(conn, PARTIAL_UPLOAD_FOLDER, upload_id)
+                return jsonify({'message': 'Upload aborted'})
+            return jsonify(chunked_upload.session_status(conn, upload_id))
+    except chunked_upload.UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        log.exception("Upload Session Error")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/videos/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def api_upload_chunk(upload_id, index):
+    """Receive one chunk as the raw request body, checksummed by the X-Chunk-SHA256 header."""
+    try:
+        with get_db() as conn:
+            size = chunked_upload.write_chunk(conn, PARTIAL_UPLOAD_FOLDER, upload_id, index,
+                                              request.stream, request.headers.get('X-Chunk-SHA256'))
+        return jsonify({'upload_id': upload_id, 'index': index, 'size': size})
+    except chunked_upload.UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        log.exception("Upload Chunk Error")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/videos/uploads/<upload_id>/complete', methods=['POST'])
+def api_complete_upload(upload_id):
+    """Assemble a finished upload and add it to the video library."""
     try:
         with get_db() as conn:
+            session, filename = chunked_upload.finalize(conn, PARTIAL_UPLOAD_FOLDER, UPLOAD_FOLDER, upload_id)
+        
+        video_id = register_uploaded_video(session['title'], filename)
+        return jsonify({'message': 'Video uploaded successfully', 'id': video_id, 'filename': filename})
+    except chunked_upload.UploadError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        log.exception("Upload Complete Error")
+        return jsonify({'error': str(e)}), 500
+
+# In-process cache of video list pages, keyed by query. Valid for one value of the
+# videos_version change counter, so writes made by other processes (web workers,
+# worker.py, other hosts) invalidate it too.
+VIDEO_LIST_CACHE = {}
+VIDEO_LIST_CACHE_MAX = 256
+VIDEO_LIST_DEFAULT_LIMIT = 50
+VIDEO_LIST_MAX_LIMIT = 200
+_video_list_version = None
+
+def invalidate_video_list():
+    VIDEO_LIST_CACHE.clear()
+
+def sync_video_list_cache(conn):
+    """Drop cached pages if the videos table changed since they were built (in any process)."""
+    global _video_list_version
+    version = conn.execute('SELECT version FROM videos_version WHERE id = 1').fetchone()[0]
+    if version != _video_list_version:
+        invalidate_video_list()
+        _video_list_version = version
+
+def encode_video_cursor(upload_date, video_id):
+    import base64
+    return base64.urlsafe_b64encode(f"{upload_date}|{video_id}".encode('utf-8')).decode('ascii')
+
+def decode_video_cursor(cursor):
+    import base64
+    upload_date, video_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+    return upload_date, int(video_id)
+
+def video_row_to_dict(row):
+    import json
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'filename': row['filename'],
+        'url': row['url'],
+        'type': row['type'] or 'upload',
+        'thumbnail': row['thumbnail'],
+        'duration': row['duration'],
+        'width': row['width'],
+        'height': row['height'],
+        'sprite': row['sprite'],
+        # Seek previews: frame n is tile (n % columns, n // columns), taken at n * interval seconds
+        'sprite_layout': json.loads(row['sprite_layout']) if row['sprite_layout'] else None,
+        'media_status': row['media_status'],
+        'transcript_status': row['transcript_status'],
+        'hls': f"/api/videos/{row['id']}/hls/master.m3u8" if row['hls_status'] == 'ready' else None,
+        'upload_date': row['upload_date']
+    }
+
+@bp.route('/api/search', methods=['GET'])
+@profiling.profiled
+def api_search():
+    """
+    Time-coded search in lecture transcripts.
+    Query params: q, limit (videos), per_video (matches per video), video_id (search one video).
+    """
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'Query (q) is required'}), 400
+    if not transcript_search.enabled:
+        return jsonify({'error': 'Search is not available on this server'}), 503
+    limit = min(max(request.args.get('limit', transcript_search.DEFAULT_LIMIT, type=int), 1), 50)
+    per_video = min(max(request.args.get('per_video', transcript_search.DEFAULT_PER_VIDEO, type=int), 1), 20)
+    video_id = request.args.get('video_id', type=int)
+    
+    start = time.perf_counter()
+    with get_read_db() as conn:
+        results = transcript_search.search(conn, query, limit=limit, per_video=per_video, video_id=video_id)
+    parsed = transcript_search.parse_query(query)
+    return jsonify({
+        'query': query,
+        'terms': parsed[1] if parsed else [],
+        'results': results,
+        'total': len(results),
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+@bp.route('/api/videos', methods=['GET'])
+def api_list_videos():
+    """List videos, newest first.
+
+    Query params: limit, cursor (from next_cursor), type ('upload' / 'youtube'), q (title prefix).
+    """
+    try:
+        limit = min(max(request.args.get('limit', VIDEO_LIST_DEFAULT_LIMIT, type=int), 1), VIDEO_LIST_MAX_LIMIT)
+        cursor = request.args.get('cursor')
+        video_type = request.args.get('type')
+        title_prefix = request.args.get('q')
+        
+        cache_key = (limit, cursor, video_type, title_prefix)
+        with get_read_db() as conn:
+            sync_video_list_cache(conn)
+        payload = VIDEO_LIST_CACHE.get(cache_key)
+        metrics.cache_result('video_list', payload is not None)
+        if payload is not None:
+            return jsonify(payload)
+        
+        where, params = [], []
+        if cursor:
+            try:
+                upload_date, last_id = decode_video_cursor(cursor)
+            except Exception:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            # Keyset pagination: continue strictly after the last row of the previous page
+            where.append('(upload_date, id) < (?, ?)')
+            params += [upload_date, last_id]
+        if video_type == 'upload':
+            where.append("(type = 'upload' OR type IS NULL)")
+        elif video_type:
+            where.append('type = ?')
+            params.append(video_type)
+        if title_prefix:
+            escaped = title_prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            where.append("title LIKE ? ESCAPE '\\'")
+            params.append(escaped + '%')
+        
+        query = ('SELECT id, title, filename, url, type, thumbnail, duration, width, height, sprite, sprite_layout, '
+                 'media_status, hls_status, transcript_status, upload_date FROM videos')
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        query += ' ORDER BY upload_date DESC, id DESC LIMIT ?'
+        params.append(limit + 1)
+        
+        with get_read_db() as conn:
             c = conn.cursor()
-            c.execute('SELECT * FROM videos ORDER BY upload_date DESC')
+            c.execute(query, params)
             rows = c.fetchall()
         
-        videos = []
-        for row in rows:
-            # Debug print for first row
-            if rows.index(row) == 0:
-                print(f"DEBUG ROW KEYS: {row.keys()}")
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        payload = {
+            'videos': [video_row_to_dict(row) for row in rows],
+            'next_cursor': encode_video_cursor(rows[-1]['upload_date'], rows[-1]['id']) if has_more else None
+        }
+        
+        if len(VIDEO_LIST_CACHE) >= VIDEO_LIST_CACHE_MAX:
+            invalidate_video_list()
+        VIDEO_LIST_CACHE[cache_key] = payload
+        return jsonify(payload)
+    except Exception as e:
+        log.exception("List Videos Error")
+        return jsonify({'error': str(e)}), 500
+
+RELATED_DEFAULT_K = 5
+
+def related_videos(conn, scored):
+    """Catalog entries for [(video id, score)], in order, each with its similarity score."""
+    if not scored:
+        return []
+    marks = ','.join('?' * len(scored))
+    rows = {row['id']: row for row in conn.execute(
+        'SELECT id, title, filename, url, type, thumbnail, duration, width, height, sprite, sprite_layout, '
+        f'media_status, hls_status, transcript_status, upload_date FROM videos WHERE id IN ({marks})',
+        [vid for vid, _ in scored])}
+    return [dict(video_row_to_dict(rows[vid]), score=round(score, 4)) for vid, score in scored if vid in rows]
+
+@bp.route('/api/videos/<int:video_id>/related', methods=['GET'])
+def api_related_videos(video_id):
+    """Lectures most similar to this one by transcript content (?k=, default 5)."""
+    try:
+        k = min(max(request.args.get('k', RELATED_DEFAULT_K, type=int), 1), recommendations.TOP_K)
+        with get_read_db() as conn:
+            index = recommendations.get_index(conn)
+            return jsonify({'video_id': video_id, 'related': related_videos(conn, index.related(video_id, k))})
+    except recommendations.RecommendationsUnavailable as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        log.exception("Related videos error", extra={'video_id': video_id})
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/videos/<filename>', methods=['GET', 'HEAD'])
+def serve_video(filename):
+    """Serve video file with byte-range (seek) and conditional request support."""
+    file_path = os.path.join(UPLOAD_FOLDER, secure_filename(filename))
+    if not os.path.isfile(file_path):
+        return jsonify({'error': 'Video not found'}), 404
+    return send_media_file(file_path)
+
+def queue_hls_transcode(video_id, filename, info=None, conn=None):
+    """Mark a video as queued and add an HLS transcoding job (see job_queue.py)."""
+    if conn is None:
+        with get_db() as conn:
+            job_id = queue_hls_transcode(video_id, filename, info, conn)
+            conn.commit()
+        invalidate_video_list()
+        return job_id
+    conn.execute('UPDATE videos SET hls_status = ? WHERE id = ?', ('queued', video_id))
+    return job_queue.enqueue(conn, 'transcode_hls', {'video_id': video_id, 'filename': filename, 'info': info},
+                             priority=job_queue.PRIORITY_LOW, dedupe_key=f'transcode_hls:{video_id}')
+
+def hls_transcode_dead(conn, payload, error):
+    conn.execute('UPDATE videos SET hls_status = ? WHERE id = ?', ('failed', payload['video_id']))
+
+@job_queue.handler('transcode_hls', on_dead=hls_transcode_dead)
+def transcode_uploaded_video(payload, job):
+    """Job: build the HLS ladder for an upload and record its renditions."""
+    video_id, filename, info = payload['video_id'], payload['filename'], payload.get('info')
+    source = os.path.join(UPLOAD_FOLDER, filename)
+    try:
+        with get_db() as conn:
+            updated = conn.execute('UPDATE videos SET hls_status = ? WHERE id = ?',
+                                   ('processing', video_id)).rowcount
+            conn.commit()
+        if not updated:
+            return {'video_id': video_id, 'skipped': 'video was deleted'}
+        invalidate_video_list()
+        
+        info = info or media_probe.probe(source)
+        renditions = hls_transcode.transcode(source, os.path.join(HLS_FOLDER, str(video_id)), info)
+        
+        with get_db() as conn:
+            conn.execute('DELETE FROM video_renditions WHERE video_id = ?', (video_id,))
+            conn.executemany('INSERT INTO video_renditions (video_id, name, width, height, bandwidth, playlist) '
+                             'VALUES (?, ?, ?, ?, ?, ?)',
+                             [(video_id, r['name'], r['width'], r['height'], r['bandwidth'], r['playlist'])
+                              for r in renditions])
+            conn.execute('UPDATE videos SET hls_status = ? WHERE id = ?', ('ready', video_id))
+            conn.commit()
+        invalidate_video_list()
+        log.info("HLS ready", extra={'video_id': video_id, 'renditions': ','.join(r['name'] for r in renditions)})
+        return {'video_id': video_id, 'renditions': [r['name'] for r in renditions]}
+    except Exception:
+        # Queued again for the retry; hls_transcode_dead marks it failed once the job gives up
+        with get_db() as conn:
+            conn.execute('UPDATE videos SET hls_status = ? WHERE id = ?', ('queued', video_id))
+            conn.commit()
+        invalidate_video_list()
+        raise
+
+@bp.route('/api/videos/<int:video_id>/hls', methods=['GET', 'POST'])
+def api_video_hls(video_id):
+    """GET: HLS status and renditions of a video. POST: (re)queue its transcode."""
+    try:
+        with get_db() as conn:
+            c = conn.cursor()
+            c.execute('SELECT filename, type, hls_status FROM videos WHERE id = ?', (video_id,))
+            video = c.fetchone()
+            if not video or video['type'] != 'upload':
+                return jsonify({'error': 'Uploaded video not found'}), 404
             
-            videos.append({
-                'id': row['id'],
-                'title': row['title'],
-                'filename': row['filename'],
-                'url': row['url'],
-                'type': row['type'] or 'upload',
-                'thumbnail': row['thumbnail'],
-                'upload_date': row['upload_date']
-            })
+            if request.method == 'POST':
+                if video['hls_status'] in ('queued', 'processing'):
+                    return jsonify({'error': 'Transcode already in progress'}), 409
+                queue_hls_transcode(video_id, video['filename'])
+                return jsonify({'message': 'Transcode queued', 'hls_status': 'queued'}), 202
             
-        return jsonify({'videos': videos})
+            c.execute('SELECT name, width, height, bandwidth, playlist FROM video_renditions '
+                      'WHERE video_id = ? ORDER BY height DESC', (video_id,))
+            renditions = [dict(row) for row in c.fetchall()]
+        
+        ready = video['hls_status'] == 'ready'
+        return jsonify({
+            'video_id': video_id,
+            'hls_status': video['hls_status'],
+            'master': f"/api/videos/{video_id}/hls/master.m3u8" if ready else None,
+            'renditions': renditions
+        })
     except Exception as e:
-        print(f"List Videos Error: {e}")
+        log.exception("HLS Status Error")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/videos/<filename>')
-def serve_video(filename):
-    """Serve video file."""
-    return send_file(os.path.join(UPLOAD_FOLDER, filename))
+HLS_MIMETYPES = {'.m3u8': 'application/vnd.apple.mpegurl', '.ts': 'video/mp2t'}
+
+@bp.route('/api/videos/<int:video_id>/hls/<path:name>', methods=['GET', 'HEAD'])
+def serve_hls(video_id, name):
+    """Serve HLS playlists and segments."""
+    from werkzeug.security import safe_join
+    file_path = safe_join(HLS_FOLDER, str(video_id), name)
+    ext = os.path.splitext(name)[1]
+    if not file_path or ext not in HLS_MIMETYPES or not os.path.isfile(file_path):
+        return jsonify({'error': 'Not found'}), 404
+    # Playlists are small and rewritten on re-transcode; segments never change
+    max_age = 60 if ext == '.m3u8' else 86400
+    return send_media_file(file_path, mimetype=HLS_MIMETYPES[ext], max_age=max_age)
+
+@bp.route('/api/videos/thumbnails/<filename>', methods=['GET', 'HEAD'])
+def serve_thumbnail(filename):
+    """Serve a generated thumbnail or seek-preview sprite."""
+    file_path = os.path.join(THUMBNAIL_FOLDER, secure_filename(filename))
+    if not os.path.isfile(file_path):
+        return jsonify({'error': 'Thumbnail not found'}), 404
+    return send_media_file(file_path)
 
 # Simple health‑check route for debugging
-@app.route('/api/ping', methods=['GET'])
+@bp.route('/api/ping', methods=['GET'])
 def api_ping():
     return jsonify({'status': 'ok'})
 
+def queued_jobs(kind):
+    """Gauge callback: jobs of `kind` waiting in app.db."""
+    def depth():
+        try:
+            with get_read_db() as conn:
+                return job_queue.count(conn, 'queued', kind)
+        except sqlite3.Error:
+            return 0  # no schema yet
+    return depth
+
+metrics.QUEUE_DEPTH.set_function(queued_jobs('transcribe_video'), queue='transcription')
+metrics.QUEUE_DEPTH.set_function(queued_jobs('summarize'), queue='summarize')
+metrics.QUEUE_DEPTH.set_function(queued_jobs('export_docx'), queue='export_docx')
+metrics.QUEUE_DEPTH.set_function(queued_jobs('probe_video'), queue='media_probe')
+metrics.QUEUE_DEPTH.set_function(queued_jobs('transcode_hls'), queue='hls_transcode')
+
+@bp.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """Prometheus metrics of this process (text exposition format)."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@bp.route('/api/admin/profiles', methods=['GET'])
+def api_list_profiles():
+    """List stored request profiles (requires the ADMIN_TOKEN in X-Admin-Token)."""
+    if not admin_auth.is_admin():
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify({'profiles': profiling.list_profiles()})
+
+@bp.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+def api_get_profile(profile_id):
+    """Download a profile; ?format=text gives a cProfile summary, ?format=json its metadata."""
+    if not admin_auth.is_admin():
+        return jsonify({'error': 'Not found'}), 404
+    found = profiling.get_profile(profile_id)
+    if found is None:
+        return jsonify({'error': 'Profile not found'}), 404
+    metadata, path = found
+    
+    fmt = request.args.get('format')
+    if fmt == 'json':
+        return jsonify(metadata)
+    if fmt == 'text':
+        if metadata['mode'] != 'deterministic':
+            return jsonify({'error': 'Text summaries are only available for cProfile profiles'}), 400
+        return Response(profiling.profile_summary(path), mimetype='text/plain')
+    return send_file(path, as_attachment=True, download_name=metadata['file'])
+
+@bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """Status of a background job; `result` is set once it is done, `error` after a failed attempt."""
+    with get_read_db() as conn:
+        job = job_queue.get(conn, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['has_artifact']:
+        job['artifact_url'] = f'/api/jobs/{job_id}/artifact'
+    return jsonify(job)
+
+@bp.route('/api/jobs/<int:job_id>/artifact', methods=['GET'])
+def api_get_job_artifact(job_id):
+    """Download the file a finished job produced (e.g. the .docx of an async export)."""
+    with get_read_db() as conn:
+        job = job_queue.get(conn, job_id)
+        artifact = job_queue.get_artifact(conn, job_id) if job else None
+    if artifact is None:
+        return jsonify({'error': 'No file for this job', 'status': job['status'] if job else None}), 404
+    result = job['result'] or {}
+    return send_file(io.BytesIO(artifact), as_attachment=True,
+                     download_name=result.get('filename', f'job_{job_id}'),
+                     mimetype=result.get('mimetype', 'application/octet-stream'))
+
+@bp.route('/api/admin/jobs', methods=['GET'])
+def api_list_jobs():
+    """Recent jobs, ?status=dead for the dead-letter queue (requires the ADMIN_TOKEN in X-Admin-Token)."""
+    if not admin_auth.is_admin():
+        return jsonify({'error': 'Not found'}), 404
+    status = request.args.get('status')
+    if status is not None and status not in job_queue.STATUSES:
+        return jsonify({'error': f"Unknown status: {status}"}), 400
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    with get_read_db() as conn:
+        jobs = job_queue.list_jobs(conn, status=status, kind=request.args.get('kind'), limit=limit)
+        counts = {s: job_queue.count(conn, s) for s in job_queue.STATUSES}
+    return jsonify({'jobs': jobs, 'counts': counts})
+
+@bp.route('/api/admin/jobs/<int:job_id>/retry', methods=['POST'])
+def api_retry_job(job_id):
+    """Requeue a dead-lettered job with a fresh attempt budget (requires the ADMIN_TOKEN in X-Admin-Token)."""
+    if not admin_auth.is_admin():
+        return jsonify({'error': 'Not found'}), 404
+    with get_db() as conn:
+        if not job_queue.retry(conn, job_id):
+            return jsonify({'error': 'Only dead jobs can be retried'}), 409
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+@bp.route('/api/ready', methods=['GET'])
+def api_ready():
+    """Readiness probe for load balancers: 200 once the database and storage are usable, else 503."""
+    checks = {
+        'storage': all(os.path.isdir(folder) for folder in
+                       (UPLOAD_FOLDER, PARTIAL_UPLOAD_FOLDER, THUMBNAIL_FOLDER, HLS_FOLDER, NOTES_DIR)),
+    }
+    try:
+        with get_read_db() as conn:
+            conn.execute('SELECT 1 FROM videos LIMIT 1').fetchall()
+        checks['database'] = True
+    except sqlite3.Error:
+        checks['database'] = False
+    
+    ready = all(checks.values())
+    checks['asr_backend'] = asr_backends.ASR_BACKEND
+    checks['asr_loaded'] = asr_backends.get_backend().loaded
+    return jsonify({'status': 'ready' if ready else 'unavailable', 'checks': checks}), 200 if ready else 503
+
+
+def create_app():
+    """
+    Build the Flask app: create the database schema and storage folders,
+    then attach the API routes. Nothing touches the disk at import time.
+    """
+    configure_logging()
+    add_winget_ffmpeg_to_path()
+    init_db()
+    for folder in (UPLOAD_FOLDER, PARTIAL_UPLOAD_FOLDER, THUMBNAIL_FOLDER, HLS_FOLDER, NOTES_DIR):
+        os.makedirs(folder, exist_ok=True)
+    
+    if not groq_api_key:
+        log.warning("GROQ_API_KEY not found in environment variables. Summarization will not work. "
+                    "Please add your Groq API key to the .env file")
+    
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+    CORS(app)
+    # after_request hooks run in reverse order: metrics sees the final (e.g. 304) status
+    metrics.init_metrics(app)
+    init_http_cache(app)
+    app.register_blueprint(bp)
+    return app
+
+
+def start_job_workers(threads=None):
+    """
+    Run jobs in this process (JOB_WORKERS threads, default 1). Set JOB_WORKERS=0
+    when standalone workers (worker.py) do all the background work.
+    """
+    if threads is None:
+        threads = int(os.getenv('JOB_WORKERS', 1))
+    if threads <= 0:
+        return None
+    return job_queue.Worker(get_db, threads=threads,
+                            name=f'{socket.gethostname()}:{os.getpid()}-web').start()
+
 
 def run_server():
     """Run the Flask server."""
     print("Python transcript server running on http://localhost:3001")
     print("CLI Usage:")
     print("  YouTube: python transcript_api.py <youtube_url>")
-    print("  Audio:   python transcript_api.py <audio_file.mp3> [--method=whisper|google]")
+    print(f"  Audio:   python transcript_api.py <audio_file.mp3> [--method={'|'.join(asr_backends.BACKENDS)}]")
+    print("  Batch:   python batch_transcribe.py <dir|file|url>... [-m manifest.txt] [-o results.jsonl]")
+    print("  Worker:  python worker.py [--threads N] [--kind transcribe_video]")
     print("API Usage:")
     print("  YouTube: POST to http://localhost:3001/api/transcript")
     print("  Audio (Whisper):   POST to http://localhost:3001/api/transcribe-audio")
     print("  Audio (Google):   POST to http://localhost:3001/api/transcribe-google")
-    app.run(host='0.0.0.0', port=3001, debug=False)
+    app = create_app()
+    start_job_workers()
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', 3001)), debug=False)
 
 
 if __name__ == '__main__':
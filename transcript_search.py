@@ -0,0 +1,176 @@
+import logging
+import re
+import sqlite3
+
+from compact_transcript import CompactTranscript
+
+log = logging.getLogger(__name__)
+
+
+# ─── Time-coded transcript search ─────────────────────────────────────────────
+#
+# An inverted index over the segments of every indexed transcript, kept in
+# app.db as an SQLite FTS5 table (porter stemming, case and accent folding).
+# One row per segment; its rowid is video_id * ROWID_STRIDE + segment index,
+# so a video's rows are one rowid range and its neighbours (for context
+# snippets) are rowid +/- 1.
+#
+# Indexing is incremental: index_transcript() replaces one video's rows in
+# the caller's transaction (the background transcriber calls it when it
+# stores a transcript; YouTube captions are indexed the first time they are
+# fetched). `transcript_search_index` records which videos are indexed.
+#
+# search() matches all query words (the last one as a prefix, "quoted
+# phrases" as phrases) and ranks segments by BM25. Results are grouped per
+# video, and each video is ranked by the scores of its best few segments.
+
+ROWID_STRIDE = 1_000_000
+# Best-ranked segments considered before grouping by video
+SEGMENT_CANDIDATES = 500
+DEFAULT_LIMIT = 10
+DEFAULT_PER_VIDEO = 3
+
+# Set by init_schema(); False when this SQLite build has no FTS5
+enabled = False
+
+
+def init_schema(conn):
+    """Create the index tables. Returns False (and search stays disabled) when SQLite lacks FTS5."""
+    global enabled
+    try:
+        conn.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS transcript_search_fts USING fts5(
+                text, video_id UNINDEXED, start UNINDEXED, duration UNINDEXED,
+                tokenize = 'porter unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        log.warning("Transcript search disabled: SQLite has no FTS5", extra={'error': str(e)})
+        return False
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS transcript_search_index (
+            video_id INTEGER PRIMARY KEY,
+            segments INTEGER NOT NULL,
+            indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    enabled = True
+    return True
+
+
+def index_transcript(conn, video_id, transcript):
+    """(Re)index one video's segments. Does not commit."""
+    base = video_id * ROWID_STRIDE
+    conn.execute('DELETE FROM transcript_search_fts WHERE rowid >= ? AND rowid < ?', (base, base + ROWID_STRIDE))
+    conn.executemany(
+        'INSERT INTO transcript_search_fts (rowid, text, video_id, start, duration) VALUES (?, ?, ?, ?, ?)',
+        ((base + i, segment['text'], video_id, segment['start'], segment['duration'])
+         for i, segment in enumerate(transcript) if segment['text'].strip()))
+    conn.execute('INSERT OR REPLACE INTO transcript_search_index (video_id, segments) VALUES (?, ?)',
+                 (video_id, len(transcript)))
+
+
+def is_indexed(conn, video_id):
+    return conn.execute('SELECT 1 FROM transcript_search_index WHERE video_id = ?', (video_id,)).fetchone() is not None
+
+
+def backfill(conn):
+    """Index stored transcripts that are not indexed yet (e.g. stored before search existed). Does not commit."""
+    rows = conn.execute('''
+        SELECT t.video_id, t.segments FROM video_transcripts t
+        LEFT JOIN transcript_search_index i ON i.video_id = t.video_id
+        WHERE i.video_id IS NULL
+    ''').fetchall()
+    for row in rows:
+        index_transcript(conn, row['video_id'], CompactTranscript.load(row['segments']))
+    if rows:
+        log.info("Indexed stored transcripts for search", extra={'videos': len(rows)})
+    return len(rows)
+
+
+def parse_query(query):
+    """(FTS5 MATCH expression, list of terms) for free text; None if it has no searchable words."""
+    parts, terms = [], []
+    for match in re.finditer(r'"([^"]*)"|(\w+)', query):
+        phrase = match.group(1)
+        words = re.findall(r'\w+', phrase.lower()) if phrase is not None else [match.group(2).lower()]
+        if words:
+            parts.append(('phrase' if phrase is not None else 'word', words))
+            terms.extend(words)
+    if not parts:
+        return None
+    expression = []
+    for i, (kind, words) in enumerate(parts):
+        quoted = '"' + ' '.join(words) + '"'
+        # Search as you type: the trailing word also matches longer words
+        if kind == 'word' and i == len(parts) - 1 and len(words[0]) >= 3:
+            quoted += '*'
+        expression.append(quoted)
+    return ' '.join(expression), terms
+
+
+def search(conn, query, limit=DEFAULT_LIMIT, per_video=DEFAULT_PER_VIDEO, video_id=None):
+    """
+    Ranked matches for `query`: a list of {video_id, title, type, url, filename,
+    score, matches: [{start, duration, text, snippet}]}, best video first.
+    """
+    parsed = parse_query(query)
+    if parsed is None:
+        return []
+    expression, _ = parsed
+
+    sql = ('SELECT rowid, video_id, start, duration, text, bm25(transcript_search_fts) AS rank '
+           'FROM transcript_search_fts WHERE transcript_search_fts MATCH ?')
+    params = [expression]
+    if video_id is not None:
+        sql += ' AND rowid >= ? AND rowid < ?'
+        params += [video_id * ROWID_STRIDE, (video_id + 1) * ROWID_STRIDE]
+    sql += ' ORDER BY rank LIMIT ?'
+    params.append(SEGMENT_CANDIDATES)
+
+    videos = {}
+    for row in conn.execute(sql, params):
+        hits = videos.setdefault(row['video_id'], [])
+        if len(hits) < per_video:
+            hits.append(row)  # rows arrive best first
+    if not videos:
+        return []
+
+    # bm25() is lower-is-better; a video scores the sum of its best matches
+    ranked = sorted(videos.items(), key=lambda item: sum(row['rank'] for row in item[1]))[:limit]
+
+    # Context: the text of the segments right before and after each match
+    rowids = {row['rowid'] + d for _, hits in ranked for row in hits for d in (-1, 1)}
+    neighbours = {}
+    if rowids:
+        marks = ','.join('?' * len(rowids))
+        neighbours = {r['rowid']: r['text'] for r in
+                      conn.execute(f'SELECT rowid, text FROM transcript_search_fts WHERE rowid IN ({marks})',
+                                   list(rowids))}
+    marks = ','.join('?' * len(ranked))
+    catalog = {r['id']: r for r in
+               conn.execute(f'SELECT id, title, type, url, filename FROM videos WHERE id IN ({marks})',
+                            [vid for vid, _ in ranked])}
+
+    results = []
+    for vid, hits in ranked:
+        video = catalog.get(vid)
+        matches = []
+        for row in sorted(hits, key=lambda r: r['start']):
+            context = [neighbours.get(row['rowid'] - 1), row['text'], neighbours.get(row['rowid'] + 1)]
+            matches.append({
+                'start': row['start'],
+                'duration': row['duration'],
+                'text': row['text'],
+                'snippet': ' '.join(' '.join(part.split()) for part in context if part),
+            })
+        results.append({
+            'video_id': vid,
+            'title': video['title'] if video else None,
+            'type': video['type'] if video else None,
+            'url': video['url'] if video else None,
+            'filename': video['filename'] if video else None,
+            'score': round(-sum(row['rank'] for row in hits), 4),
+            'matches': matches,
+        })
+    return results
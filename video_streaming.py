@@ -0,0 +1,120 @@
+import mimetypes
+import os
+
+from flask import Response, request
+from werkzeug.http import http_date
+
+
+# ─── Byte-range file serving for uploaded media ──────────────────────────────
+#
+# send_media_file() answers Range requests with 206 partial content,
+# validates with ETag / Last-Modified (304, If-Range) and hands the open file
+# to the server's wsgi.file_wrapper. Servers that implement the wrapper with
+# sendfile (e.g. gunicorn) then copy the bytes in the kernel: the file is
+# positioned at the range start and Content-Length bounds the transfer.
+
+STREAM_CHUNK_SIZE = 256 * 1024
+MEDIA_MAX_AGE = 3600
+
+
+def _file_etag(stat):
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def _range_still_valid(etag, mtime):
+    """If-Range: only honour Range when the client's validator still matches."""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return int(if_range.date.timestamp()) == int(mtime)
+    return True
+
+
+def _byte_range(ranges, size):
+    """
+    (start, stop) of a single byte range, per RFC 9110: a suffix longer than
+    the file selects the whole file, an end past EOF is clipped. None when
+    the range is unsatisfiable.
+    """
+    start, stop = ranges[0]
+    if start < 0:
+        start = max(0, size + start)  # suffix range: the last -start bytes
+        stop = size
+    else:
+        stop = size if stop is None else min(stop, size)
+    if start >= stop:
+        return None
+    return start, stop
+
+
+def _not_modified(etag, mtime):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    since = request.if_modified_since
+    return since is not None and int(mtime) <= int(since.timestamp())
+
+
+def _read_chunks(f, length):
+    """Fallback body for servers without wsgi.file_wrapper: stop after `length` bytes."""
+    try:
+        while length > 0:
+            data = f.read(min(STREAM_CHUNK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
+
+
+def send_media_file(path, mimetype=None, max_age=MEDIA_MAX_AGE):
+    """Serve a file with Range, conditional GET and zero-copy support."""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = _file_etag(stat)
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': f'public, max-age={max_age}',
+        'ETag': f'"{etag}"',
+        'Last-Modified': http_date(stat.st_mtime),
+    }
+
+    if _not_modified(etag, stat.st_mtime):
+        return Response(status=304, headers=headers)
+
+    start, stop, status = 0, size, 200
+    # Other units and multiple ranges are not supported: they are ignored and
+    # the whole file is sent
+    byte_range = request.range
+    if (byte_range and byte_range.units == 'bytes' and len(byte_range.ranges) == 1
+            and _range_still_valid(etag, stat.st_mtime)):
+        bounds = _byte_range(byte_range.ranges, size)
+        if bounds is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+        start, stop = bounds
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+    length = stop - start
+    headers['Content-Length'] = str(length)
+
+    if request.method == 'HEAD':
+        return Response(status=status, headers=headers, mimetype=mimetype)
+
+    f = open(path, 'rb')
+    f.seek(start)
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if file_wrapper is not None and stop == size:
+        # Open-ended ranges (what players send when seeking) run to EOF, so
+        # the server may sendfile() from the current offset without overrun
+        body = file_wrapper(f, STREAM_CHUNK_SIZE)
+    else:
+        body = _read_chunks(f, length)
+
+    response = Response(body, status=status, headers=headers, mimetype=mimetype, direct_passthrough=True)
+    response.call_on_close(f.close)
+    return response
@@ -1,99 +1,124 @@
+from collections import OrderedDict, namedtuple
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+import hashlib
+import io
 import re
 import os
+import threading
+import metrics
 
 
 # ─── LaTeX → Unicode / plain text conversion ──────────────────────────────────
 
-SYMBOL_MAP = [
+# LaTeX command name → Unicode replacement. Resolved through one compiled
+# pattern (_COMMAND_RE) and a dict lookup instead of one re.sub per symbol.
+SYMBOL_MAP = {
     # Greek letters
-    (r'\\psi',      'ψ'), (r'\\Psi',      'Ψ'),
-    (r'\\phi',      'ϕ'), (r'\\Phi',      'Φ'),
-    (r'\\theta',    'θ'), (r'\\Theta',    'Θ'),
-    (r'\\pi',       'π'), (r'\\Pi',       'Π'),
-    (r'\\alpha',    'α'), (r'\\Alpha',    'Α'),
-    (r'\\beta',     'β'), (r'\\Beta',     'Β'),
-    (r'\\gamma',    'γ'), (r'\\Gamma',    'Γ'),
-    (r'\\delta',    'δ'), (r'\\Delta',    'Δ'),
-    (r'\\epsilon',  'ε'), (r'\\Epsilon',  'Ε'),
-    (r'\\zeta',     'ζ'), (r'\\eta',      'η'),
-    (r'\\iota',     'ι'), (r'\\kappa',    'κ'),
-    (r'\\lambda',   'λ'), (r'\\Lambda',   'Λ'),
-    (r'\\mu',       'μ'), (r'\\nu',       'ν'),
-    (r'\\xi',       'ξ'), (r'\\Xi',       'Ξ'),
-    (r'\\rho',      'ρ'), (r'\\sigma',    'σ'),
-    (r'\\Sigma',    'Σ'), (r'\\tau',      'τ'),
-    (r'\\upsilon',  'υ'), (r'\\chi',      'χ'),
-    (r'\\omega',    'ω'), (r'\\Omega',    'Ω'),
-    (r'\\hbar',     'ℏ'),
+    'psi':      'ψ', 'Psi':      'Ψ',
+    'phi':      'ϕ', 'Phi':      'Φ',
+    'theta':    'θ', 'Theta':    'Θ',
+    'pi':       'π', 'Pi':       'Π',
+    'alpha':    'α', 'Alpha':    'Α',
+    'beta':     'β', 'Beta':     'Β',
+    'gamma':    'γ', 'Gamma':    'Γ',
+    'delta':    'δ', 'Delta':    'Δ',
+    'epsilon':  'ε', 'Epsilon':  'Ε',
+    'zeta':     'ζ', 'eta':      'η',
+    'iota':     'ι', 'kappa':    'κ',
+    'lambda':   'λ', 'Lambda':   'Λ',
+    'mu':       'μ', 'nu':       'ν',
+    'xi':       'ξ', 'Xi':       'Ξ',
+    'rho':      'ρ', 'sigma':    'σ',
+    'Sigma':    'Σ', 'tau':      'τ',
+    'upsilon':  'υ', 'chi':      'χ',
+    'omega':    'ω', 'Omega':    'Ω',
+    'hbar':     'ℏ',
     # Operators & relations
-    (r'\\infty',    '∞'), (r'\\sqrt',     '√'),
-    (r'\\int',      '∫'), (r'\\oint',     '∮'),
-    (r'\\sum',      '∑'), (r'\\prod',     '∏'),
-    (r'\\partial',  '∂'), (r'\\nabla',    '∇'),
-    (r'\\approx',   '≈'), (r'\\neq',      '≠'),
-    (r'\\equiv',    '≡'), (r'\\leq',      '≤'),
-    (r'\\geq',      '≥'), (r'\\le\b',     '≤'),
-    (r'\\ge\b',     '≥'), (r'\\ll',       '≪'),
-    (r'\\gg',       '≫'), (r'\\times',    '×'),
-    (r'\\cdot',     '·'), (r'\\pm',       '±'),
-    (r'\\mp',       '∓'), (r'\\div',      '÷'),
-    (r'\\circ',     '∘'), (r'\\propto',   '∝'),
-    (r'\\sim',      '~'), (r'\\simeq',    '≃'),
+    'infty':    '∞', 'sqrt':     '√',
+    'int':      '∫', 'oint':     '∮',
+    'sum':      '∑', 'prod':     '∏',
+    'partial':  '∂', 'nabla':    '∇',
+    'approx':   '≈', 'neq':      '≠',
+    'equiv':    '≡', 'leq':      '≤',
+    'geq':      '≥', 'le':       '≤',
+    'ge':       '≥', 'll':       '≪',
+    'gg':       '≫', 'times':    '×',
+    'cdot':     '·', 'pm':       '±',
+    'mp':       '∓', 'div':      '÷',
+    'circ':     '∘', 'propto':   '∝',
+    'sim':      '~', 'simeq':    '≃',
     # Arrows
-    (r'\\rightarrow',  '→'), (r'\\leftarrow',   '←'),
-    (r'\\Rightarrow',  '⇒'), (r'\\Leftarrow',   '⇐'),
-    (r'\\leftrightarrow', '↔'), (r'\\Leftrightarrow', '⇔'),
-    (r'\\uparrow',     '↑'), (r'\\downarrow',    '↓'),
+    'rightarrow':  '→', 'leftarrow':   '←',
+    'Rightarrow':  '⇒', 'Leftarrow':   '⇐',
+    'leftrightarrow': '↔', 'Leftrightarrow': '⇔',
+    'uparrow':     '↑', 'downarrow':    '↓',
     # Misc
-    (r'\\dots',     '…'), (r'\\ldots',    '…'),
-    (r'\\cdots',    '⋯'), (r'\\forall',   '∀'),
-    (r'\\exists',   '∃'), (r'\\in\b',     '∈'),
-    (r'\\notin',    '∉'), (r'\\subset',   '⊂'),
-    (r'\\supset',   '⊃'), (r'\\cup',      '∪'),
-    (r'\\cap',      '∩'), (r'\\emptyset', '∅'),
-    (r'\\angle',    '∠'), (r'\\perp',     '⊥'),
-    (r'\\parallel', '∥'),
-]
-
-def clean_math(expr):
-    """
-    Convert a LaTeX math expression to a readable plain-text / Unicode form
-    suitable for Word documents.
-    """
+    'dots':     '…', 'ldots':    '…',
+    'cdots':    '⋯', 'forall':   '∀',
+    'exists':   '∃', 'in':       '∈',
+    'notin':    '∉', 'subset':   '⊂',
+    'supset':   '⊃', 'cup':      '∪',
+    'cap':      '∩', 'emptyset': '∅',
+    'angle':    '∠', 'perp':     '⊥',
+    'parallel': '∥',
+    # Spacing
+    'quad':     ' ', 'qquad':    ' ',
+}
+
+# Structural rewrites, applied in order before the symbol lookup
+_MATH_REWRITES = [
     # Remove wrapping $ or $$ delimiters (if any accidentally left in)
-    expr = re.sub(r'^\$\$?|\$\$?$', '', expr.strip())
-
+    (re.compile(r'^\$\$?|\$\$?$'), ''),
     # \frac{a}{b} → (a/b)
-    expr = re.sub(r'\\frac\{([^}]*)\}\{([^}]*)\}', r'(\1/\2)', expr)
+    (re.compile(r'\\frac\{([^}]*)\}\{([^}]*)\}'), r'(\1/\2)'),
     # \sqrt{x} → √(x)
-    expr = re.sub(r'\\sqrt\{([^}]*)\}', r'√(\1)', expr)
+    (re.compile(r'\\sqrt\{([^}]*)\}'), r'√(\1)'),
     # \text{...} → content
-    expr = re.sub(r'\\text\{([^}]*)\}', r'\1', expr)
+    (re.compile(r'\\text\{([^}]*)\}'), r'\1'),
     # \mathrm{...} / \mathbf{...} etc → content
-    expr = re.sub(r'\\math(?:rm|bf|it|sf|tt|cal|bb)\{([^}]*)\}', r'\1', expr)
+    (re.compile(r'\\math(?:rm|bf|it|sf|tt|cal|bb)\{([^}]*)\}'), r'\1'),
     # \left( \right) etc → ( )
-    expr = re.sub(r'\\(?:left|right)[.|()\[\]{}|]', '', expr)
+    (re.compile(r'\\(?:left|right)[.|()\[\]{}|]'), ''),
     # \overline{x} → x̄  (approximate)
-    expr = re.sub(r'\\overline\{([^}]*)\}', r'\1̄', expr)
+    (re.compile(r'\\overline\{([^}]*)\}'), r'\1̄'),
     # ^{...} → superscript in text form
-    expr = re.sub(r'\^\{([^}]*)\}', r'^\1', expr)
+    (re.compile(r'\^\{([^}]*)\}'), r'^\1'),
     # _{...} → subscript in text form
-    expr = re.sub(r'_\{([^}]*)\}', r'_\1', expr)
-    # Simple ^ and _
-    expr = re.sub(r'\^([^\s{])', r'^\1', expr)
-    expr = re.sub(r'_([^\s{])', r'_\1', expr)
-
-    # Apply symbol map
-    for pattern, replacement in SYMBOL_MAP:
-        expr = re.sub(pattern, replacement, expr)
-
-    # Strip remaining backslash commands we couldn't convert
-    expr = re.sub(r'\\[a-zA-Z]+', '', expr)
-    # Clean up braces
+    (re.compile(r'_\{([^}]*)\}'), r'_\1'),
+]
+
+# Every remaining command: known names map through SYMBOL_MAP, unknown ones
+# are dropped, and spacing commands (\, \; \: \!) become a plain space.
+_COMMAND_RE = re.compile(r'\\(?:([A-Za-z]+)|[,;:! ])')
+_SPACES_RE = re.compile(r' {2,}')
+
+# Math spans inside a line of text: $$..$$, \[..\], $..$, \(..\)
+_MATH_SPAN_RE = re.compile(r'\$\$(.+?)\$\$|\\\[\s*(.+?)\s*\\\]|\$([^$\n]+?)\$|\\\((.+?)\\\)', re.DOTALL)
+
+
+def _replace_command(match):
+    name = match.group(1)
+    if name is None:
+        return ' '
+    return SYMBOL_MAP.get(name, '')
+
+
+def clean_math(expr):
+    """
+    Convert a LaTeX math expression to a readable plain-text / Unicode form
+    suitable for Word documents.
+    """
+    expr = expr.strip()
+    for pattern, replacement in _MATH_REWRITES:
+        expr = pattern.sub(replacement, expr)
+
+    expr = _COMMAND_RE.sub(_replace_command, expr)
+    # Clean up braces and the spacing left behind by removed commands
     expr = expr.replace('{', '').replace('}', '')
+    expr = _SPACES_RE.sub(' ', expr)
     return expr.strip()
 
 
@@ -103,48 +128,349 @@ def render_latex_in_text(text):
     Unicode / plain-text equivalents, returning the cleaned string.
     Also handles \\( \\) and \\[ \\] delimiter variants.
     """
-    # Normalise \( \) and \[ \] → $ and $$
-    text = re.sub(r'\\\[\s*', '$$', text)
-    text = re.sub(r'\s*\\\]', '$$', text)
-    text = re.sub(r'\\\(', '$', text)
-    text = re.sub(r'\\\)', '$', text)
+    return _MATH_SPAN_RE.sub(lambda m: clean_math(next(g for g in m.groups() if g is not None)), text)
+
+
+# ─── Markdown lexer ───────────────────────────────────────────────────────────
+#
+# A note is scanned once into a list of Blocks; text blocks carry their
+# Inline tokens. The tree is output-format neutral (math stays raw LaTeX),
+# so the docx renderer below and any other exporter can share it.
+
+Block = namedtuple('Block', 'kind text level inlines', defaults=('', 0, ()))
+Inline = namedtuple('Inline', 'kind text children', defaults=('', ()))
+
+# Block kinds: heading, paragraph, bullet, numbered, quote, code, math, rule, blank
+_BLOCK_RE = re.compile(r"""
+      (?P<blank>\s*$)
+    | \s*\$\$(?P<math>.+)\$\$\s*$
+    | \s*(?P<math_open>\$\$)\s*$
+    | (?P<hashes>\#{1,4})\ (?P<heading>.*)
+    | \s*(?P<rule>[-*_]{3,})\s*$
+    | (?P<indent>\s*)[*\-+]\ (?P<bullet>.+)
+    | \s*\d+\.\ (?P<numbered>.+)
+    | >\ (?P<quote>.*)
+""", re.VERBOSE)
+
+# Inline kinds: text, math, code, bold, italic, bold_italic
+_INLINE_RE = re.compile(r"""
+      \$\$(?P<dmath>.+?)\$\$
+    | \\\[\s*(?P<bmath>.+?)\s*\\\]
+    | \$(?P<math>[^$\n]+?)\$
+    | \\\((?P<pmath>.+?)\\\)
+    | `(?P<code>[^`]+)`
+    | \*\*\*(?P<bold_italic>.+?)\*\*\*
+    | \*\*(?P<bold>.+?)\*\*
+    | \*(?P<italic>.+?)\*
+""", re.VERBOSE | re.DOTALL)
+
+_INLINE_KINDS = {
+    'dmath': 'math', 'bmath': 'math', 'math': 'math', 'pmath': 'math',
+    'code': 'code', 'bold_italic': 'bold_italic', 'bold': 'bold', 'italic': 'italic',
+}
+
+
+def parse_inline(text):
+    """Split a line of Markdown into Inline tokens (emphasis tokens carry children)."""
+    tokens = []
+    pos = 0
+    for m in _INLINE_RE.finditer(text):
+        if m.start() > pos:
+            tokens.append(Inline('text', text[pos:m.start()]))
+        kind = _INLINE_KINDS[m.lastgroup]
+        inner = m.group(m.lastgroup)
+        if kind in ('bold', 'italic', 'bold_italic'):
+            tokens.append(Inline(kind, inner, tuple(parse_inline(inner))))
+        else:
+            tokens.append(Inline(kind, inner))
+        pos = m.end()
+    if pos < len(text):
+        tokens.append(Inline('text', text[pos:]))
+    return tokens
+
+
+def parse_markdown(content):
+    """Scan a Markdown + LaTeX note once and return its list of Blocks."""
+    blocks = []
+    lines = content.split('\n')
+    n = len(lines)
+    i = 0
+
+    while i < n:
+        line = lines[i].rstrip()
+        i += 1
+
+        # ── Code block: collect raw lines up to the closing fence ────────────
+        if line.startswith('```'):
+            code_lines = []
+            while i < n and not lines[i].rstrip().startswith('```'):
+                code_lines.append(lines[i])
+                i += 1
+            i += 1  # skip closing fence
+            if code_lines:
+                blocks.append(Block('code', '\n'.join(code_lines)))
+            continue
+
+        m = _BLOCK_RE.match(line)
+        kind = m.lastgroup if m else None
+
+        if kind == 'blank':
+            blocks.append(Block('blank'))
+        elif kind == 'math':
+            blocks.append(Block('math', m.group('math').strip()))
+        elif kind == 'math_open':
+            # Standalone $$ opener, content on the following lines
+            math_lines = []
+            while i < n and lines[i].rstrip() != '$$':
+                math_lines.append(lines[i].rstrip())
+                i += 1
+            i += 1  # skip closing $$
+            blocks.append(Block('math', '\n'.join(math_lines)))
+        elif kind == 'heading':
+            text = m.group('heading')
+            blocks.append(Block('heading', text, len(m.group('hashes')), parse_inline(text)))
+        elif kind == 'rule':
+            blocks.append(Block('rule'))
+        elif kind == 'bullet':
+            text = m.group('bullet')
+            blocks.append(Block('bullet', text, len(m.group('indent')), parse_inline(text)))
+        elif kind in ('numbered', 'quote'):
+            text = m.group(kind)
+            blocks.append(Block(kind, text, 0, parse_inline(text)))
+        else:
+            blocks.append(Block('paragraph', line, 0, parse_inline(line)))
+
+    return blocks
+
+
+def inline_plain_text(inlines):
+    """Flatten Inline tokens to plain text, with math converted to Unicode."""
+    parts = []
+    for token in inlines:
+        if token.children:
+            parts.append(inline_plain_text(token.children))
+        elif token.kind == 'math':
+            parts.append(clean_math(token.text))
+        else:
+            parts.append(token.text)
+    return ''.join(parts)
+
+
+# ─── Base template with named styles ──────────────────────────────────────────
+#
+# The document defaults and every block style live in one base template that
+# is built once per process and kept as bytes; each export loads a fresh copy
+# from memory. The renderer then only references styles by id instead of
+# setting fonts and spacing on every paragraph and run.
+
+NOTE_STYLES = {
+    # kind: (style name, based on)
+    'code':     ('Note Code', 'Normal'),
+    'math':     ('Note Math', 'Normal'),
+    'quote':    ('Note Quote', 'Normal'),
+    'rule':     ('Note Rule', 'Normal'),
+    'blank':    ('Note Spacer', 'Normal'),
+    'bullet':   ('Note List Bullet', 'List Bullet'),
+    'numbered': ('Note List Number', 'List Number'),
+}
+INLINE_CODE_STYLE = 'Note Code Char'
+HEADING_SPACE_BEFORE = {1: Pt(16), 2: Pt(14), 3: Pt(12), 4: Pt(10)}
+
+_base_template = None
+_base_template_lock = threading.Lock()
+
+
+def _add_paragraph_style(doc, name, base, space_before=None, space_after=None, left_indent=None,
+                         alignment=None, font_name=None, font_size=None, bold=None, italic=None, color=None):
+    style = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+    style.base_style = doc.styles[base]
+    fmt = style.paragraph_format
+    if space_before is not None:
+        fmt.space_before = space_before
+    if space_after is not None:
+        fmt.space_after = space_after
+    if left_indent is not None:
+        fmt.left_indent = left_indent
+    if alignment is not None:
+        fmt.alignment = alignment
+    if font_name is not None:
+        style.font.name = font_name
+    if font_size is not None:
+        style.font.size = font_size
+    if bold is not None:
+        style.font.bold = bold
+    if italic is not None:
+        style.font.italic = italic
+    if color is not None:
+        style.font.color.rgb = color
+    return style
+
+
+def _build_base_template():
+    doc = Document()
+
+    # ── Document-wide defaults ────────────────────────────────────────────────
+    style = doc.styles['Normal']
+    style.font.name = 'Calibri'
+    style.font.size = Pt(11)
+    # Paragraph spacing
+    style.paragraph_format.space_after = Pt(6)
+
+    for level in (1, 2, 3):
+        doc.styles[f'Heading {level}'].paragraph_format.space_before = HEADING_SPACE_BEFORE[level]
+
+    _add_paragraph_style(doc, 'Note Code', 'Normal', space_before=Pt(4), space_after=Pt(4),
+                         left_indent=Inches(0.3), font_name='Courier New', font_size=Pt(9),
+                         color=RGBColor(0x1f, 0x26, 0x35))
+    _add_paragraph_style(doc, 'Note Math', 'Normal', space_before=Pt(8), space_after=Pt(8),
+                         alignment=WD_ALIGN_PARAGRAPH.CENTER, font_name='Cambria Math',
+                         font_size=Pt(12), bold=True)
+    _add_paragraph_style(doc, 'Note Quote', 'Normal', space_before=Pt(4), space_after=Pt(4),
+                         left_indent=Inches(0.4), italic=True, color=RGBColor(0x55, 0x55, 0x55))
+    _add_paragraph_style(doc, 'Note Rule', 'Normal', space_before=Pt(6), space_after=Pt(6),
+                         color=RGBColor(0xCC, 0xCC, 0xCC))
+    _add_paragraph_style(doc, 'Note Spacer', 'Normal', space_after=Pt(4))
+    _add_paragraph_style(doc, 'Note List Bullet', 'List Bullet', space_after=Pt(3), left_indent=Inches(0.25))
+    _add_paragraph_style(doc, 'Note List Number', 'List Number', space_after=Pt(3))
+
+    code_char = doc.styles.add_style(INLINE_CODE_STYLE, WD_STYLE_TYPE.CHARACTER)
+    code_char.font.name = 'Courier New'
+    code_char.font.size = Pt(10)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def base_template():
+    """Return the template bytes, building the template on first use."""
+    global _base_template
+    if _base_template is None:
+        with _base_template_lock:
+            if _base_template is None:
+                _base_template = _build_base_template()
+    return _base_template
+
+
+def new_document():
+    """A fresh Document cloned from the in-memory base template."""
+    return Document(io.BytesIO(base_template()))
+
+
+# ─── DOCX renderer ────────────────────────────────────────────────────────────
+
+# Styles are resolved to ids once per document and written straight into
+# pStyle / rStyle. python-docx's public `.style` setters rescan styles.xml for
+# the default style on every assignment, which costs more than rendering the
+# paragraph itself.
+
+def _document_styles(doc):
+    """Map each note block kind (and 'inline_code') to its style id in `doc`."""
+    style_ids = {kind: doc.styles[name].style_id for kind, (name, _) in NOTE_STYLES.items()}
+    for level in (1, 2, 3):
+        style_ids[f'heading{level}'] = doc.styles[f'Heading {level}'].style_id
+    style_ids['inline_code'] = doc.styles[INLINE_CODE_STYLE].style_id
+    return style_ids
+
+
+def _styled_paragraph(doc, style_id, text=None):
+    p = doc.add_paragraph(text)
+    if style_id:
+        p._p.style = style_id
+    return p
+
+
+def add_inline_runs(paragraph, inlines, bold=False, italic=False, code_style_id=None):
+    """
+    Add styled runs for a list of Inline tokens to a python-docx paragraph.
+    Inline code runs get `code_style_id`, or the INLINE_CODE_STYLE style by
+    name when no id is given.
+    """
+    pending = []
+
+    def flush():
+        # Consecutive text/math tokens share one run
+        if pending:
+            _add_run(paragraph, ''.join(pending), bold, italic)
+            pending.clear()
+
+    for token in inlines:
+        if token.kind == 'text':
+            pending.append(token.text)
+        elif token.kind == 'math':
+            pending.append(clean_math(token.text))
+        elif token.kind == 'code':
+            flush()
+            run = _add_run(paragraph, token.text, bold, italic)
+            if code_style_id:
+                run._r.style = code_style_id
+            else:
+                run.style = INLINE_CODE_STYLE
+        else:
+            flush()
+            add_inline_runs(paragraph, token.children,
+                            bold or token.kind != 'italic',
+                            italic or token.kind != 'bold', code_style_id)
+    flush()
 
-    # Block math $$...$$
-    text = re.sub(r'\$\$(.+?)\$\$', lambda m: clean_math(m.group(1)), text, flags=re.DOTALL)
-    # Inline math $...$
-    text = re.sub(r'\$([^$\n]+?)\$', lambda m: clean_math(m.group(1)), text)
-    return text
 
+def _add_run(paragraph, text, bold, italic):
+    run = paragraph.add_run(text)
+    if bold:
+        run.bold = True
+    if italic:
+        run.italic = True
+    return run
 
-# ─── Inline markdown formatter for a paragraph ────────────────────────────────
 
 def add_formatted_run(paragraph, text):
     """
-    Parse inline markdown (**bold**, *italic*, `code`) and add styled runs
-    to a python-docx paragraph object.
+    Parse inline markdown (**bold**, *italic*, `code`, $math$) and add styled
+    runs to a python-docx paragraph object.
     """
-    # Split on bold, italic-bold, italic, or code
-    token_re = re.compile(r'(\*\*\*.*?\*\*\*|\*\*.*?\*\*|\*.*?\*|`[^`]+`)')
-    parts = token_re.split(text)
-    for part in parts:
-        if not part:
-            continue
-        if part.startswith('***') and part.endswith('***'):
-            run = paragraph.add_run(part[3:-3])
-            run.bold = True
-            run.italic = True
-        elif part.startswith('**') and part.endswith('**'):
-            run = paragraph.add_run(part[2:-2])
-            run.bold = True
-        elif part.startswith('*') and part.endswith('*') and len(part) > 2:
-            run = paragraph.add_run(part[1:-1])
-            run.italic = True
-        elif part.startswith('`') and part.endswith('`'):
-            run = paragraph.add_run(part[1:-1])
-            run.font.name = 'Courier New'
-            run.font.size = Pt(10)
+    add_inline_runs(paragraph, parse_inline(text))
+
+
+def render_docx(blocks, doc):
+    """Append parsed Blocks to a Document created by new_document()."""
+    style_ids = _document_styles(doc)
+
+    for block in blocks:
+        kind = block.kind
+
+        if kind == 'code':
+            _styled_paragraph(doc, style_ids['code'], block.text)
+
+        elif kind == 'blank':
+            _styled_paragraph(doc, style_ids['blank'])
+
+        elif kind == 'math':
+            _styled_paragraph(doc, style_ids['math'], clean_math(block.text))
+
+        elif kind == 'heading':
+            level = min(block.level, 3)
+            p = _styled_paragraph(doc, style_ids[f'heading{level}'], inline_plain_text(block.inlines))
+            if block.level != level:
+                p.paragraph_format.space_before = HEADING_SPACE_BEFORE[block.level]
+
+        elif kind == 'rule':
+            _styled_paragraph(doc, style_ids['rule'], '─' * 60)
+
+        elif kind == 'bullet':
+            p = _styled_paragraph(doc, style_ids['bullet'])
+            if block.level >= 2:
+                p.paragraph_format.left_indent = Inches(0.25 * (1 + block.level // 2))
+            add_inline_runs(p, block.inlines, code_style_id=style_ids['inline_code'])
+
+        elif kind in ('numbered', 'quote'):
+            p = _styled_paragraph(doc, style_ids[kind])
+            add_inline_runs(p, block.inlines, code_style_id=style_ids['inline_code'])
+
         else:
-            paragraph.add_run(part)
+            p = _styled_paragraph(doc, None)
+            add_inline_runs(p, block.inlines, code_style_id=style_ids['inline_code'])
+
+    return doc
 
 
 # ─── Main export function ─────────────────────────────────────────────────────
@@ -162,167 +488,70 @@ def create_word_document(content, output_path):
       - Display math  $$...$$  (rendered as styled paragraph)
       - Inline math  $...$  (rendered inline)
       - Blank lines preserved as paragraph spacing
-    """
-    doc = Document()
-
-    # ── Document-wide defaults ────────────────────────────────────────────────
-    style = doc.styles['Normal']
-    style.font.name = 'Calibri'
-    style.font.size = Pt(11)
-    # Paragraph spacing
-    style.paragraph_format.space_after = Pt(6)
 
-    lines = content.split('\n')
-    i = 0
-    in_code_block = False
-    code_lines = []
+    The note is parsed once with parse_markdown() and rendered by render_docx()
+    onto a copy of the base template.
+    """
+    doc = new_document()
+    render_docx(parse_markdown(content), doc)
 
-    while i < len(lines):
-        raw = lines[i]
-        line = raw.rstrip()
+    doc.save(output_path)
+    return output_path
 
-        # ── Code block handling ───────────────────────────────────────────────
-        if line.startswith('```'):
-            if not in_code_block:
-                in_code_block = True
-                code_lines = []
-                i += 1
-                continue
-            else:
-                # End of code block — emit it
-                in_code_block = False
-                if code_lines:
-                    p = doc.add_paragraph()
-                    p.paragraph_format.space_before = Pt(4)
-                    p.paragraph_format.space_after = Pt(4)
-                    p.paragraph_format.left_indent = Inches(0.3)
-                    run = p.add_run('\n'.join(code_lines))
-                    run.font.name = 'Courier New'
-                    run.font.size = Pt(9)
-                    run.font.color.rgb = RGBColor(0x1f, 0x26, 0x35)
-                i += 1
-                continue
 
-        if in_code_block:
-            code_lines.append(raw)
-            i += 1
-            continue
+# ─── In-memory export with a content cache ────────────────────────────────────
 
-        # ── Blank line → small spacer ─────────────────────────────────────────
-        if not line.strip():
-            p = doc.add_paragraph()
-            p.paragraph_format.space_after = Pt(4)
-            i += 1
-            continue
+# Bump when the rendered output changes so cached documents are not reused
+RENDERER_VERSION = 2
+DOCX_CACHE_MAX_BYTES = 64 * 1024 * 1024
 
-        # ── Display math  $$...$$ on its own line ─────────────────────────────
-        if line.strip().startswith('$$') and line.strip().endswith('$$') and len(line.strip()) > 4:
-            expr = line.strip()[2:-2].strip()
-            p = doc.add_paragraph()
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            p.paragraph_format.space_before = Pt(8)
-            p.paragraph_format.space_after = Pt(8)
-            run = p.add_run(clean_math(expr))
-            run.bold = True
-            run.font.name = 'Cambria Math'
-            run.font.size = Pt(12)
-            i += 1
-            continue
+_docx_cache = OrderedDict()
+_docx_cache_bytes = 0
+_docx_cache_lock = threading.Lock()
 
-        # ── Standalone $$ block opener (content on next lines) ────────────────
-        if line.strip() == '$$':
-            math_lines = []
-            i += 1
-            while i < len(lines) and lines[i].rstrip() != '$$':
-                math_lines.append(lines[i].rstrip())
-                i += 1
-            expr = '\n'.join(math_lines)
-            p = doc.add_paragraph()
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            p.paragraph_format.space_before = Pt(8)
-            p.paragraph_format.space_after = Pt(8)
-            run = p.add_run(clean_math(expr))
-            run.bold = True
-            run.font.name = 'Cambria Math'
-            run.font.size = Pt(12)
-            i += 1  # skip closing $$
-            continue
 
-        # ── Headings ──────────────────────────────────────────────────────────
-        if line.startswith('#### '):
-            p = doc.add_heading(render_latex_in_text(line[5:]), level=3)
-            p.paragraph_format.space_before = Pt(10)
-            i += 1
-            continue
-        if line.startswith('### '):
-            p = doc.add_heading(render_latex_in_text(line[4:]), level=3)
-            p.paragraph_format.space_before = Pt(12)
-            i += 1
-            continue
-        if line.startswith('## '):
-            p = doc.add_heading(render_latex_in_text(line[3:]), level=2)
-            p.paragraph_format.space_before = Pt(14)
-            i += 1
-            continue
-        if line.startswith('# '):
-            p = doc.add_heading(render_latex_in_text(line[2:]), level=1)
-            p.paragraph_format.space_before = Pt(16)
-            i += 1
-            continue
-
-        # ── Horizontal rule ────────────────────────────────────────────────────
-        if re.match(r'^[-*_]{3,}$', line.strip()):
-            p = doc.add_paragraph()
-            p.paragraph_format.space_before = Pt(6)
-            p.paragraph_format.space_after = Pt(6)
-            run = p.add_run('─' * 60)
-            run.font.color.rgb = RGBColor(0xCC, 0xCC, 0xCC)
-            i += 1
-            continue
-
-        # ── Bullet list  - item  or  * item ───────────────────────────────────
-        bullet_match = re.match(r'^(\s*)[*\-+] (.+)', line)
-        if bullet_match:
-            indent = len(bullet_match.group(1))
-            item_text = render_latex_in_text(bullet_match.group(2))
-            p = doc.add_paragraph(style='List Bullet')
-            p.paragraph_format.left_indent = Inches(0.25 * (1 + indent // 2))
-            p.paragraph_format.space_after = Pt(3)
-            add_formatted_run(p, item_text)
-            i += 1
-            continue
+def export_cache_key(content, **options):
+    """Hash of the note content and export options, used as cache key and ETag."""
+    h = hashlib.sha256()
+    h.update(f"v{RENDERER_VERSION}".encode('utf-8'))
+    for name in sorted(options):
+        h.update(f"\0{name}={options[name]}".encode('utf-8'))
+    h.update(b'\0\0')
+    h.update(content.encode('utf-8'))
+    return h.hexdigest()
 
-        # ── Numbered list  1. / 2. etc ─────────────────────────────────────────
-        num_match = re.match(r'^\s*\d+\. (.+)', line)
-        if num_match:
-            item_text = render_latex_in_text(num_match.group(1))
-            p = doc.add_paragraph(style='List Number')
-            p.paragraph_format.space_after = Pt(3)
-            add_formatted_run(p, item_text)
-            i += 1
-            continue
 
-        # ── Blockquote  > text ──────────────────────────────────────────────────
-        if line.startswith('> '):
-            p = doc.add_paragraph()
-            p.paragraph_format.left_indent = Inches(0.4)
-            p.paragraph_format.space_before = Pt(4)
-            p.paragraph_format.space_after = Pt(4)
-            run = p.add_run(render_latex_in_text(line[2:]))
-            run.italic = True
-            run.font.color.rgb = RGBColor(0x55, 0x55, 0x55)
-            i += 1
-            continue
-
-        # ── Normal paragraph ────────────────────────────────────────────────────
-        clean = render_latex_in_text(line)
-        p = doc.add_paragraph()
-        p.paragraph_format.space_after = Pt(6)
-        add_formatted_run(p, clean)
-        i += 1
+def create_word_document_bytes(content, **options):
+    """
+    Render a note to .docx bytes without touching the filesystem.
 
-    doc.save(output_path)
-    return output_path
+    Returns (cache_key, data). Unchanged content is served from a bounded
+    LRU cache (DOCX_CACHE_MAX_BYTES) and skips rendering entirely.
+    """
+    global _docx_cache_bytes
+    key = export_cache_key(content, **options)
+
+    with _docx_cache_lock:
+        data = _docx_cache.get(key)
+        if data is not None:
+            _docx_cache.move_to_end(key)
+    metrics.cache_result('docx_export', data is not None)
+    if data is not None:
+        return key, data
+
+    buffer = io.BytesIO()
+    with metrics.DOCX_RENDER.time():
+        create_word_document(content, buffer)
+    data = buffer.getvalue()
+
+    with _docx_cache_lock:
+        if key not in _docx_cache and len(data) <= DOCX_CACHE_MAX_BYTES:
+            _docx_cache[key] = data
+            _docx_cache_bytes += len(data)
+            while _docx_cache_bytes > DOCX_CACHE_MAX_BYTES:
+                _, evicted = _docx_cache.popitem(last=False)
+                _docx_cache_bytes -= len(evicted)
+    return key, data
 
 
 if __name__ == '__main__':
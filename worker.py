@@ -0,0 +1,78 @@
+"""
+Standalone job worker: runs background jobs (transcription, summaries, DOCX
+exports) from the durable queue in app.db, see job_queue.py.
+
+Start as many as the hardware allows, on this host or on others that share
+app.db and the uploads folder (local disk or storage with working file
+locks, not NFS):
+
+    python worker.py --threads 2
+    python worker.py --kind transcribe_video --preload-asr    # an ASR-only box
+
+and run the web tier with JOB_WORKERS=0 so it only enqueues. A worker that
+crashes or is killed mid-job stops renewing its lease; once the lease runs
+out (JOB_LEASE_SECONDS) any other worker picks the job up again.
+
+Metrics: on a host running serve.py, start workers with the same
+METRICS_MULTIPROC_DIR and their metrics are included in /api/metrics;
+elsewhere use --metrics-port to scrape each worker directly.
+
+SIGTERM / Ctrl-C stops claiming new jobs and waits up to --grace seconds for
+running ones; jobs still running after that are left to lease expiry.
+"""
+import signal
+import threading
+
+import click
+
+import asr_backends
+import job_queue
+import metrics
+import transcript_api
+from log_config import configure_logging
+
+
+@click.command()
+@click.option('--threads', '-t', type=int, default=1, show_default=True,
+              help='Jobs run concurrently by this process (one Whisper run already uses every core)')
+@click.option('--kind', 'kinds', multiple=True, type=click.Choice(job_queue.kinds()),
+              help='Only run jobs of this kind (repeatable; default: all)')
+@click.option('--lease', type=float, default=job_queue.LEASE_SECONDS, show_default=True,
+              help='Seconds a claimed job stays ours without a heartbeat')
+@click.option('--poll', type=float, default=job_queue.POLL_SECONDS, show_default=True,
+              help='Seconds between polls when the queue is empty')
+@click.option('--grace', type=float, default=60, show_default=True,
+              help='Seconds running jobs get to finish on shutdown')
+@click.option('--name', default=None, help='Worker name recorded on leases (default: host:pid)')
+@click.option('--preload-asr/--no-preload-asr', default=False, show_default=True,
+              help='Load the default ASR model (ASR_BACKEND) before claiming jobs')
+@click.option('--metrics-port', type=int, default=None,
+              help='Serve this process\'s own Prometheus metrics on this port (hosts without the web server)')
+def main(threads, kinds, lease, poll, grace, name, preload_asr, metrics_port):
+    """Run queued background jobs until stopped."""
+    configure_logging()
+    if metrics_port is not None:
+        metrics.serve(metrics_port)
+    transcript_api.add_winget_ffmpeg_to_path()
+    transcript_api.init_db()
+    if preload_asr:
+        asr_backends.get_backend().load()
+
+    worker = job_queue.Worker(transcript_api.get_db, threads=threads, kinds=kinds, name=name,
+                              lease=lease, poll=poll)
+    stopping = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.set())
+
+    worker.start()
+    click.echo(f"Worker {worker.name}: {threads} thread(s), kinds {', '.join(kinds or job_queue.kinds())}", err=True)
+    while not stopping.wait(1):
+        pass
+    click.echo("Stopping: waiting for running jobs", err=True)
+    if not worker.stop(timeout=grace):
+        click.echo("Jobs still running; they will be retried after their lease expires", err=True)
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()